@@ -1,8 +1,13 @@
 
 # Facade for backward compatibility and unified access
 from .config import OPERATION_CATEGORY_MAP, BASE_OUTPUT_DIR
-from .io import load_image, list_images, save_semantic_image
-from .meta import get_capabilities, configure_agent
-from .diagnostics import analyze_image_metrics, compute_difference, compute_average
+from .io import load_image, iter_images, list_images, save_semantic_image
+from .codecs import ensure_artifact, flush_artifacts
+from .reports import ensure_report, flush_reports, report_status
+from .meta import get_capabilities, get_cache_stats, get_output_stats, configure_agent
+from .diagnostics import analyze_image_metrics, compute_difference, compute_average, compute_average_stats, compute_stack_reduction
 from .transform import apply_transformation, add_noise, simulate_degradation, apply_arithmetic
-from .workflows import run_experiment, apply_pipeline, process_batch, run_median_demo
+from .transport import encode_image, decode_image, apply_transformation_array, apply_pipeline_array, analyze_image_array
+from .workflows import run_experiment, apply_pipeline, apply_pipeline_tiled, process_batch, process_batch_parallel, run_median_demo
+from .search import search_parameters
+from .preview import preview_transformation, preview_pipeline, preview_experiment, commit_preview
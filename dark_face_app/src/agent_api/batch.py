@@ -0,0 +1,396 @@
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import cv2
+from .. import processing
+from . import config
+
+# Parallel batch execution: every image is an independent traceable pipeline run
+# in a worker process. Workers receive paths and decode the images themselves,
+# and send back artifact paths, so no pixel data crosses process boundaries.
+# The pool is kept between calls; each worker compiles a pipeline once and
+# reuses it for every image. OpenCV's internal threads are split between the
+# workers (cpu_count // workers each) so the pool does not oversubscribe cores.
+
+# Streaming batches (run_batch_streaming) split the same work into stages
+# connected by bounded queues, so decoding and writing overlap with compute:
+#   decode:  BATCH_STREAM_DECODERS threads (load + result-cache lookup)
+#   compute: worker threads running the pipeline (OpenCV / NumPy release the GIL)
+#   write:   BATCH_STREAM_WRITERS threads (step artifacts + reports)
+# At most BATCH_STREAM_QUEUE_DEPTH items wait between two stages, which caps
+# the images held in memory.
+BATCH_MODES = ("pool", "stream")
+_DONE = object()
+
+# Settings that must not be inherited as is by workers: reports and writes
+# still pending when a worker returns would be lost with it
+_WORKER_OVERRIDES = {
+    "REPORT_MODE": lambda mode: "sync",
+    "ARTIFACT_WRITE_MODE": lambda mode: "flush" if mode == "async" else mode,
+}
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Worker side: compiled plans by pipeline JSON
+_worker_plans = {}
+
+def batch_workers(workers=None, images=None):
+    """Number of worker processes for a batch (config.BATCH_WORKERS, 0 = one per core)."""
+    workers = config.BATCH_WORKERS if workers is None else workers
+    workers = int(workers) or os.cpu_count() or 1
+    if images is not None:
+        workers = min(workers, max(1, images))
+    return max(1, workers)
+
+def cv2_threads_per_worker(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def run_batch_items(image_paths, steps, workers):
+    """
+    Runs the (validated) pipeline `steps` on every image with `workers` processes
+    (in this process if workers == 1). Returns one record per image, in input order.
+    """
+    if workers <= 1:
+        from .transform import compile_steps
+        plan = compile_steps(steps, fuse=False)
+        return [run_batch_item(path, steps, plan) for path in image_paths]
+
+    steps_json = json.dumps(steps)
+    settings = _worker_settings()
+    threads = cv2_threads_per_worker(workers)
+    pool = _get_pool(workers)
+    records = [None] * len(image_paths)
+    try:
+        futures = [pool.submit(_worker_item, path, steps_json, settings, threads) for path in image_paths]
+        for index, future in enumerate(futures):
+            records[index] = future.result()
+    except BrokenProcessPool as e:
+        # A worker died (e.g. killed by the OS): the pool is rebuilt on the next call
+        _discard_pool()
+        for index, path in enumerate(image_paths):
+            if records[index] is None:
+                records[index] = _error_record(path, f"Worker process failed: {e}")
+    return records
+
+def run_batch_item(image_path, steps, plan=None):
+    """Traceable pipeline on one image as a structured record (status, artifacts, timings)."""
+    from .io import load_image
+    from .transform import compile_steps
+    from .workflows import _run_traceable_pipeline
+
+    start = time.perf_counter()
+    try:
+        # Decoded once: the pipeline reuses the cached array
+        load_image(image_path)
+        decoded_at = time.perf_counter()
+        result = _run_traceable_pipeline(image_path, plan or compile_steps(steps, fuse=False))
+    except Exception as e:
+        return _error_record(image_path, str(e), start)
+    end = time.perf_counter()
+
+    if "error" in result:
+        return _error_record(image_path, result["error"], start)
+    return {
+        "image": image_path,
+        "status": "ok",
+        "final_image": result["final_image"],
+        "flow_dir": result["flow_dir"],
+        "cached": bool(result.get("cached")),
+        "error": None,
+        "timings_ms": {
+            "decode": round((decoded_at - start) * 1000, 3),
+            "pipeline": round((end - decoded_at) * 1000, 3),
+            "total": round((end - start) * 1000, 3)
+        },
+        "worker": os.getpid()
+    }
+
+def shutdown_batch_pool():
+    """Stops the worker processes (they are started again by the next parallel batch)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool, _pool_workers = None, 0
+
+def _error_record(image_path, message, start=None):
+    total = round((time.perf_counter() - start) * 1000, 3) if start is not None else 0.0
+    return {
+        "image": image_path,
+        "status": "error",
+        "final_image": None,
+        "flow_dir": None,
+        "cached": False,
+        "error": message,
+        "timings_ms": {"decode": 0.0, "pipeline": 0.0, "total": total},
+        "worker": os.getpid()
+    }
+
+def _worker_settings():
+    settings = {name: value for name, value in vars(config).items() if name.isupper()}
+    for name, override in _WORKER_OVERRIDES.items():
+        settings[name] = override(settings[name])
+    return settings
+
+def _worker_item(image_path, steps_json, settings, cv2_threads):
+    from .transform import compile_steps
+
+    # Settings travel with every task: configure_agent may have changed them
+    for name, value in settings.items():
+        setattr(config, name, value)
+    cv2.setNumThreads(cv2_threads)
+    plan = _worker_plans.get(steps_json)
+    if plan is None:
+        plan = compile_steps(json.loads(steps_json), fuse=False)
+        _worker_plans.clear()
+        _worker_plans[steps_json] = plan
+    return run_batch_item(image_path, None, plan)
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=True)
+            _pool = None
+        if _pool is None:
+            # spawn: forking a process that runs report / writer threads is unsafe
+            context = multiprocessing.get_context(config.BATCH_START_METHOD)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+def _discard_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_workers = None, 0
+
+def run_batch_streaming(image_paths, steps, workers, decoders=None, writers=None, queue_depth=None):
+    """
+    Runs the traceable pipeline `steps` on every image as a decode -> compute ->
+    write stream. Returns (records in input order, per-stage stats).
+    """
+    from .io import load_image
+    from .result_cache import canonical_steps, lookup, make_key, pixel_digest, store
+    from .transform import compile_steps
+    from .workflows import _flow_dir, _flow_result, _save_flow_step
+
+    plan = compile_steps(steps, fuse=False)
+    spec = canonical_steps(plan.steps) if config.RESULT_CACHE_ENABLED else None
+    ops = ["original"] + [stage.ops[0][0] for stage in plan.stages]
+    decoders = max(1, int(decoders or config.BATCH_STREAM_DECODERS))
+    writers = max(1, int(writers or config.BATCH_STREAM_WRITERS))
+    depth = max(1, int(queue_depth or config.BATCH_STREAM_QUEUE_DEPTH))
+
+    records = [None] * len(image_paths)
+    timings = [{"decode": 0.0, "compute": 0.0, "write": 0.0} for _ in image_paths]
+    todo = queue.Queue()
+    for item in enumerate(image_paths):
+        todo.put(item)
+    decoded = _StageQueue(depth)
+    computed = _StageQueue(depth)
+    stages = {"decode": _StageStats(decoders), "compute": _StageStats(workers), "write": _StageStats(writers)}
+
+    def finish(index, result=None, error=None):
+        if error is not None:
+            records[index] = _error_record(image_paths[index], error)
+        else:
+            records[index] = _stream_record(image_paths[index], result)
+        records[index]["timings_ms"] = _stream_timings(timings[index])
+
+    def decode_loop():
+        while True:
+            try:
+                index, path = todo.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            error = hit = None
+            try:
+                # Not kept in the decoded-image LRU: every frame is read once
+                img = load_image(path, remember=False)
+                key = make_key("pipeline", pixel_digest(img), spec) if spec is not None else None
+                hit = lookup(key) if key is not None else None
+            except Exception as e:
+                error = str(e)
+            timings[index]["decode"] = stages["decode"].add(start)
+            if error is not None or hit is not None:
+                finish(index, hit, error)
+            else:
+                decoded.put((index, path, key, img))
+
+    def compute_loop():
+        while True:
+            item = decoded.get()
+            if item is _DONE:
+                return
+            index, path, key, img = item
+            start = time.perf_counter()
+            error = None
+            try:
+                outputs = [img]
+                for stage in plan.stages:
+                    outputs.append(processing.as_array(plan.run_stage(stage, outputs[-1])))
+            except Exception as e:
+                error = str(e)
+            timings[index]["compute"] = stages["compute"].add(start)
+            if error is not None:
+                finish(index, error=error)
+            else:
+                computed.put((index, path, key, outputs))
+
+    def write_loop():
+        while True:
+            item = computed.get()
+            if item is _DONE:
+                return
+            index, path, key, outputs = item
+            start = time.perf_counter()
+            result = error = None
+            try:
+                flow_dir = _flow_dir(path)
+                artifacts, reports = [], []
+                for step, (op, img) in enumerate(zip(ops, outputs)):
+                    # This stage is the writer: no write-behind queue
+                    _save_flow_step(flow_dir, step, op, img, len(ops) - 1, artifacts, reports, defer=False)
+                result = _flow_result(flow_dir, artifacts)
+                if key is not None:
+                    store(key, result)
+            except Exception as e:
+                error = str(e)
+            timings[index]["write"] = stages["write"].add(start)
+            finish(index, result, error)
+
+    def start_threads(target, count, name):
+        threads = [threading.Thread(target=target, name=f"batch-{name}-{i}", daemon=True) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    # Compute threads share the cores with OpenCV's own pool
+    previous_threads = cv2.getNumThreads()
+    cv2.setNumThreads(cv2_threads_per_worker(workers))
+    wall_start = time.perf_counter()
+    try:
+        decode_threads = start_threads(decode_loop, decoders, "decode")
+        compute_threads = start_threads(compute_loop, workers, "compute")
+        write_threads = start_threads(write_loop, writers, "write")
+        # Each stage is closed once its producers are done
+        for thread in decode_threads:
+            thread.join()
+        for _ in compute_threads:
+            decoded.put(_DONE)
+        for thread in compute_threads:
+            thread.join()
+        for _ in write_threads:
+            computed.put(_DONE)
+        for thread in write_threads:
+            thread.join()
+    finally:
+        cv2.setNumThreads(previous_threads)
+    wall = time.perf_counter() - wall_start
+
+    stats = {name: stage.summary(wall) for name, stage in stages.items()}
+    stats["decode"]["queue_out"] = decoded.summary()
+    stats["compute"]["queue_out"] = computed.summary()
+    # The busiest stage (relative to its threads) limits the stream
+    stats["bottleneck"] = max(stages, key=lambda name: stats[name]["utilization"])
+    return records, stats
+
+def _stream_record(image_path, result):
+    return {
+        "image": image_path,
+        "status": "ok",
+        "final_image": result["final_image"],
+        "flow_dir": result["flow_dir"],
+        "cached": bool(result.get("cached")),
+        "error": None,
+        "timings_ms": {},
+        "worker": os.getpid()
+    }
+
+def _stream_timings(timing):
+    return {
+        "decode": timing["decode"],
+        "compute": timing["compute"],
+        "write": timing["write"],
+        "total": round(sum(timing.values()), 3)
+    }
+
+class _StageStats:
+    """Items processed by one stage and the time its threads spent working."""
+    def __init__(self, threads):
+        self.threads = threads
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, start):
+        """Records one item started at `start`. Returns its duration in ms."""
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.items += 1
+            self.busy += elapsed
+        return round(elapsed * 1000, 3)
+
+    def summary(self, wall):
+        return {
+            "threads": self.threads,
+            "items": self.items,
+            "busy_ms": round(self.busy * 1000, 2),
+            # Items per second of one thread's work, times the threads
+            "throughput_per_s": round(self.items * self.threads / self.busy, 2) if self.busy else 0.0,
+            "utilization": round(self.busy / (wall * self.threads), 3) if wall else 0.0
+        }
+
+class _StageQueue:
+    """Bounded queue between two stages that samples its occupancy on every put."""
+    def __init__(self, depth):
+        self.depth = depth
+        self._queue = queue.Queue(maxsize=depth)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._occupancy = 0
+        self._max_occupancy = 0
+        self._full_wait = 0.0
+        self._empty_wait = 0.0
+
+    def put(self, item):
+        start = time.perf_counter()
+        self._queue.put(item)
+        waited = time.perf_counter() - start
+        size = self._queue.qsize()
+        with self._lock:
+            self._full_wait += waited
+            if item is not _DONE:
+                self._puts += 1
+                self._occupancy += size
+                self._max_occupancy = max(self._max_occupancy, size)
+
+    def get(self):
+        start = time.perf_counter()
+        item = self._queue.get()
+        with self._lock:
+            self._empty_wait += time.perf_counter() - start
+        return item
+
+    def summary(self):
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "mean_occupancy": round(self._occupancy / self._puts, 2) if self._puts else 0.0,
+                "max_occupancy": self._max_occupancy,
+                # Producer blocked on a full queue -> the consumer is the bottleneck
+                "producer_blocked_ms": round(self._full_wait * 1000, 2),
+                # Consumer waiting on an empty queue -> the producer is the bottleneck
+                "consumer_starved_ms": round(self._empty_wait * 1000, 2)
+            }
@@ -0,0 +1,235 @@
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from . import config
+
+# Artifact encoding policies, one per role (config.OUTPUT_POLICIES):
+#   result:       images returned to the caller (transformations, final steps, experiments)
+#   intermediate: per-step pipeline artifacts
+#   report:       *_REPORT composites
+# A policy is {"format": None | "png" | "webp" | "jpg" | "npy", ...}. format None
+# keeps the extension chosen by the caller with OpenCV's default settings.
+ARTIFACT_ROLES = ("result", "intermediate", "report")
+OUTPUT_FORMATS = {"png": ".png", "webp": ".webp", "jpg": ".jpg", "npy": ".npy"}
+# Lossy encoding is only acceptable for reports (results feed further analysis)
+LOSSY_FORMATS = ("jpg",)
+
+# Write modes (config.ARTIFACT_WRITE_MODE):
+#   sync:  encoded and written in the calling thread.
+#   flush: write-behind on a small I/O pool; workflows wait for their own
+#          artifacts (settle_artifacts) before returning.
+#   async: workflows return as soon as the writes are queued; ensure_artifact /
+#          flush_artifacts confirm them later.
+# Queued writes keep their image alive: at most ARTIFACT_WRITE_MAX_PENDING_BYTES
+# of pixels may wait, further submissions block until the writers catch up.
+WRITE_MODES = ("sync", "flush", "async")
+
+_stats_lock = threading.Lock()
+_stats = {role: {"files": 0, "bytes": 0, "encode_ms": 0.0, "write_ms": 0.0} for role in ARTIFACT_ROLES}
+
+# Pending write-behind jobs: path -> (ticket, future)
+_pending = {}
+_pending_bytes = 0
+_writer_cond = threading.Condition()
+_writer = None
+_writer_lock = threading.Lock()
+_writer_stats = {"queued": 0, "errors": 0, "backpressure_waits": 0, "backpressure_ms": 0.0, "peak_pending_bytes": 0}
+
+def validate_policy(role, policy):
+    """Checks and normalizes one role policy. Returns the normalized dict."""
+    if role not in ARTIFACT_ROLES:
+        raise ValueError(f"Unknown artifact role: {role}. Valid: {list(ARTIFACT_ROLES)}")
+    if policy is None:
+        policy = {}
+    if isinstance(policy, str):
+        policy = {"format": policy}
+    fmt = policy.get("format")
+    if fmt is not None and fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}. Valid: {list(OUTPUT_FORMATS)}")
+    if fmt in LOSSY_FORMATS and role != "report":
+        raise ValueError(f"Lossy format '{fmt}' is only allowed for reports")
+    normalized = {"format": fmt}
+    if "png_compression" in policy:
+        level = int(policy["png_compression"])
+        if not 0 <= level <= 9:
+            raise ValueError("png_compression must be between 0 and 9")
+        normalized["png_compression"] = level
+    if "jpeg_quality" in policy:
+        quality = int(policy["jpeg_quality"])
+        if not 1 <= quality <= 100:
+            raise ValueError("jpeg_quality must be between 1 and 100")
+        normalized["jpeg_quality"] = quality
+    return normalized
+
+def artifact_path(path, role="result"):
+    """`path` with the extension of the role's output format."""
+    fmt = _policy(role).get("format")
+    if fmt is None:
+        return path
+    return os.path.splitext(path)[0] + OUTPUT_FORMATS[fmt]
+
+def write_artifact(img, path, role="result", defer=True):
+    """
+    Encodes and writes `img` following the role's policy (the extension of
+    `path` is adjusted to the policy format). Returns the path of the artifact.
+    Outside "sync" mode the write is queued (unless defer=False) and the file
+    may not exist yet: `img` must not be modified afterwards.
+    """
+    global _pending_bytes
+    path = artifact_path(path, role)
+    # A queued write to the same path must land first
+    _wait_pending(path)
+    if not defer or config.ARTIFACT_WRITE_MODE == "sync":
+        _encode_and_write(img, path, role)
+        return path
+
+    nbytes = img.nbytes
+    ticket = object()
+    with _writer_cond:
+        limit = config.ARTIFACT_WRITE_MAX_PENDING_BYTES
+        if _pending_bytes and _pending_bytes + nbytes > limit:
+            # Backpressure: wait for the writers instead of piling up images
+            start = time.perf_counter()
+            while _pending_bytes and _pending_bytes + nbytes > limit:
+                _writer_cond.wait()
+            _writer_stats["backpressure_waits"] += 1
+            _writer_stats["backpressure_ms"] += (time.perf_counter() - start) * 1000
+        _pending_bytes += nbytes
+        _writer_stats["queued"] += 1
+        _writer_stats["peak_pending_bytes"] = max(_writer_stats["peak_pending_bytes"], _pending_bytes)
+        # Registered under the lock: the job cannot finish before it is known
+        _pending[path] = (ticket, _get_writer().submit(_background_write, img, path, role, nbytes, ticket))
+    return path
+
+def ensure_artifact(path):
+    """Waits for a queued write of `path`. Returns the path if the file exists, else None."""
+    _wait_pending(path)
+    return path if os.path.exists(path) else None
+
+def flush_artifacts(paths=None):
+    """Waits for the queued writes of `paths` (all if None). Returns how many were waited for."""
+    with _writer_cond:
+        if paths is None:
+            futures = [future for _, future in _pending.values()]
+        else:
+            futures = [_pending[path][1] for path in paths if path in _pending]
+    for future in futures:
+        future.result()
+    return len(futures)
+
+def settle_artifacts(paths):
+    """End of a workflow: in "flush" mode, waits until `paths` are on disk."""
+    if config.ARTIFACT_WRITE_MODE == "flush":
+        flush_artifacts([path for path in paths if path])
+
+def writer_status():
+    with _writer_cond:
+        return {
+            "mode": config.ARTIFACT_WRITE_MODE,
+            "pending": len(_pending),
+            "pending_bytes": _pending_bytes,
+            "max_pending_bytes": config.ARTIFACT_WRITE_MAX_PENDING_BYTES,
+            **_writer_stats,
+            "backpressure_ms": round(_writer_stats["backpressure_ms"], 3)
+        }
+
+def _wait_pending(path):
+    with _writer_cond:
+        entry = _pending.get(path)
+    if entry is not None:
+        entry[1].result()
+
+def _encode_and_write(img, path, role):
+    policy = _policy(role)
+    ext = os.path.splitext(path)[1].lower()
+
+    start = time.perf_counter()
+    if ext == ".npy":
+        # Uncompressed: no encode step, the array is streamed to the file
+        encoded = None
+    else:
+        ok, encoded = cv2.imencode(ext, img, _encode_params(ext, policy))
+        if not ok:
+            raise ValueError(f"Could not encode artifact {path}")
+    encoded_at = time.perf_counter()
+    with open(path, "wb") as f:
+        if encoded is None:
+            np.lib.format.write_array(f, np.ascontiguousarray(img))
+        else:
+            f.write(encoded)
+        size = f.tell()
+    written_at = time.perf_counter()
+
+    with _stats_lock:
+        entry = _stats[role]
+        entry["files"] += 1
+        entry["bytes"] += size
+        entry["encode_ms"] += (encoded_at - start) * 1000
+        entry["write_ms"] += (written_at - encoded_at) * 1000
+
+def _background_write(img, path, role, nbytes, ticket):
+    global _pending_bytes
+    try:
+        _encode_and_write(img, path, role)
+    except Exception as e:
+        print(f"Warning: Failed to write artifact {path}: {e}")
+        with _writer_cond:
+            _writer_stats["errors"] += 1
+    finally:
+        with _writer_cond:
+            _pending_bytes -= nbytes
+            if _pending.get(path, (None,))[0] is ticket:
+                del _pending[path]
+            _writer_cond.notify_all()
+
+def _get_writer():
+    # Double-checked: concurrent first writes must not create two pools
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ThreadPoolExecutor(max_workers=config.ARTIFACT_WRITERS, thread_name_prefix="artifact-writer")
+    return _writer
+
+def output_stats():
+    """
+    Per-role policy, files and bytes written, and time spent encoding / writing,
+    plus the write-behind queue under "writer".
+    """
+    with _stats_lock:
+        stats = {}
+        for role, entry in _stats.items():
+            files = entry["files"]
+            stats[role] = {
+                "policy": _policy(role),
+                "files": files,
+                "bytes": entry["bytes"],
+                "encode_ms": round(entry["encode_ms"], 3),
+                "write_ms": round(entry["write_ms"], 3),
+                "avg_bytes": int(entry["bytes"] / files) if files else 0,
+                "avg_encode_ms": round(entry["encode_ms"] / files, 3) if files else 0.0
+            }
+    stats["writer"] = writer_status()
+    return stats
+
+def reset_output_stats():
+    with _stats_lock:
+        for entry in _stats.values():
+            entry.update(files=0, bytes=0, encode_ms=0.0, write_ms=0.0)
+
+def _policy(role):
+    return config.OUTPUT_POLICIES.get(role) or {"format": None}
+
+def _encode_params(ext, policy):
+    if ext == ".png" and "png_compression" in policy:
+        return [cv2.IMWRITE_PNG_COMPRESSION, policy["png_compression"]]
+    if ext == ".webp":
+        # Quality above 100 selects lossless WebP
+        return [cv2.IMWRITE_WEBP_QUALITY, 101]
+    if ext in (".jpg", ".jpeg") and "jpeg_quality" in policy:
+        return [cv2.IMWRITE_JPEG_QUALITY, policy["jpeg_quality"]]
+    return []
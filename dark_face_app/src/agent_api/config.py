@@ -6,6 +6,7 @@ OPERATION_CATEGORY_MAP = {
     "gaussian": "Restoration",
     "median": "Restoration",
     "average": "Restoration",
+    "stack_reduction": "Restoration",
     
     # Enhancement (Tema 6)
     "gamma": "Enhancement",
@@ -14,6 +15,7 @@ OPERATION_CATEGORY_MAP = {
     "equalize": "Enhancement",
     "contrast_stretching": "Enhancement",
     "negative": "Enhancement",
+    "stretch": "Enhancement",
     "unsharp": "Enhancement",
     
     # Analysis
@@ -31,3 +33,84 @@ OPERATION_CATEGORY_MAP = {
 }
 
 BASE_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "output")
+
+# Report renderer for *_REPORT images: "matplotlib" or "native" (cv2 canvas, much faster)
+REPORT_BACKEND = "matplotlib"
+
+# When *_REPORT images are produced: "sync" (in the request), "deferred"
+# (background pool + on demand) or "lazy" (only when first requested)
+REPORT_MODE = "sync"
+REPORT_WORKERS = 2
+REPORT_MAX_PENDING = 64
+
+# Tiled (out-of-core) pipelines: tile edge in px and where memory-mapped
+# intermediates are spilled (None = system temp dir). Stack reductions
+# spill their decoded frames there too.
+TILE_SIZE = 1024
+TILE_WORK_DIR = None
+
+# Stack reductions: max bytes of one strip (all frames) held in memory
+STACK_STRIP_BYTES = 64 * 2**20
+
+# process_batch(vectorized=True): images decoded and stacked per group
+BATCH_GROUP_SIZE = 256
+
+# Parallel batches: worker processes (1 = in-process, 0 = one per core) and
+# how they are started ("spawn" is safe with the report / writer threads)
+BATCH_WORKERS = 1
+BATCH_START_METHOD = "spawn"
+
+# Streaming batches (process_batch_parallel mode="stream"): decode and write
+# threads around the compute workers, and items allowed between two stages
+BATCH_STREAM_DECODERS = 2
+BATCH_STREAM_WRITERS = 2
+BATCH_STREAM_QUEUE_DEPTH = 8
+
+# Result cache for apply_transformation / apply_pipeline / run_experiment:
+# identical pixels + op/params return the existing artifacts. In-memory LRU
+# of RESULT_CACHE_ENTRIES, plus JSON records on disk (None = a .result_cache
+# folder inside BASE_OUTPUT_DIR) evicted oldest-first above RESULT_CACHE_MAX_BYTES.
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_ENTRIES = 256
+RESULT_CACHE_DIR = None
+RESULT_CACHE_MAX_BYTES = 32 * 2**20
+
+# Decoded-image cache (agent_api.io.load_image), keyed by (path, size, mtime)
+IMAGE_CACHE_MAX_BYTES = 256 * 2**20
+
+# Artifact encoding per role (see agent_api.codecs): "result", "intermediate"
+# (pipeline steps) and "report". format None keeps the caller's extension with
+# OpenCV defaults; otherwise "png" (png_compression 0-9), "webp" (lossless),
+# "jpg" (jpeg_quality 1-100, reports only) or "npy" (uncompressed).
+OUTPUT_POLICIES = {
+    "result": {"format": None},
+    "intermediate": {"format": None},
+    "report": {"format": None}
+}
+
+# Artifact writes: "sync" (in the request), "flush" (write-behind on
+# ARTIFACT_WRITERS threads, waited for before the workflow returns) or "async"
+# (returned once queued; confirmed with flush_artifacts / ensure_artifact).
+# Queued writes hold at most ARTIFACT_WRITE_MAX_PENDING_BYTES of pixels.
+ARTIFACT_WRITE_MODE = "sync"
+ARTIFACT_WRITERS = 2
+ARTIFACT_WRITE_MAX_PENDING_BYTES = 256 * 2**20
+
+# run_experiment: threads running independent candidate branches (0 = one per core)
+EXPERIMENT_WORKERS = 0
+
+# DAG pipelines (apply_pipeline with "nodes"): threads running independent branches (0 = one per core)
+PIPELINE_WORKERS = 0
+
+# search_parameters: proxy size relative to the image, and the most settings
+# a grid / halving search may score
+SEARCH_PROXY_SCALE = 0.25
+SEARCH_MAX_EVALUATIONS = 512
+
+# Interactive previews: longest side of the pyramid level a preview runs on,
+# latency budget used to pick the level, smallest level kept in the pyramid
+# and number of input pyramids cached
+PREVIEW_MAX_SIDE = 640
+PREVIEW_BUDGET_MS = 150
+PREVIEW_MIN_SIDE = 128
+PREVIEW_CACHE_ENTRIES = 16
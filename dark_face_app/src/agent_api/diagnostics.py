@@ -7,19 +7,17 @@ def analyze_image_metrics(image_path: str) -> dict:
     Calculates key metrics (SNR, Entropy, distribution stats) for an image.
     Used to diagnose quality issues.
     """
-    img = load_image(image_path)
-    
-    # Calculate basic metrics
-    snr = processing.calculate_snr(img)
-    entropy = processing.calculate_entropy(img)
-    
-    # Advanced stats
-    stats = processing.calculate_advanced_statistics(img)
-    outliers = processing.detect_outliers_iqr(img)
+    return image_metrics(load_image(image_path))
+
+def image_metrics(img) -> dict:
+    """Diagnostic metrics of an in-memory image (see analyze_image_metrics)."""
+    # All metrics come from a single histogram pass
+    stats = processing.calculate_image_statistics(img)
+    outliers = stats['outliers']
     
     return {
-        "snr_db": float(round(snr, 2)),
-        "entropy": float(round(entropy, 3)),
+        "snr_db": float(round(stats['snr'], 2)),
+        "entropy": float(round(stats['entropy'], 3)),
         "mean_intensity": float(round(stats['mean'], 1)),
         "dynamic_range_usage_pct": float(round(stats['dynamic_usage_pct'], 1)),
         "dark_pixels_pct": float(round(stats['dark_percentage'], 1)),
@@ -53,18 +51,112 @@ def compute_average(directory: str) -> str:
     Returns path to averaged image.
     Tema 4: Image averaging (g_bar).
     """
-    from .io import save_semantic_image, list_images
-    import os
+    from .io import list_images
     
     images_paths = list_images(directory)
     if not images_paths:
         return "Error: No images found"
-        
-    images = [load_image(p) for p in images_paths]
-    avg_img = processing.apply_image_averaging(images)
+    
+    return _stream_average(images_paths, directory, noise_map=False)["average_image"]
+
+def compute_average_stats(directory: str) -> dict:
+    """
+    Streaming average of a burst plus a per-pixel noise map (temporal std).
+    Memory stays constant whatever the number of frames.
+    Tema 4: Image averaging and noise estimation (sigma per pixel).
+    """
+    from .io import list_images
+    
+    images_paths = list_images(directory)
+    if not images_paths:
+        return {"error": "No images found"}
+    
+    return _stream_average(images_paths, directory)
+
+def _stream_average(paths, directory, noise_map=True):
+    """
+    Consumes `paths` (any iterable) through a decode-ahead thread pool and
+    accumulates mean and variance with Welford updates. noise_map=False only
+    averages: no variance, noise map artifact or noise statistics.
+    """
+    from .io import save_semantic_image, iter_images
+    import os
+    import numpy as np
+    
+    mean, variance, count = processing.accumulate_image_statistics(iter_images(paths), variance=noise_map)
+    avg_img = np.clip(mean, 0, 255).astype(np.uint8)
     
     # Define a virtual path for the result based on directory name
     dir_name = os.path.basename(os.path.normpath(directory))
     dummy_path = os.path.join(directory, f"{dir_name}_average.png")
+    average_image = save_semantic_image(avg_img, dummy_path, "average", "result")
+    if not noise_map:
+        return {"average_image": average_image, "frames": count}
+    
+    # Noise map: temporal std per pixel (channels averaged), stretched for display
+    sigma = np.sqrt(variance)
+    if sigma.ndim == 3:
+        sigma = sigma.mean(axis=2)
+    # Stretched in float: casting sigma to uint8 first leaves only a few levels
+    peak = float(sigma.max())
+    sigma_map = (sigma * (255.0 / peak) if peak > 0 else np.zeros_like(sigma)).astype(np.uint8)
     
-    return save_semantic_image(avg_img, dummy_path, "average", "result")
+    return {
+        "average_image": average_image,
+        "noise_map": save_semantic_image(sigma_map, dummy_path, "average", "noise_map"),
+        "frames": count,
+        "noise_sigma_mean": float(round(sigma.mean(), 3)),
+        "noise_sigma_max": float(round(sigma.max(), 3)),
+        # Averaging M frames reduces the noise std by sqrt(M)
+        "expected_sigma_reduction": float(round(np.sqrt(count), 3))
+    }
+
+def compute_stack_reduction(directory: str, reduction: str = "median", percentile: float = 50.0) -> str:
+    """
+    Per-pixel reduction across all images in a directory: temporal median,
+    min, max or an arbitrary percentile (background estimation, impulsive
+    noise removal). Returns path to the reduced image.
+    Tema 4/5: Order statistics over an image sequence.
+    """
+    from .io import save_semantic_image, list_images, iter_images
+    from . import config
+    import os
+    import shutil
+    import tempfile
+    import cv2
+    import numpy as np
+    
+    if reduction not in processing.STACK_REDUCTIONS:
+        return f"Error: Unknown reduction '{reduction}'. Valid: {list(processing.STACK_REDUCTIONS)}"
+    images_paths = list_images(directory)
+    if not images_paths:
+        return "Error: No images found"
+    
+    if reduction in ("min", "max"):
+        # Order-independent: a running min/max needs no spill
+        result = processing.reduce_frames_running(iter_images(images_paths), reduction)
+    else:
+        # Median/percentile need every frame per pixel: spill decoded frames to
+        # a memory-mapped (N,H,W,C) stack and reduce it strip by strip
+        work_dir = tempfile.mkdtemp(prefix="stack_", dir=config.TILE_WORK_DIR)
+        try:
+            stack = None
+            for i, img in enumerate(iter_images(images_paths)):
+                if stack is None:
+                    stack = np.lib.format.open_memmap(
+                        os.path.join(work_dir, "frames.npy"), mode="w+", dtype=np.uint8,
+                        shape=(len(images_paths),) + img.shape
+                    )
+                if img.shape != stack.shape[1:]:
+                    img = cv2.resize(img, (stack.shape[2], stack.shape[1])).reshape(stack.shape[1:])
+                stack[i] = img
+            stack.flush()
+            result = processing.reduce_stack(stack, reduction, float(percentile), config.STACK_STRIP_BYTES)
+            del stack
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    suffix = f"p{float(percentile):g}" if reduction == "percentile" else reduction
+    dir_name = os.path.basename(os.path.normpath(directory))
+    dummy_path = os.path.join(directory, f"{dir_name}_stack.png")
+    return save_semantic_image(result, dummy_path, "stack_reduction", suffix)
@@ -1,20 +1,125 @@
 import os
 import cv2
-import json
-from .. import processing
-from .config import OPERATION_CATEGORY_MAP, BASE_OUTPUT_DIR
+import threading
+from collections import OrderedDict
+import numpy as np
+from .config import OPERATION_CATEGORY_MAP
+from .codecs import settle_artifacts, write_artifact
+from .reports import schedule_report
 
-def load_image(path):
-    if not os.path.exists(path):
+# Decoded-image LRU: abspath -> (size, mtime_ns, array). An entry is only
+# served while the file's size and mtime are unchanged; arrays are read-only
+# because every caller shares them. Bounded by config.IMAGE_CACHE_MAX_BYTES.
+_decoded = OrderedDict()
+_decoded_lock = threading.Lock()
+_decoded_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+
+def load_image(path, remember=True):
+    """
+    Decodes `path` (BGR uint8), reusing the cached array while the file is
+    unchanged. The result is read-only: copy it before modifying in place.
+    remember=False still serves cache hits but does not insert the decoded
+    frame (bulk streams, out-of-core loads), so it cannot evict the working set.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
         raise FileNotFoundError(f"Image not found: {path}")
+    key = os.path.abspath(path)
+    signature = (st.st_size, st.st_mtime_ns)
+    with _decoded_lock:
+        entry = _decoded.get(key)
+        if entry is not None and entry[:2] == signature:
+            _decoded.move_to_end(key)
+            _decoded_stats["hits"] += 1
+            return entry[2]
+        _decoded_stats["misses"] += 1
+    
     img = cv2.imread(path)
     if img is None:
         raise ValueError(f"Failed to load image: {path}")
+    img.flags.writeable = False
+    if remember:
+        _remember_decoded(key, signature, img)
     return img
 
+def _remember_decoded(key, signature, img):
+    from . import config
+    budget = int(config.IMAGE_CACHE_MAX_BYTES)
+    with _decoded_lock:
+        stale = _decoded.pop(key, None)
+        if stale is not None:
+            _decoded_stats["bytes"] -= stale[2].nbytes
+        if img.nbytes > budget:
+            return
+        _decoded[key] = signature + (img,)
+        _decoded_stats["bytes"] += img.nbytes
+        while _decoded_stats["bytes"] > budget:
+            _, (_, _, evicted) = _decoded.popitem(last=False)
+            _decoded_stats["bytes"] -= evicted.nbytes
+            _decoded_stats["evictions"] += 1
+
+def image_cache_stats():
+    from . import config
+    with _decoded_lock:
+        total = _decoded_stats["hits"] + _decoded_stats["misses"]
+        return {
+            "entries": len(_decoded),
+            "bytes": _decoded_stats["bytes"],
+            "max_bytes": int(config.IMAGE_CACHE_MAX_BYTES),
+            "hits": _decoded_stats["hits"],
+            "misses": _decoded_stats["misses"],
+            "evictions": _decoded_stats["evictions"],
+            "hit_rate": round(_decoded_stats["hits"] / total, 4) if total else 0.0
+        }
+
+def clear_image_cache():
+    with _decoded_lock:
+        _decoded.clear()
+        _decoded_stats["bytes"] = 0
+
+def load_image_mmap(path, buffer_path):
+    """
+    Loads an image as a read-only memory-mapped array, for out-of-core processing.
+    .npy inputs are mapped directly. Encoded formats are decoded once and
+    spilled to `buffer_path` so the decoded frame does not stay resident;
+    that decode still needs the full frame in RAM (only .npy inputs are
+    bounded end to end).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Image not found: {path}")
+    if path.lower().endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    img = load_image(path, remember=False)
+    buffer = np.lib.format.open_memmap(buffer_path, mode="w+", dtype=img.dtype, shape=img.shape)
+    buffer[:] = img
+    buffer.flush()
+    del img, buffer
+    return np.load(buffer_path, mmap_mode="r")
+
+def iter_images(paths, prefetch=4):
+    """
+    Yields decoded images for `paths` (any iterable) in order, decoding up to
+    `prefetch` files ahead on a thread pool. At most prefetch + 1 frames are
+    alive at once, however many paths there are.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    
+    prefetch = max(1, int(prefetch))
+    with ThreadPoolExecutor(max_workers=prefetch) as pool:
+        pending = deque()
+        for path in paths:
+            # Directory sweeps reuse cached frames but do not flood the cache
+            pending.append(pool.submit(load_image, path, False))
+            if len(pending) > prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
 def list_images(directory: str) -> list[str]:
     """Lists supported image files in a directory."""
-    exts = ('.jpg', '.jpeg', '.png', '.bmp', '.tif')
+    exts = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.webp')
     files = [os.path.join(directory, f) for f in os.listdir(directory) 
              if f.lower().endswith(exts)]
     return sorted(files)
@@ -26,13 +131,7 @@ def save_semantic_image(img, original_path, operation, suffix):
     """
     category = OPERATION_CATEGORY_MAP.get(operation, "Misc")
     
-    # Build output directory
-    # Note: BASE_OUTPUT_DIR is imported from config, make sure it's updated dynamically if needed.
-    # Actually, config.BASE_OUTPUT_DIR is a constant initialized at import.
-    # If configure_agent updates it, we need a way to access the updated value.
-    # Better pattern: getter/setter in config or simple global access.
-    # let's import the specific module to access its global variable dynamically?
-    # Or just use the imported one. Python modules are singletons.
+    # Build output directory (read at call time: configure_agent may change it)
     from . import config
     base_dir = config.BASE_OUTPUT_DIR
     
@@ -51,18 +150,17 @@ def save_semantic_image(img, original_path, operation, suffix):
         
     final_path = os.path.join(output_dir, new_name)
     
-    cv2.imwrite(final_path, img)
+    final_path = write_artifact(img, final_path, "result")
     
     # --- Generate Visual Report ---
+    # (rendered while the image is being written in write-behind modes)
+    report_path = None
     try:
         report_title = f"{operation} ({suffix})"
-        report_img = processing.generate_evaluation_plot(img, title=report_title)
-        
-        if report_img is not None:
-            report_name = f"{name}_{suffix}_REPORT{ext}" if suffix else f"{name}_REPORT{ext}"
-            report_path = os.path.join(output_dir, report_name)
-            cv2.imwrite(report_path, report_img)
+        report_name = f"{name}_{suffix}_REPORT{ext}" if suffix else f"{name}_REPORT{ext}"
+        report_path = schedule_report(img, os.path.join(output_dir, report_name), report_title)
     except Exception as e:
         print(f"Warning: Failed to generate report for {final_path}: {e}")
-        
+    
+    settle_artifacts([final_path, report_path])
     return final_path
@@ -1,6 +1,15 @@
 import json
 import os
+from .. import processing
 from . import config
+from .codecs import ARTIFACT_ROLES, OUTPUT_FORMATS, WRITE_MODES, flush_artifacts, output_stats, validate_policy
+from .io import image_cache_stats
+from .operations import get_operation, operations_schema
+from .preview import clear_previews, preview_stats
+from .reports import REPORT_MODES
+from .transport import TRANSPORT_CODECS
+from .result_cache import result_cache_stats, clear_result_cache
+from .transform import DAG_SOURCE
 
 def get_capabilities() -> dict:
     """
@@ -11,88 +20,158 @@ def get_capabilities() -> dict:
         "agent_version": "2.0.0 (Scientific/Traceable)",
         "supported_workflows": [
             "run_experiment (dynamic strategy comparison)",
-            "apply_pipeline (multi-step traceable transformation)",
-            "process_batch_pipeline (mass application)"
+            "search_parameters (coarse-to-fine tuning on a downscaled proxy, top settings confirmed at full resolution)",
+            "apply_pipeline (multi-step traceable transformation; a {\"nodes\": [...]} object runs a branching DAG with in-memory merges)",
+            "apply_pipeline_tiled (out-of-core pipeline for very large images)",
+            "process_batch_pipeline (mass application)",
+            "process_batch_parallel (process pool or decode/compute/write stream, structured per-image results)",
+            "compute_stack_reduction (temporal median/min/max/percentile over a directory)",
+            "apply_pipeline_array / apply_transformation_array (in-memory payloads, optional persistence)",
+            "preview_transformation / preview_pipeline / preview_experiment (downscaled pyramid level within a latency budget) + commit_preview (full resolution)"
         ],
-        "operations_schema": {
-            "gamma": {
-                "description": "Power-law transformation for brightness adjustment.",
-                "params": {"gamma": "float (0.1 - 3.0)"},
-                "syllabus_topic": "Topic 6"
-            },
-            "clahe": {
-                "description": "Contrast Limited Adaptive Histogram Equalization.",
-                "params": {"clip_limit": "float (1.0 - 4.0)"},
-                "syllabus_topic": "Topic 6"
-            },
-            "equalize": {
-                "description": "Global Histogram Equalization.",
-                "params": {},
-                "syllabus_topic": "Topic 6"
-            },
-            "log": {
-                "description": "Logarithmic transformation for expanding dark dynamic range.",
-                "params": {},
-                "syllabus_topic": "Topic 6"
-            },
-            "median": {
-                "description": "Median filter for salt-and-pepper noise reduction.",
-                "params": {"kernel_size": "int (odd: 3, 5, 7)"},
-                "syllabus_topic": "Topic 5"
-            },
-            "gaussian": {
-                "description": "Gaussian blur for general noise reduction.",
-                "params": {"kernel_size": "int (odd, default 5)", "sigma": "float (default 0=auto)"},
-                "syllabus_topic": "Topic 5"
-            },
-            "unsharp": {
-                "description": "Unsharp masking for edge enhancement.",
-                "params": {"sigma": "float (default 1.0)", "strength": "float (default 1.5)"},
-                "syllabus_topic": "Topic 6"
-            },
-            "noise_gaussian": {
-                "description": "Add Gaussian Noise (Thermal/Electronic simulation).",
-                "params": {"mean": "float (default 0)", "sigma": "float (default 25)"},
-                "syllabus_topic": "Topic 4"
-            },
-            "noise_salt_pepper": {
-                "description": "Add Salt & Pepper Noise (Impulsive simulation).",
-                "params": {"prob": "float (0.0 - 1.0, default 0.05)"},
-                "syllabus_topic": "Topic 4"
-            },
-            "sim_downsampling": {
-                "description": "Simulate resolution reduction (Aliasing).",
-                "params": {"factor": "float (0.1 - 1.0, default 0.5)"},
-                "syllabus_topic": "Topic 3"
-            },
-            "sim_quantization": {
-                "description": "Simulate bit-depth reduction (Posterization).",
-                "params": {"bits": "int (1-8, default 3)"},
-                "syllabus_topic": "Topic 3"
-            },
-            "arithmetic": {
-                "description": "Topic 6 Arithmetic Operations (Add, Sub, Mult, Div).",
-                "params": {"operation": "str (add, subtract, multiply, divide)", "image2_path": "str (absolute path)"},
-                "syllabus_topic": "Topic 6"
-            }
+        "transport": {
+            "codecs": list(TRANSPORT_CODECS),
+            "payload": "base64 of the raw format (b'DFRAW1' + ndim uint8 + shape uint32 LE + uint8 pixels) or of the encoded file",
+            "default_codec": "raw"
         },
+        "output_formats": {
+            "roles": list(ARTIFACT_ROLES),
+            "formats": list(OUTPUT_FORMATS),
+            "policies": config.OUTPUT_POLICIES,
+            "write_modes": list(WRITE_MODES)
+        },
+        "pipeline_dag": {
+            "format": '{"nodes": [{"id": "denoised", "input": "source", "steps": [...]}, {"id": "fused", "merge": ["denoised", "source"], "operation": "subtract", "steps": [...]}], "outputs": ["fused"]}',
+            "source": DAG_SOURCE,
+            "merge_operations": list(get_operation("arithmetic").params["operation"].choices),
+            "default_outputs": "nodes no other node reads"
+        },
+        # Generated from the operation registry: the advertised schema is what runs
+        "operations_schema": operations_schema(),
         "output_structure": {
             "experiments": "{base}/Experiments/{image_name}_{timestamp}/",
             "pipelines": "{base}/Pipelines/{image_name}_{timestamp}_Flow/"
         }
     }
 
+def get_cache_stats() -> dict:
+    """
+    Hit/miss counters of the agent's caches, to check they are effective.
+    resources: pooled CLAHE objects and point-operation tables (processing).
+    results:   content-addressed transformation / pipeline / experiment results.
+    images:    decoded input images (load_image), keyed by path, size and mtime.
+    previews:  preview pyramids, preview count and the cost model picking levels.
+    """
+    return {
+        "images": image_cache_stats(),
+        "previews": preview_stats(),
+        "resources": processing.resource_cache_stats(),
+        "results": result_cache_stats()
+    }
+
+def get_output_stats() -> dict:
+    """
+    Artifact writing per role (result, intermediate, report): active policy,
+    files and bytes written, and time spent encoding and writing.
+    """
+    return output_stats()
+
 def configure_agent(config_json: str) -> dict:
     """
-    Updates the agent's runtime configuration.
+    Updates the agent's runtime configuration. Every key is validated before
+    any is applied: a rejected call changes nothing.
     """
     try:
         conf = json.loads(config_json)
-        if "base_output_dir" in conf:
-            new_dir = conf["base_output_dir"]
-            os.makedirs(new_dir, exist_ok=True)
-            config.BASE_OUTPUT_DIR = new_dir
-            return {"status": "success", "message": f"Output directory updated to {config.BASE_OUTPUT_DIR}"}
+        updates = _validate_configuration(conf)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+    try:
+        messages = []
+        # Clears act on the current output directory, before it can change
+        if conf.get("clear_result_cache"):
+            removed = clear_result_cache()
+            messages.append(f"Result cache cleared ({removed} records on disk)")
+        if conf.get("clear_previews"):
+            clear_previews()
+            messages.append("Preview pyramids cleared")
+        for name, value, message in updates:
+            if name == "ARTIFACT_WRITE_MODE" and value == "sync":
+                # Nothing may stay queued once writes are synchronous again
+                flush_artifacts()
+            setattr(config, name, value)
+            messages.append(message)
+        if messages:
+            return {"status": "success", "message": "; ".join(messages)}
         return {"status": "ignored", "message": "No valid configuration keys found"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+def _validate_configuration(conf):
+    """
+    (config attribute, value, message) for every setting in `conf`, in order.
+    Raises on the first invalid key, before anything is applied.
+    """
+    if not isinstance(conf, dict):
+        raise ValueError("Configuration must be a JSON object")
+    updates = []
+    if "report_backend" in conf:
+        backend = conf["report_backend"]
+        if backend not in processing.REPORT_BACKENDS:
+            raise ValueError(f"Unknown report backend: {backend}. Valid: {list(processing.REPORT_BACKENDS)}")
+        updates.append(("REPORT_BACKEND", backend, f"Report backend set to {backend}"))
+    if "report_mode" in conf:
+        mode = conf["report_mode"]
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unknown report mode: {mode}. Valid: {list(REPORT_MODES)}")
+        updates.append(("REPORT_MODE", mode, f"Report mode set to {mode}"))
+    if "report_max_pending" in conf:
+        max_pending = int(conf["report_max_pending"])
+        if max_pending < 1:
+            raise ValueError("report_max_pending must be >= 1")
+        updates.append(("REPORT_MAX_PENDING", max_pending, f"Pending report limit set to {max_pending}"))
+    if "image_cache_max_bytes" in conf:
+        max_bytes = int(conf["image_cache_max_bytes"])
+        if max_bytes < 0:
+            raise ValueError("image_cache_max_bytes must be >= 0")
+        updates.append(("IMAGE_CACHE_MAX_BYTES", max_bytes, f"Image cache limit set to {max_bytes} bytes"))
+    if "result_cache" in conf:
+        enabled = bool(conf["result_cache"])
+        updates.append(("RESULT_CACHE_ENABLED", enabled, f"Result cache {'enabled' if enabled else 'disabled'}"))
+    if "output_policies" in conf:
+        policies = {role: validate_policy(role, policy) for role, policy in conf["output_policies"].items()}
+        updates.append(("OUTPUT_POLICIES", {**config.OUTPUT_POLICIES, **policies}, f"Output policies set for {', '.join(policies)}"))
+    if "artifact_write_mode" in conf:
+        mode = conf["artifact_write_mode"]
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown artifact write mode: {mode}. Valid: {list(WRITE_MODES)}")
+        updates.append(("ARTIFACT_WRITE_MODE", mode, f"Artifact write mode set to {mode}"))
+    if "artifact_write_max_pending_bytes" in conf:
+        max_bytes = int(conf["artifact_write_max_pending_bytes"])
+        if max_bytes < 0:
+            raise ValueError("artifact_write_max_pending_bytes must be >= 0")
+        updates.append(("ARTIFACT_WRITE_MAX_PENDING_BYTES", max_bytes, f"Artifact write queue limit set to {max_bytes} bytes"))
+    for key, name in (("batch_workers", "BATCH_WORKERS"), ("experiment_workers", "EXPERIMENT_WORKERS"), ("pipeline_workers", "PIPELINE_WORKERS")):
+        if key in conf:
+            workers = int(conf[key])
+            if workers < 0:
+                raise ValueError(f"{key} must be >= 0 (0 = one per core)")
+            label = key.split("_")[0].capitalize()
+            updates.append((name, workers, f"{label} workers set to {workers or 'one per core'}"))
+    if "preview_max_side" in conf:
+        max_side = int(conf["preview_max_side"])
+        if max_side < 1:
+            raise ValueError("preview_max_side must be >= 1")
+        updates.append(("PREVIEW_MAX_SIDE", max_side, f"Preview size limit set to {max_side} px"))
+    if "preview_budget_ms" in conf:
+        budget = float(conf["preview_budget_ms"])
+        if budget <= 0:
+            raise ValueError("preview_budget_ms must be > 0")
+        updates.append(("PREVIEW_BUDGET_MS", budget, f"Preview latency budget set to {budget} ms"))
+    if "base_output_dir" in conf:
+        new_dir = conf["base_output_dir"]
+        # Creating the directory is the check that it is usable
+        os.makedirs(new_dir, exist_ok=True)
+        updates.append(("BASE_OUTPUT_DIR", new_dir, f"Output directory updated to {new_dir}"))
+    return updates
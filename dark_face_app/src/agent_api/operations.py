@@ -0,0 +1,355 @@
+
+import os
+from collections import namedtuple
+import cv2
+from .. import processing
+from .io import load_image
+
+# Operation registry: single source of truth for what a pipeline step can be.
+# Each entry declares its parameter schema (type, default), its kind and cost,
+# and how to prebuild it once per pipeline:
+#   kind: 'point'        output pixel depends only on the same input pixel
+#         'neighborhood' output depends on a window around the pixel (halo)
+#         'global'       output depends on image-wide data (histograms, resize, operands)
+#   cost: 'low' | 'medium' | 'high' (relative, per pixel)
+
+PARAM_TYPES = ("float", "int", "bool", "str", "seed", "path")
+
+# type: one of PARAM_TYPES; default None + required=True means it must be given
+Param = namedtuple("Param", "type default doc required choices", defaults=("", False, None))
+
+class Operation:
+    """
+    Registry entry. `build(params)` receives validated params (defaults filled)
+    and returns a callable image -> image with all reusable resources prebuilt.
+    Point ops may also provide `lut(params)`, a 256-entry table; consecutive
+    LUT ops are fused into a single cv2.LUT pass.
+    Neighborhood ops whose params are in pixels provide `scale(params, factor)`,
+    the equivalent params on an image resized by `factor` (proxies, previews).
+    """
+    def __init__(self, name, kind, cost, description, topic, params=None, build=None, lut=None,
+                 halo=None, suffix=None, category=None, cached_views=False, stochastic=False, scale=None):
+        self.name = name
+        self.kind = kind
+        self.cost = cost
+        self.description = description
+        self.topic = topic
+        self.params = params or {}
+        self.lut = lut
+        self.halo = halo
+        self._build = build
+        self._suffix = suffix
+        self._category = category
+        # Reads CachedImage views (LAB, YCrCb, histograms) when given a wrapper
+        self.cached_views = cached_views
+        # Random output unless a 'seed' param is given (results cannot be cached)
+        self.stochastic = stochastic
+        self.scale = scale
+
+    def build(self, params):
+        if self._build is not None:
+            return self._build(params)
+        table = self.lut(params)
+        return lambda image: cv2.LUT(image, table)
+
+    def output_name(self, raw_params):
+        """(category operation, file suffix) used by apply_transformation."""
+        category = self._category(raw_params) if self._category else self.name
+        suffix = self._suffix(raw_params) if self._suffix else self.name
+        return category, suffix
+
+    def schema(self):
+        return {
+            "description": self.description,
+            "params": {name: _describe_param(p) for name, p in self.params.items()},
+            "kind": self.kind,
+            "cost": self.cost,
+            "syllabus_topic": self.topic
+        }
+
+OPERATIONS = {}
+
+def register_operation(operation):
+    OPERATIONS[operation.name] = operation
+    return operation
+
+def get_operation(op):
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {op}")
+    return OPERATIONS[op]
+
+def validate_params(op, params):
+    """
+    Checks `params` against the schema of `op` and returns a new dict with
+    every declared parameter cast to its type (defaults filled in, also for
+    explicit nulls).
+    Undeclared keys are ignored, as they always were: existing callers and
+    saved pipelines may carry extra or misspelled keys.
+    """
+    spec = get_operation(op)
+    params = params or {}
+    if not isinstance(params, dict):
+        raise ValueError(f"Params for '{op}' must be an object, got: {params!r}")
+
+    values = {}
+    for name, param in spec.params.items():
+        value = params.get(name)
+        if value is None:
+            # Missing and explicit null both take the default
+            value = param.default
+        if value is None:
+            if param.required:
+                raise ValueError(f"Operation '{op}' requires parameter '{name}'")
+            values[name] = None
+            continue
+        try:
+            value = _CASTS[param.type](value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for '{op}.{name}' ({param.type} expected): {value!r}")
+        if param.choices and value not in param.choices:
+            raise ValueError(f"Invalid value for '{op}.{name}': {value!r}. Valid: {list(param.choices)}")
+        values[name] = value
+    return values
+
+def scale_steps(steps, factor):
+    """
+    Steps with validated params adapted to an image resized by `factor`:
+    pixel-sized params (kernel sizes, sigmas) shrink with the image so a
+    downscaled run approximates the full-resolution one.
+    """
+    scaled = []
+    for step in steps:
+        op = step.get("op")
+        params = validate_params(op, step.get("params", {}))
+        spec = OPERATIONS[op]
+        if spec.scale is not None and factor != 1.0:
+            params = spec.scale(params, factor)
+        scaled.append({"op": op, "params": params})
+    return scaled
+
+def operations_schema():
+    """Capabilities schema generated from the registry."""
+    return {name: spec.schema() for name, spec in OPERATIONS.items()}
+
+def kernel_radius(kernel_size):
+    """Radius actually used by apply_median_filter / apply_gaussian_filter."""
+    k = int(kernel_size)
+    if k < 3:
+        return 0
+    if k % 2 == 0:
+        k += 1
+    return k // 2
+
+def _to_bool(value):
+    if isinstance(value, str):
+        if value.strip().lower() in ("true", "1", "yes"):
+            return True
+        if value.strip().lower() in ("false", "0", "no", ""):
+            return False
+        raise ValueError(value)
+    return bool(value)
+
+def _to_seed(value):
+    # Ints (or int-like strings) seed a generator; sequences (e.g. the per-tile
+    # [seed, y, x] used by tiling) are passed through to numpy as entropy
+    if isinstance(value, (list, tuple)):
+        return [int(v) for v in value]
+    return int(value)
+
+_CASTS = {"float": float, "int": int, "bool": _to_bool, "str": str, "seed": _to_seed, "path": str}
+
+def _describe_param(param):
+    details = []
+    if param.required:
+        details.append("required")
+    elif param.default is None:
+        details.append("optional")
+    if param.choices:
+        details.append(", ".join(param.choices))
+    if param.doc:
+        details.append(param.doc)
+    if param.default is not None:
+        details.append(f"default {str(param.default).lower() if param.type == 'bool' else param.default}")
+    type_name = {"seed": "int", "path": "str"}.get(param.type, param.type)
+    return f"{type_name} ({', '.join(details)})" if details else type_name
+
+def _scale_kernel(kernel_size, factor):
+    """Odd kernel with the radius scaled by `factor` (1 = no filtering)."""
+    return 2 * int(round(kernel_radius(kernel_size) * factor)) + 1
+
+def _scale_gaussian(params, factor):
+    k = params["kernel_size"]
+    # sigma 0 is derived from the kernel size by OpenCV: scale the derived value
+    sigma = params["sigma"] or (0.3 * ((k - 1) * 0.5 - 1) + 0.8 if k >= 3 else 0.0)
+    return dict(params, kernel_size=_scale_kernel(k, factor), sigma=sigma * factor)
+
+def _prefixed_suffix(prefix, key, fmt):
+    """Suffix of noise_* / sim_* ops: the short name plus the key param when given."""
+    def suffix(raw):
+        return fmt.format(name=prefix, value=raw[key]) if key in raw else prefix
+    return suffix
+
+def _build_clahe(params):
+    # CLAHE objects come from processing's shared pool: reused across images and
+    # plans, never used by two threads at once
+    clip_limit, grid = params["clip_limit"], params["tile_grid_size"]
+    return lambda image: processing.apply_clahe(image, clip_limit=clip_limit, tile_grid_size=grid)
+
+def _build_arithmetic(params):
+    img2_path = params["image2_path"]
+    if not img2_path or not os.path.exists(img2_path):
+        raise ValueError(f"Arithmetic op requires valid 'image2_path'. Got: {img2_path}")
+    operation = params["operation"]
+    # Second operand decoded on first use, then shared by every image of the plan
+    operand = []
+    def run(image):
+        if not operand:
+            try:
+                operand.append(load_image(img2_path))
+            except Exception:
+                raise ValueError(f"Could not load image2 from {img2_path}")
+        return processing.apply_arithmetic_ops(image, operand[0], operation=operation)
+    return run
+
+# --- Topic 6: point operations (fused into LUTs) ---
+
+register_operation(Operation(
+    "gamma", "point", "low",
+    "Power-law transformation for brightness adjustment.", "Topic 6",
+    params={"gamma": Param("float", 1.0, "0.1 - 3.0")},
+    lut=lambda p: processing.build_gamma_lut(p["gamma"]),
+    suffix=lambda raw: f"gamma{raw.get('gamma', 1.0)}"
+))
+register_operation(Operation(
+    "log", "point", "low",
+    "Logarithmic transformation for expanding dark dynamic range.", "Topic 6",
+    params={"c": Param("float", 1.0, "scales the auto-normalized curve")},
+    lut=lambda p: processing.build_log_lut(p["c"])
+))
+register_operation(Operation(
+    "negative", "point", "low",
+    "Negative transformation T(u) = 255 - u.", "Topic 6",
+    lut=lambda p: processing.build_negative_lut()
+))
+register_operation(Operation(
+    "stretch", "point", "low",
+    "Fixed-range linear stretch mapping [in_low, in_high] to [0, 255].", "Topic 6",
+    params={"in_low": Param("float", 0.0), "in_high": Param("float", 255.0)},
+    lut=lambda p: processing.build_stretch_lut(p["in_low"], p["in_high"])
+))
+
+# --- Topic 6: histogram-based enhancement ---
+
+register_operation(Operation(
+    "clahe", "neighborhood", "medium",
+    "Contrast Limited Adaptive Histogram Equalization.", "Topic 6",
+    params={"clip_limit": Param("float", 2.0, "1.0 - 4.0"), "tile_grid_size": Param("int", 8, "tiles per side")},
+    build=_build_clahe,
+    suffix=lambda raw: f"clahe{raw.get('clip_limit', 2.0)}",
+    cached_views=True
+))
+register_operation(Operation(
+    "equalize", "global", "low",
+    "Global Histogram Equalization.", "Topic 6",
+    build=lambda p: processing.apply_equalization,
+    cached_views=True
+))
+register_operation(Operation(
+    "contrast_stretching", "global", "low",
+    "Percentile-based linear stretch (histogram cut points, single LUT pass).", "Topic 6",
+    params={
+        "low_percentile": Param("float", 2.0),
+        "high_percentile": Param("float", 98.0),
+        "link_channels": Param("bool", False, "true = luminance cut points for all channels")
+    },
+    build=lambda p: lambda image: processing.apply_contrast_stretching(
+        image, p["low_percentile"], p["high_percentile"], link_channels=p["link_channels"]),
+    cached_views=True
+))
+register_operation(Operation(
+    "unsharp", "neighborhood", "medium",
+    "Unsharp masking for edge enhancement.", "Topic 6",
+    params={"sigma": Param("float", 1.0), "strength": Param("float", 1.5)},
+    build=lambda p: lambda image: processing.apply_unsharp_mask(image, p["sigma"], p["strength"]),
+    halo=lambda p: processing.unsharp_radius(p["sigma"]),
+    scale=lambda p, factor: dict(p, sigma=p["sigma"] * factor),
+    suffix=lambda raw: f"unsharp{raw.get('strength', 1.5)}"
+))
+
+# --- Topic 5: filtering ---
+
+register_operation(Operation(
+    "median", "neighborhood", "medium",
+    "Median filter for salt-and-pepper noise reduction.", "Topic 5",
+    params={"kernel_size": Param("int", 3, "odd: 3, 5, 7")},
+    build=lambda p: lambda image: processing.apply_median_filter(image, p["kernel_size"]),
+    halo=lambda p: kernel_radius(p["kernel_size"]),
+    scale=lambda p, factor: dict(p, kernel_size=_scale_kernel(p["kernel_size"], factor)),
+    suffix=lambda raw: f"median{raw.get('kernel_size', 3)}"
+))
+register_operation(Operation(
+    "gaussian", "neighborhood", "medium",
+    "Gaussian blur for general noise reduction.", "Topic 5",
+    params={"kernel_size": Param("int", 5, "odd"), "sigma": Param("float", 0.0, "0=auto")},
+    build=lambda p: lambda image: processing.apply_gaussian_filter(image, p["kernel_size"], p["sigma"]),
+    halo=lambda p: kernel_radius(p["kernel_size"]),
+    scale=_scale_gaussian,
+    suffix=lambda raw: f"gauss{raw.get('kernel_size', 5)}"
+))
+
+# --- Topic 4: noise models ---
+
+register_operation(Operation(
+    "noise_gaussian", "point", "medium",
+    "Add Gaussian Noise (Thermal/Electronic simulation).", "Topic 4",
+    params={
+        "mean": Param("float", 0.0),
+        "sigma": Param("float", 25.0),
+        "seed": Param("seed", None, "reproducible noise")
+    },
+    build=lambda p: lambda image: processing.add_gaussian_noise(image, p["mean"], p["sigma"], seed=p["seed"]),
+    stochastic=True,
+    suffix=_prefixed_suffix("gaussian", "sigma", "{name}_sigma{value}")
+))
+register_operation(Operation(
+    "noise_salt_pepper", "point", "medium",
+    "Add Salt & Pepper Noise (Impulsive simulation).", "Topic 4",
+    params={
+        "prob": Param("float", 0.05, "0.0 - 1.0"),
+        "seed": Param("seed", None, "reproducible noise")
+    },
+    build=lambda p: lambda image: processing.add_salt_pepper_noise(image, p["prob"], seed=p["seed"]),
+    stochastic=True,
+    suffix=_prefixed_suffix("salt_pepper", "prob", "{name}_prob{value}")
+))
+
+# --- Topic 3: digitization ---
+
+register_operation(Operation(
+    "sim_downsampling", "global", "low",
+    "Simulate resolution reduction (Aliasing).", "Topic 3",
+    params={"factor": Param("float", 0.5, "0.1 - 1.0")},
+    build=lambda p: lambda image: processing.simulate_downsampling(image, p["factor"]),
+    suffix=_prefixed_suffix("downsampling", "factor", "{name}_{value}")
+))
+register_operation(Operation(
+    "sim_quantization", "point", "low",
+    "Simulate bit-depth reduction (Posterization).", "Topic 3",
+    params={"bits": Param("int", 3, "1-8")},
+    lut=lambda p: processing.build_quantization_lut(p["bits"]),
+    suffix=_prefixed_suffix("quantization", "bits", "{name}_{value}bits")
+))
+
+# --- Topic 6: arithmetic ---
+
+register_operation(Operation(
+    "arithmetic", "global", "medium",
+    "Topic 6 Arithmetic Operations (Add, Sub, Mult, Div).", "Topic 6",
+    params={
+        "operation": Param("str", "add", choices=("add", "subtract", "multiply", "divide")),
+        "image2_path": Param("path", None, "absolute path", required=True)
+    },
+    build=_build_arithmetic,
+    suffix=lambda raw: raw.get("operation", "arithmetic"),
+    category=lambda raw: raw.get("operation", "arithmetic")
+))
@@ -0,0 +1,293 @@
+
+import base64
+import binascii
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import cv2
+from .. import processing
+from . import config
+from .io import load_image
+from .operations import scale_steps
+from .transform import apply_transformation, compile_candidates, compile_dag, compile_steps
+from .transport import TRANSPORT_CODECS, encode_image
+from .workflows import _candidate_metrics, _experiment_workers, _parse_candidates, _pipeline_workers, _score_image, _verdict, apply_pipeline, run_experiment
+
+# Interactive previews: requests run on a level of a Gaussian pyramid of the
+# input (cv2.pyrDown, cached per path / size / mtime) instead of the full
+# image, with neighborhood parameters scaled to the level (operations.scale_steps),
+# and return an in-memory payload without artifacts or reports. The level is
+# the largest one within PREVIEW_MAX_SIDE whose predicted cost fits
+# PREVIEW_BUDGET_MS. Every preview carries a commit token: commit_preview(token)
+# renders the same request at full resolution through the regular endpoint.
+PREVIEW_KINDS = ("transform", "pipeline", "experiment")
+
+# abspath -> (size, mtime_ns, full shape, [level 1, level 2, ...])
+_pyramids = OrderedDict()
+_lock = threading.Lock()
+_stats = {"pyramid_hits": 0, "pyramid_misses": 0, "previews": 0, "over_budget": 0}
+# Moving average of the preview cost, in ms per megapixel per step
+_cost = {"ms_per_mpix_step": None}
+_COST_SMOOTHING = 0.3
+
+def preview_transformation(image_path: str, operation: str, params: str = "{}", codec: str = "jpg") -> dict:
+    """
+    apply_transformation on a downscaled copy of the image, within the
+    interactive latency budget. Returns the preview as a base64 payload and a
+    commit token for commit_preview.
+    """
+    try:
+        parameters = json.loads(params) if isinstance(params, str) else dict(params or {})
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON params"}
+    steps = [{"op": operation, "params": parameters}]
+    return _preview_steps(image_path, steps, codec, ("transform", {"operation": operation, "params": parameters}))
+
+def preview_pipeline(image_path: str, steps_json: str, codec: str = "jpg") -> dict:
+    """
+    apply_pipeline on a downscaled copy: final image only, no intermediates.
+    DAG pipelines return their first output.
+    """
+    try:
+        steps = json.loads(steps_json) if isinstance(steps_json, str) else steps_json
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON"}
+    return _preview_steps(image_path, steps, codec, ("pipeline", {"steps": steps}))
+
+def preview_experiment(image_path: str, candidates_json: str = None, codec: str = "jpg") -> dict:
+    """
+    run_experiment on a downscaled copy: proxy metrics and a preview image per
+    candidate, ranked like the full experiment. Nothing is written to disk.
+    Candidates that fail are skipped (as in run_experiment) and listed
+    under "failed".
+    """
+    try:
+        candidates = _parse_candidates(candidates_json)
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON in candidates definition"}
+    if codec not in TRANSPORT_CODECS:
+        return {"error": f"Unknown codec: {codec}. Valid: {list(TRANSPORT_CODECS)}"}
+
+    start = time.perf_counter()
+    try:
+        level, index, factor, full_shape = _select_level(image_path, sum(len(c[1]) for c in candidates))
+        source = processing.CachedImage(level)
+        orig = _score_image(source)
+    except (ValueError, OSError) as e:
+        return {"error": str(e)}
+
+    # Scaled one by one: an invalid candidate fails alone
+    errors = {}
+    runnable = []
+    for i, candidate in enumerate(candidates):
+        try:
+            runnable.append((i, scale_steps(candidate[1], factor)))
+        except (AttributeError, TypeError, ValueError) as e:
+            errors[i] = str(e)
+    computing = time.perf_counter()
+    plan = compile_candidates([steps for _, steps in runnable])
+    plan_outputs, plan_errors, execution = plan.run(source, _experiment_workers())
+    _record_cost(level, execution["step_executions"], (time.perf_counter() - computing) * 1000)
+    outputs = {}
+    for (i, _), output in zip(runnable, plan_outputs):
+        outputs[i] = output
+    for j, message in plan_errors.items():
+        errors[runnable[j][0]] = message
+
+    results = []
+    for i, candidate in enumerate(candidates):
+        if i in errors:
+            continue
+        metrics = _candidate_metrics(_score_image(outputs[i]), orig)
+        results.append({
+            "strategy": candidate[0],
+            "metrics": metrics,
+            "verdict": _verdict(metrics["delta_snr"]),
+            "image": base64.b64encode(encode_image(processing.as_array(outputs[i]), codec)).decode("ascii")
+        })
+    results.sort(key=lambda x: x["metrics"]["delta_snr"], reverse=True)
+
+    response = _preview_info(level, index, factor, full_shape, start)
+    response["codec"] = codec
+    response.update({
+        "best_strategy": results[0]["strategy"] if results else "None",
+        "results": results,
+        "failed": [{"strategy": candidates[i][0], "error": errors[i]} for i in sorted(errors)],
+        "commit_token": _commit_token("experiment", image_path, {"candidates_json": candidates_json})
+    })
+    return response
+
+def commit_preview(token: str) -> dict:
+    """
+    Renders a previewed request at full resolution with the regular endpoint
+    (artifacts, reports, result cache). Returns {"kind", "result"}.
+    """
+    try:
+        request = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        kind, image_path, args = request["kind"], request["image_path"], request["args"]
+    except (AttributeError, binascii.Error, ValueError, KeyError, TypeError):
+        return {"error": "Invalid commit token"}
+
+    if kind == "transform":
+        result = apply_transformation(image_path, args["operation"], json.dumps(args["params"]))
+    elif kind == "pipeline":
+        result = apply_pipeline(image_path, json.dumps(args["steps"]))
+    elif kind == "experiment":
+        result = run_experiment(image_path, args["candidates_json"])
+    else:
+        return {"error": f"Unknown preview kind: {kind}. Valid: {list(PREVIEW_KINDS)}"}
+    return {"kind": kind, "result": result}
+
+def preview_array(image_path, steps):
+    """
+    Preview of `steps` (a list, or a DAG spec) as an ndarray, for in-process
+    callers (the UI). Returns (image, info) where info is the preview
+    response without payload. Raises ValueError / OSError.
+    """
+    if not isinstance(steps, (list, dict)):
+        raise ValueError(f"Steps must be a list or a DAG object, got: {type(steps).__name__}")
+    if isinstance(steps, list) and not all(isinstance(step, dict) for step in steps):
+        raise ValueError("Every pipeline step must be an object")
+    start = time.perf_counter()
+    count = _step_count(steps)
+    level, index, factor, full_shape = _select_level(image_path, count)
+    computing = time.perf_counter()
+    if isinstance(steps, dict):
+        plan = compile_dag(steps, factor)
+        outputs, _ = plan.run(processing.CachedImage(level), _pipeline_workers())
+        result = outputs[plan.outputs[0]]
+    else:
+        result = compile_steps(scale_steps(steps, factor)).run(processing.CachedImage(level))
+    _record_cost(level, count, (time.perf_counter() - computing) * 1000)
+    return result, _preview_info(level, index, factor, full_shape, start)
+
+def preview_pyramid(image_path):
+    """
+    (full shape, [level 1, level 2, ...]): Gaussian pyramid of the image below
+    full resolution, each level half the size of the previous one, down to
+    PREVIEW_MIN_SIDE. Cached by path, size and mtime (PREVIEW_CACHE_ENTRIES inputs).
+    """
+    try:
+        st = os.stat(image_path)
+    except OSError:
+        raise FileNotFoundError(f"Image not found: {image_path}")
+    key = os.path.abspath(image_path)
+    signature = (st.st_size, st.st_mtime_ns)
+    with _lock:
+        entry = _pyramids.get(key)
+        if entry is not None and entry[:2] == signature:
+            _pyramids.move_to_end(key)
+            _stats["pyramid_hits"] += 1
+            return entry[2:]
+        _stats["pyramid_misses"] += 1
+
+    levels = []
+    current = load_image(image_path)
+    full_shape = current.shape
+    while max(current.shape[:2]) > config.PREVIEW_MIN_SIDE:
+        current = cv2.pyrDown(current)
+        current.setflags(write=False)
+        levels.append(current)
+
+    with _lock:
+        _pyramids[key] = signature + (full_shape, levels)
+        _pyramids.move_to_end(key)
+        while len(_pyramids) > max(0, int(config.PREVIEW_CACHE_ENTRIES)):
+            _pyramids.popitem(last=False)
+    return full_shape, levels
+
+def preview_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["pyramids"] = len(_pyramids)
+        rate = _cost["ms_per_mpix_step"]
+    stats["ms_per_mpix_step"] = None if rate is None else round(rate, 3)
+    stats["max_side"] = config.PREVIEW_MAX_SIDE
+    stats["budget_ms"] = config.PREVIEW_BUDGET_MS
+    return stats
+
+def clear_previews():
+    with _lock:
+        _pyramids.clear()
+
+def _preview_steps(image_path, steps, codec, commit):
+    if codec not in TRANSPORT_CODECS:
+        return {"error": f"Unknown codec: {codec}. Valid: {list(TRANSPORT_CODECS)}"}
+    try:
+        result, info = preview_array(image_path, steps)
+        payload = encode_image(result, codec)
+    except (ValueError, OSError) as e:
+        return {"error": str(e)}
+    info["image"] = base64.b64encode(payload).decode("ascii")
+    info["shape"] = list(result.shape)
+    info["codec"] = codec
+    info["commit_token"] = _commit_token(commit[0], image_path, commit[1])
+    return info
+
+def _select_level(image_path, steps_count):
+    """
+    (image, level index, scale factor, full shape) to preview on: the largest
+    level within PREVIEW_MAX_SIDE whose predicted cost fits the budget (the
+    smallest level when none does). Level 0 is the full image.
+    """
+    full_shape, levels = preview_pyramid(image_path)
+    candidates = [(index + 1, level) for index, level in enumerate(levels) if max(level.shape[:2]) <= config.PREVIEW_MAX_SIDE]
+    if max(full_shape[:2]) <= config.PREVIEW_MAX_SIDE:
+        candidates.insert(0, (0, None))
+    if not candidates:
+        candidates = [(len(levels), levels[-1] if levels else None)]
+
+    with _lock:
+        rate = _cost["ms_per_mpix_step"]
+    chosen = candidates[-1]
+    for index, level in candidates:
+        shape = full_shape if level is None else level.shape
+        if rate is None or rate * shape[0] * shape[1] / 1e6 * max(1, steps_count) <= config.PREVIEW_BUDGET_MS:
+            chosen = (index, level)
+            break
+
+    index, level = chosen
+    if level is None:
+        level = load_image(image_path)
+    # pyrDown rounds odd sizes up: the exact ratio of the widths
+    return level, index, level.shape[1] / float(full_shape[1]), full_shape
+
+def _step_count(steps):
+    """Steps a pipeline runs (DAG merges count as one), for the cost model."""
+    if isinstance(steps, dict):
+        nodes = steps.get("nodes")
+        if not isinstance(nodes, list):
+            return 1
+        return sum(len(node.get("steps") or []) + ("merge" in node) for node in nodes if isinstance(node, dict))
+    return len(steps)
+
+def _record_cost(level, steps_count, compute_ms):
+    """Updates the cost model used to pick the next preview levels."""
+    mpix = level.shape[0] * level.shape[1] / 1e6
+    if mpix <= 0 or steps_count <= 0:
+        return
+    sample = compute_ms / (mpix * steps_count)
+    with _lock:
+        rate = _cost["ms_per_mpix_step"]
+        _cost["ms_per_mpix_step"] = sample if rate is None else rate + _COST_SMOOTHING * (sample - rate)
+
+def _preview_info(level, index, factor, full_shape, start):
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _lock:
+        _stats["previews"] += 1
+        if elapsed_ms > config.PREVIEW_BUDGET_MS:
+            _stats["over_budget"] += 1
+    return {
+        "full_shape": list(full_shape),
+        "level": index,
+        "scale": round(factor, 4),
+        "elapsed_ms": round(elapsed_ms, 3),
+        "budget_ms": config.PREVIEW_BUDGET_MS
+    }
+
+def _commit_token(kind, image_path, args):
+    # Stateless: the token is the request itself
+    request = json.dumps({"kind": kind, "image_path": image_path, "args": args}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(request.encode()).decode("ascii")
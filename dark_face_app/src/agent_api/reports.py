@@ -0,0 +1,132 @@
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .. import processing
+from . import config
+from .codecs import artifact_path, ensure_artifact, write_artifact
+
+REPORT_MODES = ("sync", "deferred", "lazy")
+
+# Report jobs not rendered yet: report_path -> (img, title)
+_jobs = OrderedDict()
+# Reports currently being rendered: report_path -> Event
+_in_progress = {}
+_lock = threading.Lock()
+_executor = None
+# Jobs submitted to the pool and not finished; bounded by the current REPORT_MAX_PENDING
+_queued = 0
+
+def write_report(img, report_path, title):
+    """
+    Renders the evaluation report for `img` with the configured backend
+    (config.REPORT_BACKEND) and writes it to `report_path` (extension set by
+    the "report" output policy).
+    """
+    report_img = processing.generate_evaluation_plot(img, title=title, backend=config.REPORT_BACKEND)
+    if report_img is not None:
+        report_path = write_artifact(report_img, report_path, "report")
+    return report_path
+
+def schedule_report(img, report_path, title):
+    """
+    Produces the report for `img` according to config.REPORT_MODE:
+      - sync:     rendered now, in the calling thread.
+      - deferred: queued on a bounded background pool; if the queue is full the
+                  job waits to be rendered on demand (ensure_report).
+      - lazy:     only rendered when first requested through ensure_report.
+    Returns the report path (the file may not exist yet outside sync mode).
+    """
+    report_path = artifact_path(report_path, "report")
+    if config.REPORT_MODE == "sync":
+        return write_report(img, report_path, title)
+
+    overflow = None
+    with _lock:
+        _jobs[report_path] = (img, title)
+        _jobs.move_to_end(report_path)
+        # Pending jobs keep their image alive: bound how many can wait
+        if len(_jobs) > config.REPORT_MAX_PENDING:
+            overflow = next(iter(_jobs))
+    if overflow is not None:
+        # Backpressure: the oldest job is rendered by the caller
+        _render_job(overflow)
+
+    if config.REPORT_MODE == "deferred" and _reserve_slot():
+        _get_executor().submit(_background_render, report_path)
+    return report_path
+
+def ensure_report(report_path):
+    """
+    Makes sure a (possibly deferred) report exists on disk, rendering it now
+    if it is still pending. Returns the path, or None if no report is known.
+    """
+    _render_job(report_path)
+    # The rendered image may still be queued in the artifact writer
+    return ensure_artifact(report_path)
+
+def flush_reports():
+    """Renders every pending report. Returns how many were rendered here."""
+    with _lock:
+        paths = list(_jobs.keys())
+    rendered = 0
+    for path in paths:
+        rendered += int(_render_job(path))
+    return rendered
+
+def report_status() -> dict:
+    with _lock:
+        return {
+            "mode": config.REPORT_MODE,
+            "pending": len(_jobs),
+            "rendering": len(_in_progress)
+        }
+
+def _render_job(report_path):
+    """Renders the job for `report_path` once; concurrent callers wait for it."""
+    with _lock:
+        job = _jobs.pop(report_path, None)
+        if job is None:
+            event = _in_progress.get(report_path)
+        else:
+            event = threading.Event()
+            _in_progress[report_path] = event
+
+    if job is None:
+        if event is not None:
+            event.wait()
+        return False
+
+    img, title = job
+    try:
+        write_report(img, report_path, title)
+    except Exception as e:
+        print(f"Warning: Failed to generate report {report_path}: {e}")
+    finally:
+        with _lock:
+            _in_progress.pop(report_path, None)
+        event.set()
+    return True
+
+def _reserve_slot():
+    global _queued
+    with _lock:
+        if _queued >= config.REPORT_MAX_PENDING:
+            return False
+        _queued += 1
+        return True
+
+def _background_render(report_path):
+    global _queued
+    try:
+        _render_job(report_path)
+    finally:
+        with _lock:
+            _queued -= 1
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.REPORT_WORKERS, thread_name_prefix="report")
+        return _executor
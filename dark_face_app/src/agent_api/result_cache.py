@@ -0,0 +1,287 @@
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from . import config
+from .codecs import ensure_artifact, flush_artifacts
+from .io import load_image
+from .operations import OPERATIONS, validate_params
+from .reports import ensure_report
+
+# Content-addressed results: key = hash(input pixels, call kind, canonical
+# op/params, output settings). A hit returns the artifacts already on disk.
+# Tiers: in-memory LRU -> JSON records on disk (size-bounded) -> recompute.
+# Artifact names are not unique (basename + suffix, per-second timestamps), so
+# a record keeps each artifact's (size, mtime_ns) as written and a hit requires
+# them unchanged: a file overwritten by another call is a miss.
+
+# key -> {"result": result, "artifacts": {path: [size, mtime_ns] | None}}
+_memory = OrderedDict()
+# abspath -> (size, mtime_ns, pixel digest): repeated calls skip the decode
+_digests = OrderedDict()
+_DIGEST_MEMO_SIZE = 4096
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "disk_evictions": 0}
+# In "async" write mode records wait for their artifacts here, off the request
+_recorder = None
+
+def cached_result(kind, image_path, spec, compute):
+    """
+    Returns compute(img) for the image at `image_path`, or the stored result of
+    an earlier call with the same pixels, `kind` and `spec`. `spec` must be
+    canonical (see canonical_steps); None disables caching for this call.
+    Results containing an "error" key are never stored.
+    """
+    if not config.RESULT_CACHE_ENABLED or spec is None:
+        return compute(load_image(image_path))
+
+    digest = _known_digest(image_path)
+    if digest is not None:
+        hit = lookup(make_key(kind, digest, spec))
+        if hit is not None:
+            return hit
+
+    img = load_image(image_path)
+    digest = pixel_digest(img)
+    _remember_digest(image_path, digest)
+    key = make_key(kind, digest, spec)
+    hit = lookup(key)
+    if hit is not None:
+        return hit
+
+    result = compute(img)
+    if not (isinstance(result, dict) and "error" in result):
+        store(key, result)
+    return result
+
+def canonical_steps(steps):
+    """
+    Canonical form of a list of pipeline steps for cache keys: params validated
+    with defaults filled, and files referenced by 'path' params replaced by
+    their pixel digest. Returns None when the steps are invalid or random
+    (unseeded noise), i.e. must not be cached.
+    """
+    canonical = []
+    try:
+        for step in steps:
+            op = step.get("op")
+            params = validate_params(op, step.get("params", {}))
+            spec = OPERATIONS[op]
+            if spec.stochastic and params.get("seed") is None:
+                return None
+            for name, param in spec.params.items():
+                if param.type == "path":
+                    params[name] = file_digest(params[name])
+            canonical.append({"op": op, "params": params})
+    except (AttributeError, ValueError, OSError):
+        return None
+    return canonical
+
+def make_key(kind, digest, spec):
+    # Output location, report renderer and artifact formats are part of the result
+    payload = json.dumps(
+        [kind, digest, spec, os.path.abspath(config.BASE_OUTPUT_DIR), config.REPORT_BACKEND, config.OUTPUT_POLICIES],
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+def pixel_digest(img):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{img.shape}|{img.dtype}".encode())
+    h.update(memoryview(img).cast("B") if img.flags.c_contiguous else img.tobytes())
+    return h.hexdigest()
+
+def file_digest(path):
+    """Pixel digest of an image file, memoized by (path, size, mtime)."""
+    digest = _known_digest(path)
+    if digest is None:
+        digest = pixel_digest(load_image(path))
+        _remember_digest(path, digest)
+    return digest
+
+def lookup(key):
+    """Cached result for `key` (memory, then disk) if its artifacts are unchanged on disk."""
+    with _lock:
+        record = _memory.get(key)
+        if record is not None:
+            _memory.move_to_end(key)
+    tier = "memory_hits"
+    if record is None:
+        record = _read_record(key)
+        tier = "disk_hits"
+    if record is None or not _artifacts_unchanged(record["artifacts"]):
+        with _lock:
+            _memory.pop(key, None)
+            _stats["misses"] += 1
+        return None
+
+    with _lock:
+        _stats[tier] += 1
+        if tier == "disk_hits":
+            _remember(key, record)
+    result = copy.deepcopy(record["result"])
+    if isinstance(result, dict):
+        result["cached"] = True
+    return result
+
+def store(key, result):
+    """
+    Records `result` under `key` with the signatures of its artifacts. Queued
+    writes of those artifacts are waited for first (in the background in
+    "async" write mode, so the caller still returns right away).
+    """
+    result = copy.deepcopy(result)
+    if config.ARTIFACT_WRITE_MODE == "async":
+        _get_recorder().submit(_record, key, result)
+    else:
+        _record(key, result)
+
+def clear_result_cache(disk=True):
+    """Drops every cached result (memory, and the disk records if `disk`)."""
+    with _lock:
+        _memory.clear()
+        _digests.clear()
+    removed = 0
+    directory = _cache_dir()
+    if disk and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(directory, name))
+                removed += 1
+    return removed
+
+def result_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory)
+    directory = _cache_dir()
+    records = [e for e in os.scandir(directory) if e.name.endswith(".json")] if os.path.isdir(directory) else []
+    stats["disk_entries"] = len(records)
+    stats["disk_bytes"] = sum(e.stat().st_size for e in records)
+    stats["enabled"] = config.RESULT_CACHE_ENABLED
+    return stats
+
+def _remember(key, record):
+    _memory[key] = record
+    _memory.move_to_end(key)
+    while len(_memory) > max(0, int(config.RESULT_CACHE_ENTRIES)):
+        _memory.popitem(last=False)
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def _known_digest(path):
+    signature = _stat_signature(path)
+    with _lock:
+        entry = _digests.get(os.path.abspath(path))
+    if entry is not None and signature is not None and entry[:2] == signature:
+        return entry[2]
+    return None
+
+def _remember_digest(path, digest):
+    signature = _stat_signature(path)
+    if signature is None:
+        return
+    with _lock:
+        _digests[os.path.abspath(path)] = signature + (digest,)
+        _digests.move_to_end(os.path.abspath(path))
+        while len(_digests) > _DIGEST_MEMO_SIZE:
+            _digests.popitem(last=False)
+
+def _artifact_paths(value):
+    """Output paths referenced by a result (strings under BASE_OUTPUT_DIR)."""
+    base = os.path.abspath(config.BASE_OUTPUT_DIR) + os.sep
+    if isinstance(value, str):
+        if os.path.abspath(value).startswith(base):
+            yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _artifact_paths(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _artifact_paths(item)
+
+def _record(key, result):
+    paths = list(dict.fromkeys(_artifact_paths(result)))
+    flush_artifacts(paths)
+    # None: a deferred / lazy report not rendered yet
+    artifacts = {path: _stat_signature(path) for path in paths}
+    record = {"result": result, "artifacts": {p: list(s) if s else None for p, s in artifacts.items()}}
+    with _lock:
+        _remember(key, record)
+        _stats["stores"] += 1
+    _write_record(key, record)
+
+def _artifacts_unchanged(artifacts):
+    for path, signature in artifacts.items():
+        # A write to the path may still be queued: compare what it leaves on disk
+        ensure_artifact(path)
+        if signature is None:
+            if not (os.path.exists(path) or ensure_report(path)):
+                return False
+        elif _stat_signature(path) != tuple(signature):
+            return False
+    return True
+
+def _get_recorder():
+    global _recorder
+    with _lock:
+        if _recorder is None:
+            _recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+        return _recorder
+
+def _cache_dir():
+    return config.RESULT_CACHE_DIR or os.path.join(config.BASE_OUTPUT_DIR, ".result_cache")
+
+def _read_record(key):
+    path = os.path.join(_cache_dir(), f"{key}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        # Touch: eviction drops the least recently used records first
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    # Records without artifact signatures cannot be verified
+    if not isinstance(record, dict) or not isinstance(record.get("artifacts"), dict) or "result" not in record:
+        return None
+    return record
+
+def _write_record(key, record):
+    directory = _cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f"{key}.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, os.path.join(directory, f"{key}.json"))
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Warning: Could not persist cached result {key}: {e}")
+        return
+    _evict_disk(directory)
+
+def _evict_disk(directory):
+    records = [e for e in os.scandir(directory) if e.name.endswith(".json")]
+    total = sum(e.stat().st_size for e in records)
+    if total <= config.RESULT_CACHE_MAX_BYTES:
+        return
+    records.sort(key=lambda e: e.stat().st_mtime_ns)
+    for entry in records:
+        if total <= config.RESULT_CACHE_MAX_BYTES:
+            break
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except OSError:
+            continue
+        total -= size
+        with _lock:
+            _stats["disk_evictions"] += 1
@@ -0,0 +1,394 @@
+
+import copy
+import itertools
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from .. import processing
+from . import config
+from .io import load_image
+from .operations import get_operation, scale_steps, validate_params
+from .transform import compile_steps
+from .workflows import _experiment_workers, _score_image, run_experiment
+
+# Coarse-to-fine parameter search: candidate settings are scored on a
+# downscaled proxy of the image (pixel-sized params scaled with it) and only
+# the best few are re-run at full resolution through run_experiment.
+#
+# Search spec (JSON):
+#   steps:       pipeline template; a param given as {"min": a, "max": b} or
+#                {"values": [...]} is a search dimension
+#   objective:   "delta_snr" | "entropy" | "contrast" | {"target_mean": m}
+#   strategy:    "grid" (every combination), "golden" (golden-section per
+#                dimension, coordinate-wise) or "halving" (successive halving
+#                over the grid on growing proxies)
+#   grid_points: samples per {"min", "max"} dimension (grid / halving)
+#   top_k:       settings re-run at full resolution
+#   proxy_scale: proxy size relative to the image (config.SEARCH_PROXY_SCALE)
+
+SEARCH_STRATEGIES = ("grid", "golden", "halving")
+SEARCH_OBJECTIVES = ("delta_snr", "entropy", "contrast", "target_mean")
+_GOLDEN = (math.sqrt(5) - 1) / 2
+# Smallest proxy side: below it the statistics stop being representative
+_MIN_PROXY_SIDE = 64
+# Settings closer than this fraction of every searched range are the same
+# candidate for the full-resolution confirmation
+_DISTINCT_FRACTION = 0.02
+
+def search_parameters(image_path: str, search_json: str) -> dict:
+    """
+    Tunes the parameters of a pipeline for an objective. Settings are scored
+    on a downscaled proxy; the top_k are re-run at full resolution as a
+    run_experiment (metrics, artifacts). Returns the proxy ranking, the
+    full-resolution experiment and the best setting.
+    """
+    try:
+        spec = json.loads(search_json) if isinstance(search_json, str) else dict(search_json)
+        search = _parse_search(spec)
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON in search definition"}
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        return {"error": f"Invalid search definition: {e}"}
+    try:
+        img = load_image(image_path)
+    except Exception as e:
+        return {"error": str(e)}
+
+    start = time.perf_counter()
+    evaluator = _ProxyEvaluator(img, search)
+    if search["strategy"] == "golden":
+        ranking = _golden_search(evaluator, search)
+    elif search["strategy"] == "halving":
+        ranking = _halving_search(evaluator, search)
+    else:
+        ranking = _grid_search(evaluator, search)
+    proxy_ms = (time.perf_counter() - start) * 1000
+
+    ranking = [entry for entry in ranking if entry["proxy_score"] is not None]
+    if not ranking:
+        return {"error": "No setting could be evaluated", "proxy_errors": evaluator.errors[:5]}
+
+    # Full resolution: the top distinct settings as run_experiment candidates
+    top = _distinct_top(search, ranking)
+    candidates = [
+        {"name": f"Search_{rank}", "steps": _materialize(search, entry["assignment"])}
+        for rank, entry in enumerate(top, 1)
+    ]
+    experiment = run_experiment(image_path, json.dumps(candidates))
+    if "error" in experiment:
+        return experiment
+
+    by_name = {result["strategy"]: result for result in experiment["results"]}
+    confirmed = []
+    for candidate, entry in zip(candidates, top):
+        result = by_name.get(candidate["name"])
+        confirmed.append({
+            "name": candidate["name"],
+            "params": entry["params"],
+            "steps": candidate["steps"],
+            "proxy_score": entry["proxy_score"],
+            "full_score": round(_full_score(search["objective"], result["metrics"]), 4) if result else None
+        })
+    scored = [entry for entry in confirmed if entry["full_score"] is not None]
+    best = max(scored, key=lambda entry: entry["full_score"]) if scored else None
+
+    # Cost relative to scoring every grid setting at full resolution
+    proxy_pixels = sum(evaluator.pixels_evaluated.values())
+    equivalent = proxy_pixels / float(img.shape[0] * img.shape[1]) + len(candidates)
+    return {
+        "objective": search["objective"],
+        "strategy": search["strategy"],
+        "best": best,
+        "confirmed": confirmed,
+        "proxy_ranking": [
+            {"params": entry["params"], "proxy_score": entry["proxy_score"]}
+            for entry in ranking[:max(10, search["top_k"])]
+        ],
+        "cost": {
+            "proxy_scale": search["proxy_scale"],
+            "proxy_evaluations": evaluator.evaluations,
+            "proxy_ms": round(proxy_ms, 2),
+            "full_resolution_evaluations": len(candidates),
+            "equivalent_full_resolution_evaluations": round(equivalent, 2),
+            "exhaustive_grid_evaluations": _grid_size(search)
+        },
+        "experiment": experiment
+    }
+
+def _parse_search(spec):
+    steps = spec["steps"]
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("'steps' must be a non-empty list")
+    dims = []
+    for index, step in enumerate(steps):
+        op = step.get("op")
+        declared = get_operation(op).params
+        for name, value in (step.get("params") or {}).items():
+            if not isinstance(value, dict):
+                continue
+            if name not in declared or declared[name].type not in ("float", "int"):
+                raise ValueError(f"'{op}.{name}' cannot be searched (numeric params only)")
+            integer = declared[name].type == "int"
+            if "values" in value:
+                values = list(value["values"])
+                if not values:
+                    raise ValueError(f"'{op}.{name}': empty values")
+                dims.append({"step": index, "param": name, "values": values, "integer": integer})
+            else:
+                low, high = float(value["min"]), float(value["max"])
+                if high < low:
+                    raise ValueError(f"'{op}.{name}': max < min")
+                dims.append({"step": index, "param": name, "range": (low, high), "integer": integer})
+    if not dims:
+        raise ValueError("No search dimension: give a param as {\"min\", \"max\"} or {\"values\"}")
+
+    objective = spec.get("objective", "delta_snr")
+    if isinstance(objective, dict):
+        objective = {"target_mean": float(objective["target_mean"])}
+    elif objective not in SEARCH_OBJECTIVES or objective == "target_mean":
+        raise ValueError(f"Unknown objective: {objective}. Valid: {list(SEARCH_OBJECTIVES)} ({{\"target_mean\": m}})")
+
+    strategy = spec.get("strategy", "grid")
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}. Valid: {list(SEARCH_STRATEGIES)}")
+    proxy_scale = float(spec.get("proxy_scale", config.SEARCH_PROXY_SCALE))
+    if not 0.0 < proxy_scale <= 1.0:
+        raise ValueError("proxy_scale must be in (0, 1]")
+
+    search = {
+        "steps": steps,
+        "dims": dims,
+        "objective": objective,
+        "strategy": strategy,
+        "grid_points": max(2, int(spec.get("grid_points", 5))),
+        "top_k": max(1, int(spec.get("top_k", 3))),
+        "proxy_scale": proxy_scale
+    }
+    # Validates the template (ops, other params) with a sample setting
+    _materialize(search, tuple(_axis(dim, search)[0] for dim in dims))
+    if strategy != "golden" and _grid_size(search) > config.SEARCH_MAX_EVALUATIONS:
+        raise ValueError(
+            f"{_grid_size(search)} settings exceed SEARCH_MAX_EVALUATIONS ({config.SEARCH_MAX_EVALUATIONS}): "
+            "lower grid_points or use the golden strategy"
+        )
+    return search
+
+def _axis(dim, search):
+    """Values a dimension takes in grid / halving searches."""
+    if "values" in dim:
+        return dim["values"]
+    low, high = dim["range"]
+    points = np.linspace(low, high, search["grid_points"])
+    if dim["integer"]:
+        return sorted({int(round(v)) for v in points})
+    return [float(round(v, 6)) for v in points]
+
+def _grid_size(search):
+    return int(np.prod([len(_axis(dim, search)) for dim in search["dims"]]))
+
+def _materialize(search, assignment):
+    """Template steps with the searched params set to `assignment` (one value per dimension)."""
+    steps = copy.deepcopy(search["steps"])
+    for dim, value in zip(search["dims"], assignment):
+        steps[dim["step"]].setdefault("params", {})[dim["param"]] = value
+    for step in steps:
+        validate_params(step.get("op"), step.get("params", {}))
+    return steps
+
+def _params_of(search, assignment):
+    return {
+        f"{search['steps'][dim['step']]['op']}.{dim['param']}": value
+        for dim, value in zip(search["dims"], assignment)
+    }
+
+def _objective_score(objective, score, reference):
+    if isinstance(objective, dict):
+        # Closer to the target brightness is better
+        return -abs(score["mean"] - objective["target_mean"])
+    if objective == "delta_snr":
+        return score["snr"] - reference["snr"]
+    return score[objective]
+
+def _full_score(objective, metrics):
+    """Objective from run_experiment metrics (same definitions as on the proxy)."""
+    if isinstance(objective, dict):
+        return -abs(metrics["mean_brightness"] - objective["target_mean"])
+    return {
+        "delta_snr": metrics["delta_snr"],
+        "entropy": metrics["entropy"],
+        "contrast": metrics["contrast_ratio"]
+    }[objective]
+
+def _distinct_top(search, ranking):
+    """
+    The best top_k entries of `ranking`, skipping settings within
+    _DISTINCT_FRACTION of the range (on every dimension) of a better one:
+    golden-section probes converge on one point and would otherwise fill
+    the confirmation set with near-duplicates.
+    """
+    def close(a, b):
+        for dim, x, y in zip(search["dims"], a, b):
+            if "range" in dim:
+                low, high = dim["range"]
+                if abs(x - y) > max(_DISTINCT_FRACTION * (high - low), 0.5 if dim["integer"] else 0.0):
+                    return False
+            elif x != y:
+                return False
+        return True
+
+    top = []
+    for entry in ranking:
+        if not any(close(entry["assignment"], kept["assignment"]) for kept in top):
+            top.append(entry)
+            if len(top) == search["top_k"]:
+                break
+    return top
+
+class _ProxyEvaluator:
+    """
+    Scores settings on downscaled proxies, memoized by (effective proxy
+    factor, setting): scales clamped to the same proxy share their scores.
+    """
+    def __init__(self, img, search):
+        self.img = img
+        self.search = search
+        self.evaluations = 0
+        self.errors = []
+        self.pixels_evaluated = {}
+        self._factors = {}
+        self._proxies = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def factor(self, scale):
+        """Effective proxy factor of a requested scale."""
+        if scale not in self._factors:
+            height, width = self.img.shape[:2]
+            # Never below _MIN_PROXY_SIDE px (nor above the image)
+            self._factors[scale] = min(1.0, max(scale, _MIN_PROXY_SIDE / float(min(height, width))))
+        return self._factors[scale]
+
+    def proxy(self, scale):
+        factor = self.factor(scale)
+        if factor not in self._proxies:
+            height, width = self.img.shape[:2]
+            size = (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+            small = cv2.resize(self.img, size, interpolation=cv2.INTER_AREA) if factor < 1.0 else self.img
+            proxy = processing.CachedImage(small)
+            self._proxies[factor] = (factor, proxy, _score_image(proxy))
+        return self._proxies[factor]
+
+    def evaluate(self, assignments, scale):
+        """Proxy scores (None on failure) of several settings, in order."""
+        factor = self.proxy(scale)[0]
+        todo = [a for a in dict.fromkeys(assignments) if (factor, a) not in self._memo]
+        workers = max(1, min(_experiment_workers(), len(todo)))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search") as pool:
+                scores = list(pool.map(lambda a: self._score(a, scale), todo))
+        else:
+            scores = [self._score(a, scale) for a in todo]
+        for assignment, score in zip(todo, scores):
+            self._memo[(factor, assignment)] = score
+        return [self._memo[(factor, a)] for a in assignments]
+
+    def visited(self, scale):
+        """Settings already scored on the proxy of `scale`."""
+        factor = self.factor(scale)
+        return [assignment for (f, assignment) in self._memo if f == factor]
+
+    def _score(self, assignment, scale):
+        factor, proxy, reference = self.proxy(scale)
+        try:
+            steps = scale_steps(_materialize(self.search, assignment), factor)
+            output = processing.CachedImage(compile_steps(steps).run(proxy))
+            score = float(_objective_score(self.search["objective"], _score_image(output), reference))
+        except Exception as e:
+            with self._lock:
+                self.errors.append(f"{_params_of(self.search, assignment)}: {e}")
+            score = None
+        with self._lock:
+            self.evaluations += 1
+            self.pixels_evaluated[factor] = self.pixels_evaluated.get(factor, 0) + proxy.shape[0] * proxy.shape[1]
+        return score
+
+def _ranking(search, assignments, scores):
+    entries = [
+        {"assignment": a, "params": _params_of(search, a), "proxy_score": None if s is None else round(s, 4)}
+        for a, s in zip(assignments, scores)
+    ]
+    # Failed settings last; ties keep the grid order
+    return sorted(entries, key=lambda e: -np.inf if e["proxy_score"] is None else e["proxy_score"], reverse=True)
+
+def _grid_search(evaluator, search):
+    assignments = list(itertools.product(*[_axis(dim, search) for dim in search["dims"]]))
+    return _ranking(search, assignments, evaluator.evaluate(assignments, search["proxy_scale"]))
+
+def _halving_search(evaluator, search, eta=3):
+    """
+    Successive halving: every grid setting on a small proxy, the best 1/eta
+    on a proxy twice as large, ... up to proxy_scale.
+    """
+    assignments = list(itertools.product(*[_axis(dim, search) for dim in search["dims"]]))
+    rungs = max(1, int(math.ceil(math.log(max(len(assignments), 1), eta))))
+    scales = [search["proxy_scale"] / 2 ** (rungs - 1 - r) for r in range(rungs)]
+    survivors = assignments
+    for rung, scale in enumerate(scales):
+        ranking = _ranking(search, survivors, evaluator.evaluate(survivors, scale))
+        if rung < len(scales) - 1:
+            keep = max(search["top_k"], int(math.ceil(len(survivors) / eta)))
+            survivors = [entry["assignment"] for entry in ranking[:keep]]
+    return ranking
+
+def _golden_search(evaluator, search, rounds=2, iterations=8):
+    """
+    Coordinate-wise search from the middle of the space: golden-section on
+    {"min", "max"} dimensions (assumes one peak along each), every value on
+    {"values"} dimensions. Two rounds over all dimensions.
+    """
+    scale = search["proxy_scale"]
+    dims = search["dims"]
+    current = [
+        dim["values"][len(dim["values"]) // 2] if "values" in dim else _cast(dim, sum(dim["range"]) / 2)
+        for dim in dims
+    ]
+
+    def score_at(index, value):
+        trial = list(current)
+        trial[index] = value
+        return evaluator.evaluate([tuple(trial)], scale)[0]
+
+    def key(score):
+        return -np.inf if score is None else score
+
+    for _ in range(rounds):
+        for index, dim in enumerate(dims):
+            if "values" in dim:
+                scores = [score_at(index, value) for value in dim["values"]]
+                current[index] = dim["values"][int(np.argmax([key(s) for s in scores]))]
+                continue
+            low, high = dim["range"]
+            tolerance = 1 if dim["integer"] else 1e-3 * (high - low)
+            for _ in range(iterations):
+                if high - low <= tolerance:
+                    break
+                c = _cast(dim, high - _GOLDEN * (high - low))
+                d = _cast(dim, low + _GOLDEN * (high - low))
+                if key(score_at(index, c)) >= key(score_at(index, d)):
+                    high = d
+                else:
+                    low = c
+            candidates = {_cast(dim, low), _cast(dim, high), current[index]}
+            current[index] = max(candidates, key=lambda v: key(score_at(index, v)))
+
+    # Every setting visited, best first
+    visited = evaluator.visited(scale)
+    return _ranking(search, visited, evaluator.evaluate(visited, scale))
+
+def _cast(dim, value):
+    # 4 decimals: golden-section steps closer than that are the same setting
+    return int(round(value)) if dim["integer"] else float(round(value, 4))
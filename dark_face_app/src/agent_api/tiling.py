@@ -0,0 +1,257 @@
+
+import os
+import cv2
+import numpy as np
+from .. import processing
+from .codecs import write_artifact
+from .io import load_image_mmap
+from .operations import get_operation
+from .transform import _execute_step, compile_steps
+
+# Tiled (out-of-core) execution of pipelines.
+# Every stage reads one memory-mapped buffer and writes another, tile by tile,
+# so peak RAM depends on the tile size and not on the image size. Results match
+# the in-memory pipeline:
+#   - point ops:         tiles processed independently
+#   - neighborhood ops:  each tile is read with the halo declared in the registry
+#   - CLAHE:             chunks aligned to the CLAHE grid, with one CLAHE tile of halo
+#                        (±1 level on rare pixels: OpenCV interpolates in float32
+#                        from chunk-local coordinates)
+#   - equalize, contrast_stretching: two passes (global histogram, then table)
+#   - sim_downsampling:  exact nearest-neighbour index maps
+#   - arithmetic:        pointwise, two passes for 'divide' (global min/max)
+
+DEFAULT_TILE_SIZE = 1024
+
+def run_steps_tiled(src, steps, work_dir, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Applies `steps` to `src` (array or memmap, HxW[xC] uint8) tile by tile.
+    Intermediate buffers are memory-mapped .npy files in `work_dir`.
+    Returns (result_memmap, stats).
+    """
+    stats = {"tiles_processed": 0, "passes": 0, "peak_region_bytes": 0}
+    current = src
+    for index, stage in enumerate(compile_steps(steps).stages):
+        dst = np.lib.format.open_memmap(
+            os.path.join(work_dir, f"stage_{index:02d}.npy"), mode="w+", dtype=np.uint8, shape=current.shape
+        )
+        if stage.table is not None:
+            _tiled_local(current, dst, lambda region, table=stage.table: cv2.LUT(region, table), 0, tile_size, stats)
+        else:
+            op, params = stage.ops[0]
+            _run_op_tiled(current, dst, op, params, stage.fn, tile_size, work_dir, stats)
+        dst.flush()
+
+        # Ping-pong: the previous intermediate is no longer needed
+        filename = getattr(current, "filename", None)
+        current = dst
+        del dst
+        if filename and os.path.dirname(filename) == os.path.abspath(work_dir):
+            _remove_buffer(filename)
+    return current, stats
+
+def _remove_buffer(filename):
+    """
+    Deletes a spent intermediate buffer to bound disk use. Another reference
+    (e.g. the caller's input map) can keep the file mapped, and Windows
+    refuses to delete mapped files: it is then left for the work_dir cleanup.
+    """
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+def apply_steps_tiled(image_path, steps, output_path, work_dir, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Loads `image_path` out-of-core, runs `steps` tiled and writes the result to
+    `output_path` (extension per the "result" output policy; see stats["output_path"]).
+    """
+    src = load_image_mmap(image_path, os.path.join(work_dir, "input.npy"))
+    result, stats = run_steps_tiled(src, steps, work_dir, tile_size)
+    # Written now: the memory-mapped result lives in work_dir, removed by the caller
+    stats["output_path"] = write_artifact(result, output_path, "result", defer=False)
+    stats["shape"] = list(result.shape)
+    return stats
+
+def _run_op_tiled(src, dst, op, params, fn, tile_size, work_dir, stats):
+    spec = get_operation(op)
+    if op.startswith("noise_") and params.get("seed") is not None:
+        # A fixed seed must not repeat the same noise field in every tile:
+        # each tile gets its own stream derived from (seed, tile origin)
+        _tiled_noise(src, dst, op, params, tile_size, stats)
+    elif op == "clahe":
+        _tiled_clahe(src, dst, params, tile_size, stats)
+    elif op == "equalize":
+        _tiled_equalize(src, dst, tile_size, stats)
+    elif op == "contrast_stretching":
+        _tiled_contrast_stretching(src, dst, params, tile_size, stats)
+    elif op == "sim_downsampling":
+        _tiled_downsampling(src, dst, params, tile_size, stats)
+    elif op == "arithmetic":
+        _tiled_arithmetic(src, dst, params, tile_size, work_dir, stats)
+    elif spec.kind == "point":
+        _tiled_local(src, dst, fn, 0, tile_size, stats)
+    elif spec.kind == "neighborhood" and spec.halo is not None:
+        _tiled_local(src, dst, fn, spec.halo(params), tile_size, stats)
+    else:
+        raise ValueError(f"Operation '{op}' is not supported in tiled mode")
+
+def _iter_tiles(height, width, tile_size):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+def _track(stats, region):
+    stats["tiles_processed"] += 1
+    stats["peak_region_bytes"] = max(stats["peak_region_bytes"], region.nbytes)
+
+def _tiled_local(src, dst, fn, halo, tile_size, stats):
+    """Runs `fn` on every tile expanded by `halo` px and keeps the tile interior."""
+    height, width = src.shape[:2]
+    stats["passes"] += 1
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        ry0, ry1 = max(0, y0 - halo), min(height, y1 + halo)
+        rx0, rx1 = max(0, x0 - halo), min(width, x1 + halo)
+        region = np.ascontiguousarray(src[ry0:ry1, rx0:rx1])
+        out = fn(region)
+        dst[y0:y1, x0:x1] = out[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0]
+        _track(stats, region)
+
+def _tiled_noise(src, dst, op, params, tile_size, stats):
+    height, width = src.shape[:2]
+    stats["passes"] += 1
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        region = np.ascontiguousarray(src[y0:y1, x0:x1])
+        tile_params = dict(params, seed=[int(params["seed"]), y0, x0])
+        dst[y0:y1, x0:x1] = _execute_step(region, op, tile_params)
+        _track(stats, region)
+
+def _tiled_clahe(src, dst, params, tile_size, stats):
+    """
+    CLAHE with chunks aligned to the CLAHE grid. OpenCV splits the image into
+    grid x grid tiles of ceil(size / grid) px (reflect-padding bottom/right) and
+    interpolates each pixel between its neighbouring tiles, so a chunk plus one
+    CLAHE tile on every side reproduces the full-image tile mappings.
+    """
+    clip_limit = params["clip_limit"]
+    grid = params["tile_grid_size"]
+    height, width = src.shape[:2]
+    tile_h, tile_w = -(-height // grid), -(-width // grid)
+    chunk_y = max(1, tile_size // tile_h)
+    chunk_x = max(1, tile_size // tile_w)
+    stats["passes"] += 1
+
+    for ty0 in range(0, grid, chunk_y):
+        ty1 = min(grid, ty0 + chunk_y)
+        gy0, gy1 = max(0, ty0 - 1), min(grid, ty1 + 1)
+        for tx0 in range(0, grid, chunk_x):
+            tx1 = min(grid, tx0 + chunk_x)
+            gx0, gx1 = max(0, tx0 - 1), min(grid, tx1 + 1)
+
+            # Region in pixels; may extend past the image on the last tiles
+            py0, py1 = gy0 * tile_h, gy1 * tile_h
+            px0, px1 = gx0 * tile_w, gx1 * tile_w
+            region = np.ascontiguousarray(src[py0:min(py1, height), px0:min(px1, width)])
+            pad_b, pad_r = py1 - min(py1, height), px1 - min(px1, width)
+            if pad_b or pad_r:
+                region = cv2.copyMakeBorder(region, 0, pad_b, 0, pad_r, cv2.BORDER_REFLECT_101)
+
+            out = processing.apply_clahe(region, clip_limit=clip_limit, tile_grid_size=(gx1 - gx0, gy1 - gy0))
+
+            oy0, oy1 = ty0 * tile_h, min(ty1 * tile_h, height)
+            ox0, ox1 = tx0 * tile_w, min(tx1 * tile_w, width)
+            dst[oy0:oy1, ox0:ox1] = out[oy0 - py0:oy1 - py0, ox0 - px0:ox1 - px0]
+            _track(stats, region)
+
+def _tiled_equalize(src, dst, tile_size, stats):
+    """Global histogram equalization: histogram pass, then table pass."""
+    height, width = src.shape[:2]
+    hist = np.zeros(256, dtype=np.int64)
+    stats["passes"] += 1
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        region = np.ascontiguousarray(src[y0:y1, x0:x1])
+        hist += np.bincount(processing.equalization_channel(region).ravel(), minlength=256)[:256]
+        _track(stats, region)
+    table = processing.build_equalization_lut(hist)
+    _tiled_local(src, dst, lambda region: processing.apply_equalization(region, table=table), 0, tile_size, stats)
+
+def _tiled_contrast_stretching(src, dst, params, tile_size, stats):
+    """Percentile stretch: global histogram pass, then table pass."""
+    link_channels = params["link_channels"]
+    height, width = src.shape[:2]
+    hists = None
+    stats["passes"] += 1
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        region = np.ascontiguousarray(src[y0:y1, x0:x1])
+        tile_hists = processing.contrast_stretching_histograms(region, link_channels)
+        hists = tile_hists if hists is None else [a + b for a, b in zip(hists, tile_hists)]
+        _track(stats, region)
+    table = processing.build_contrast_stretching_lut(
+        hists, params["low_percentile"], params["high_percentile"]
+    )
+    _tiled_local(src, dst, lambda region: cv2.LUT(region, table), 0, tile_size, stats)
+
+def _nearest_roundtrip_index(size, reduced):
+    """Source index of every output pixel after a nearest down/up resize along one axis."""
+    ramp = np.arange(size, dtype=np.int32).reshape(size, 1)
+    small = cv2.resize(ramp, (1, reduced), interpolation=cv2.INTER_NEAREST)
+    return cv2.resize(small, (1, size), interpolation=cv2.INTER_NEAREST).ravel()
+
+def _tiled_downsampling(src, dst, params, tile_size, stats):
+    factor = params["factor"]
+    height, width = src.shape[:2]
+    if factor >= 1.0:
+        _tiled_local(src, dst, lambda region: region, 0, tile_size, stats)
+        return
+    # INTER_NEAREST is separable: row and column maps give the exact result
+    rows = _nearest_roundtrip_index(height, int(height * factor))
+    cols = _nearest_roundtrip_index(width, int(width * factor))
+    stats["passes"] += 1
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        out = src[np.ix_(rows[y0:y1], cols[x0:x1])]
+        dst[y0:y1, x0:x1] = out
+        _track(stats, out)
+
+def _tiled_arithmetic(src, dst, params, tile_size, work_dir, stats):
+    # Params were validated (operation, image2_path) when the plan was compiled
+    img2_path = params["image2_path"]
+    operation = params["operation"]
+
+    # Second operand spilled to a memory-mapped buffer (kept out of the decoded-image cache)
+    img2 = load_image_mmap(img2_path, os.path.join(work_dir, "operand2_input.npy"))
+    if img2.shape != src.shape:
+        resized = np.lib.format.open_memmap(
+            os.path.join(work_dir, "operand2.npy"), mode="w+", dtype=np.uint8, shape=src.shape
+        )
+        if img2.shape[2:] == src.shape[2:]:
+            # Resized straight into the mapped buffer: no full-size copy in RAM
+            cv2.resize(img2, (src.shape[1], src.shape[0]), dst=resized)
+        else:
+            resized[:] = cv2.resize(img2, (src.shape[1], src.shape[0])).reshape(src.shape)
+        img2 = resized
+    height, width = src.shape[:2]
+
+    if operation != "divide":
+        stats["passes"] += 1
+        for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+            region = np.ascontiguousarray(src[y0:y1, x0:x1])
+            other = np.ascontiguousarray(img2[y0:y1, x0:x1])
+            dst[y0:y1, x0:x1] = processing.apply_arithmetic_ops(region, other, operation=operation)
+            _track(stats, region)
+        return
+
+    # divide normalizes with the global min/max (cv2.NORM_MINMAX): two passes
+    def ratio(y0, y1, x0, x1):
+        return (src[y0:y1, x0:x1].astype(float) / (img2[y0:y1, x0:x1].astype(float) + 1.0)) * 255.0
+
+    low, high = np.inf, -np.inf
+    stats["passes"] += 2
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        res = ratio(y0, y1, x0, x1)
+        low, high = min(low, res.min()), max(high, res.max())
+    scale = 255.0 / (high - low) if high - low > np.finfo(float).eps else 0.0
+    shift = -low * scale
+    for y0, y1, x0, x1 in _iter_tiles(height, width, tile_size):
+        res = ratio(y0, y1, x0, x1)
+        dst[y0:y1, x0:x1] = (res * scale + shift).astype(np.uint8)
+        _track(stats, res)
@@ -1,47 +1,486 @@
 
 import json
 import os
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import cv2
+import numpy as np
 from .. import processing
-from .io import load_image, save_semantic_image
+from .io import save_semantic_image
+from .operations import get_operation, scale_steps, validate_params
+from .result_cache import cached_result, canonical_steps
+
+# One stage of a compiled pipeline: either a fused lookup table (`table`) or a
+# prebuilt callable (`fn`). `ops` lists the (op, validated params) it covers.
+PlanStage = namedtuple("PlanStage", "table fn ops")
+
+class PipelinePlan:
+    """
+    A pipeline compiled once from its JSON steps: params validated and cast,
+    consecutive point ops fused into one table (fuse=True) and per-op
+    resources (LUTs, CLAHE objects, second operands) prebuilt. The same plan
+    is reused for every image it runs on.
+    """
+    def __init__(self, steps, fuse=True):
+        self.stages = []
+        for step in steps:
+            if not isinstance(step, dict):
+                raise ValueError(f"Invalid pipeline step: {step!r}")
+            op = step.get("op")
+            spec = get_operation(op)
+            params = validate_params(op, step.get("params", {}))
+            if spec.lut is not None:
+                table = spec.lut(params)
+                if fuse and self.stages and self.stages[-1].table is not None:
+                    previous = self.stages[-1]
+                    self.stages[-1] = PlanStage(processing.compose_luts(previous.table, table), None, previous.ops + [(op, params)])
+                else:
+                    self.stages.append(PlanStage(table, None, [(op, params)]))
+            else:
+                fn = spec.build(params)
+                if not spec.cached_views:
+                    fn = _on_array(fn)
+                self.stages.append(PlanStage(None, fn, [(op, params)]))
+
+    def __len__(self):
+        return len(self.stages)
+
+    @property
+    def steps(self):
+        return [{"op": op, "params": params} for stage in self.stages for op, params in stage.ops]
+
+    def run_stage(self, stage, image):
+        if stage.table is not None:
+            return cv2.LUT(processing.as_array(image), stage.table)
+        return stage.fn(image)
+
+    def run(self, image):
+        """Runs the plan on one image (ndarray or CachedImage). Returns an ndarray."""
+        current = image
+        for stage in self.stages:
+            current = self.run_stage(stage, current)
+        return processing.as_array(current)
+
+    def run_batch(self, stack):
+        """
+        Runs the plan on an (N, H, W[, C]) stack of same-size frames.
+        Fused tables run once over the whole stack; other ops run per frame.
+        """
+        current = stack
+        for stage in self.stages:
+            if stage.table is not None:
+                current = processing.apply_lut_batch(current, stage.table)
+            else:
+                current = np.stack([stage.fn(frame) for frame in current])
+        return current
+
+class CandidatePlan:
+    """
+    Several step lists (experiment candidates) compiled into one prefix tree:
+    a leading sequence of steps shared by several candidates is computed once
+    and its result reused by every candidate that extends it. Chains without
+    branches are compiled as one PipelinePlan (point ops fused), and sibling
+    branches can run in parallel. Unseeded random steps are never shared.
+    """
+    def __init__(self, step_lists):
+        self.candidates = len(step_lists)
+        # Candidate index -> error message for step lists that do not compile
+        self.errors = {}
+        root = _TrieNode()
+        for index, steps in enumerate(step_lists):
+            try:
+                keys = [_step_key(step) for step in steps]
+            except (AttributeError, TypeError, ValueError) as e:
+                self.errors[index] = str(e)
+                continue
+            node = root
+            for key, step in zip(keys, steps):
+                if key not in node.children:
+                    node.children[key] = _TrieNode(step)
+                node = node.children[key]
+            node.candidates.append(index)
+
+        self.root_candidates = root.candidates
+        self.segments = [_compile_segment(child) for child in root.children.values()]
+        self.naive_step_executions = sum(
+            len(steps) for index, steps in enumerate(step_lists) if index not in self.errors
+        )
+        self.step_executions = sum(segment.total_steps() for segment in self.segments)
+
+    def run(self, image, workers=1):
+        """
+        Runs every candidate on `image` (ndarray or CachedImage). Returns
+        (outputs, errors, stats): one ndarray per candidate (`image` itself
+        for candidates without steps, None on error) and index -> message.
+        stats["candidate_compute_ms"] gives each candidate's compute time,
+        including the shared prefix it reused.
+        """
+        outputs = [None] * self.candidates
+        errors = dict(self.errors)
+        compute_ms = [0.0] * self.candidates
+        for index in self.root_candidates:
+            outputs[index] = image
+
+        def run_segment(segment, source, submit, elapsed=0.0):
+            start = time.perf_counter()
+            try:
+                if segment.error is not None:
+                    raise ValueError(segment.error)
+                result = segment.plan.run(source)
+            except Exception as e:
+                for index in segment.all_candidates():
+                    errors[index] = str(e)
+                return
+            elapsed += (time.perf_counter() - start) * 1000
+            for index in segment.candidates:
+                outputs[index] = result
+                compute_ms[index] = elapsed
+            if len(segment.children) > 1:
+                # Branches share the color-space / histogram views of their input
+                result = processing.CachedImage(result)
+            for child in segment.children[1:]:
+                submit(child, result, elapsed)
+            if segment.children:
+                run_segment(segment.children[0], result, submit, elapsed)
+
+        workers = max(1, min(int(workers), _count_leaves(self.segments)))
+        if workers == 1:
+            def run_inline(child, source, elapsed=0.0):
+                run_segment(child, source, run_inline, elapsed)
+            for segment in self.segments:
+                run_inline(segment, image)
+        else:
+            # Sibling branches are submitted as soon as their shared prefix is ready
+            pending = []
+            lock = threading.Lock()
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="candidates") as pool:
+                def submit(child, source, elapsed=0.0):
+                    with lock:
+                        pending.append(pool.submit(run_segment, child, source, submit, elapsed))
+                for segment in self.segments:
+                    submit(segment, image)
+                while True:
+                    with lock:
+                        if not pending:
+                            break
+                        future = pending.pop()
+                    future.result()
+
+        stats = {
+            "candidates": self.candidates,
+            "naive_step_executions": self.naive_step_executions,
+            "step_executions": self.step_executions,
+            "saved_step_executions": self.naive_step_executions - self.step_executions,
+            "workers": workers,
+            "candidate_compute_ms": compute_ms
+        }
+        return outputs, errors, stats
+
+class _TrieNode:
+    def __init__(self, step=None):
+        self.step = step
+        self.children = {}
+        self.candidates = []
+
+class _Segment:
+    """A chain of trie steps without branches, run as one compiled plan."""
+    def __init__(self, steps, candidates, children):
+        self.steps = steps
+        self.candidates = candidates
+        self.children = children
+        self.plan = None
+        self.error = None
+        try:
+            self.plan = compile_steps(steps)
+        except (AttributeError, TypeError, ValueError) as e:
+            self.error = str(e)
+
+    def total_steps(self):
+        return len(self.steps) + sum(child.total_steps() for child in self.children)
+
+    def all_candidates(self):
+        return self.candidates + [index for child in self.children for index in child.all_candidates()]
+
+def _compile_segment(node):
+    steps = [node.step]
+    # Follow the chain while no candidate ends here and there is a single branch
+    while not node.candidates and len(node.children) == 1:
+        node = next(iter(node.children.values()))
+        steps.append(node.step)
+    return _Segment(steps, node.candidates, [_compile_segment(child) for child in node.children.values()])
+
+def _count_leaves(segments):
+    return sum(_count_leaves(segment.children) if segment.children else 1 for segment in segments)
+
+def _step_key(step):
+    """Identity of a step in the prefix tree: op and validated params."""
+    op = step.get("op")
+    params = validate_params(op, step.get("params", {}))
+    if get_operation(op).stochastic and params.get("seed") is None:
+        # Every unseeded random step is its own realization
+        return op, object()
+    return op, json.dumps(params, sort_keys=True, default=str)
+
+# Reserved node id of the pipeline input in DAG pipelines
+DAG_SOURCE = "source"
+_NODE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+class DagPlan:
+    """
+    A branching pipeline: named nodes that apply steps to another node
+    ({"id", "input", "steps"}) or merge two nodes with an arithmetic
+    operation first ({"id", "merge": [a, b], "operation", "steps"}), the
+    input image being "source". Nodes describing the same computation are
+    merged, each remaining one runs once (its steps fused as one
+    PipelinePlan) and its result is shared in memory by every consumer.
+    Independent branches run in parallel. `factor` scales neighborhood
+    params for downscaled inputs (see operations.scale_steps).
+    """
+    def __init__(self, spec, factor=1.0):
+        if not isinstance(spec, dict) or not isinstance(spec.get("nodes"), list) or not spec["nodes"]:
+            raise ValueError("DAG pipeline needs a non-empty 'nodes' list")
+        declared = {}
+        for node in spec["nodes"]:
+            if not isinstance(node, dict):
+                raise ValueError(f"Invalid DAG node: {node!r}")
+            node_id = node.get("id")
+            if not isinstance(node_id, str) or not _NODE_ID.match(node_id):
+                raise ValueError(f"DAG node ids must be non-empty [A-Za-z0-9_-] strings, got: {node_id!r}")
+            if node_id == DAG_SOURCE or node_id in declared:
+                raise ValueError(f"Duplicate or reserved DAG node id: {node_id}")
+            declared[node_id] = node
+
+        # Declared ids in topological order, id -> computing id, computing id -> _DagNode
+        self.nodes = _topological_order(declared)
+        self.alias = {}
+        self.computations = {}
+        self.specs = []
+        keys = {DAG_SOURCE: (DAG_SOURCE,)}
+        computed_by = {}
+        for node_id in self.nodes:
+            node = declared[node_id]
+            inputs, operation = _node_inputs(node)
+            steps = node.get("steps", [])
+            if not isinstance(steps, list):
+                raise ValueError(f"Node '{node_id}': 'steps' must be a list")
+            try:
+                if factor != 1.0:
+                    steps = scale_steps(steps, factor)
+                step_keys = tuple(_step_key(step) for step in steps)
+                plan = compile_steps(steps)
+            except (AttributeError, TypeError, ValueError) as e:
+                raise ValueError(f"Node '{node_id}': {e}")
+            spec_entry = {"id": node_id, "steps": steps}
+            if operation is None:
+                spec_entry["input"] = inputs[0]
+            else:
+                spec_entry.update(merge=inputs, operation=operation)
+            self.specs.append(spec_entry)
+
+            key = (operation, tuple(keys[i] for i in inputs), step_keys)
+            keys[node_id] = key
+            if key in computed_by:
+                self.alias[node_id] = computed_by[key]
+                continue
+            computed_by[key] = node_id
+            self.computations[node_id] = _DagNode(node_id, [self.resolve(i) for i in inputs], operation, steps, plan)
+
+        consumed = {i for node in self.computations.values() for i in node.inputs}
+        outputs = spec.get("outputs")
+        if outputs is None:
+            # Default: the nodes nothing else reads
+            outputs = [n for n in self.nodes if n not in consumed and self.resolve(n) not in consumed]
+        if isinstance(outputs, str):
+            outputs = [outputs]
+        unknown = [o for o in outputs if o not in declared]
+        if not outputs or unknown:
+            raise ValueError(f"DAG outputs must be declared node ids, got: {outputs!r}")
+        self.outputs = list(outputs)
+
+        # Edges per computation (a merge may read the same node twice)
+        self.consumers = {}
+        self.dependents = {}
+        for node in self.computations.values():
+            for i in node.inputs:
+                self.consumers[i] = self.consumers.get(i, 0) + 1
+                self.dependents.setdefault(i, []).append(node)
+        self.step_executions = sum(len(node.steps) + (node.operation is not None) for node in self.computations.values())
+
+    def resolve(self, node_id):
+        """Id of the node that computes `node_id`."""
+        return self.alias.get(node_id, node_id)
+
+    def canonical(self):
+        """Cache spec of the DAG, or None if a node cannot be cached (see canonical_steps)."""
+        nodes = []
+        for entry in self.specs:
+            steps = canonical_steps(entry["steps"])
+            if steps is None:
+                return None
+            nodes.append({**entry, "steps": steps})
+        return {"nodes": nodes, "outputs": self.outputs}
+
+    def run(self, image, workers=1, on_node=None):
+        """
+        Runs the DAG on `image` (ndarray or CachedImage). Returns (outputs,
+        stats) with one ndarray per output id. on_node(id, ndarray) is called
+        as each computation finishes, from the thread that ran it. Node
+        results are dropped once their last consumer ran (outputs are kept).
+        Raises ValueError naming the node that failed.
+        """
+        keep = {self.resolve(o) for o in self.outputs}
+        results = {DAG_SOURCE: processing.CachedImage(image) if self.consumers.get(DAG_SOURCE, 0) > 1 else image}
+        remaining = dict(self.consumers)
+        waiting = {node_id: sum(i != DAG_SOURCE for i in node.inputs) for node_id, node in self.computations.items()}
+        node_ms = {}
+        peak = [0]
+
+        def compute(node):
+            start = time.perf_counter()
+            sources = [results[i] for i in node.inputs]
+            try:
+                if node.operation is None:
+                    current = sources[0]
+                else:
+                    current = processing.apply_arithmetic_ops(
+                        processing.as_array(sources[0]), processing.as_array(sources[1]), operation=node.operation
+                    )
+                result = node.plan.run(current)
+            except Exception as e:
+                raise ValueError(f"Node '{node.id}': {e}")
+            elapsed = (time.perf_counter() - start) * 1000
+            if on_node is not None:
+                on_node(node.id, result)
+            return result, elapsed
+
+        def finish(node, result, elapsed):
+            """Publishes a result (scheduling thread only). Returns the nodes it made ready."""
+            node_ms[node.id] = round(elapsed, 3)
+            # Fan-out: consumers share the color-space / histogram views
+            results[node.id] = processing.CachedImage(result) if self.consumers.get(node.id, 0) > 1 else result
+            for i in node.inputs:
+                remaining[i] -= 1
+                if not remaining[i] and i not in keep:
+                    results.pop(i, None)
+            peak[0] = max(peak[0], len(results))
+            ready = []
+            for dependent in self.dependents.get(node.id, []):
+                waiting[dependent.id] -= 1
+                if not waiting[dependent.id]:
+                    ready.append(dependent)
+            return ready
+
+        workers = max(1, min(int(workers), len(self.computations)))
+        ready = [node for node_id, node in self.computations.items() if not waiting[node_id]]
+        if workers == 1:
+            while ready:
+                node = ready.pop(0)
+                ready.extend(finish(node, *compute(node)))
+        else:
+            # Nodes are submitted as soon as their inputs are ready
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dag") as pool:
+                running = {pool.submit(compute, node): node for node in ready}
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node = running.pop(future)
+                        for dependent in finish(node, *future.result()):
+                            running[pool.submit(compute, dependent)] = dependent
+
+        outputs = {o: processing.as_array(results[self.resolve(o)]) for o in self.outputs}
+        stats = {
+            "nodes": len(self.nodes),
+            "computed_nodes": len(self.computations),
+            "shared_nodes": dict(self.alias),
+            "step_executions": self.step_executions,
+            "workers": workers,
+            "peak_live_results": peak[0],
+            "node_ms": node_ms
+        }
+        return outputs, stats
+
+class _DagNode:
+    def __init__(self, node_id, inputs, operation, steps, plan):
+        self.id = node_id
+        self.inputs = inputs
+        self.operation = operation
+        self.steps = steps
+        self.plan = plan
+
+def _node_inputs(node):
+    """(input ids, merge operation or None) of a DAG node."""
+    node_id = node["id"]
+    if "merge" in node:
+        inputs = node["merge"]
+        if not isinstance(inputs, list) or len(inputs) != 2 or not all(isinstance(i, str) for i in inputs):
+            raise ValueError(f"Node '{node_id}': 'merge' must list two node ids")
+        operation = node.get("operation", "add")
+        choices = get_operation("arithmetic").params["operation"].choices
+        if operation not in choices:
+            raise ValueError(f"Node '{node_id}': invalid merge operation {operation!r}. Valid: {list(choices)}")
+        return list(inputs), operation
+    source = node.get("input", DAG_SOURCE)
+    if not isinstance(source, str):
+        raise ValueError(f"Node '{node_id}': 'input' must be a node id")
+    return [source], None
+
+def _topological_order(declared):
+    """Declared node ids ordered so every node follows its inputs (declaration order otherwise)."""
+    order = []
+    state = {}
+
+    def visit(node_id, path):
+        if state.get(node_id) == "done":
+            return
+        if state.get(node_id) == "visiting":
+            raise ValueError(f"DAG pipeline has a cycle: {' -> '.join(path + [node_id])}")
+        state[node_id] = "visiting"
+        for i in _node_inputs(declared[node_id])[0]:
+            if i != DAG_SOURCE:
+                if i not in declared:
+                    raise ValueError(f"Node '{node_id}' reads unknown node '{i}'")
+                visit(i, path + [node_id])
+        state[node_id] = "done"
+        order.append(node_id)
+
+    for node_id in declared:
+        visit(node_id, [])
+    return order
+
+def _on_array(fn):
+    """Unwraps CachedImage input for ops that only work on the raw pixels."""
+    return lambda image: fn(processing.as_array(image))
+
+def compile_steps(steps, fuse=True):
+    """Validates a list of pipeline steps and compiles it into a PipelinePlan."""
+    return PipelinePlan(steps, fuse=fuse)
+
+def compile_candidates(step_lists):
+    """Compiles several step lists into a prefix-sharing CandidatePlan."""
+    return CandidatePlan(step_lists)
+
+def compile_dag(spec, factor=1.0):
+    """Validates a DAG pipeline spec ({"nodes": [...], "outputs": [...]}) into a DagPlan."""
+    return DagPlan(spec, factor)
 
 def _execute_step(image, op, params):
     """
     Applies a single operation to an image in memory.
-    Centralizes all syllabus logic.
+    `image` may be an ndarray or a processing.CachedImage (ops that read
+    color-space / histogram views reuse its cached ones). Returns an ndarray.
     """
-    if op == "gamma":
-        return processing.apply_gamma(image, float(params.get("gamma", 1.0)))
-    elif op == "clahe":
-        return processing.apply_clahe(image, clip_limit=float(params.get("clip_limit", 2.0)))
-    elif op == "median":
-        return processing.apply_median_filter(image, int(params.get("kernel_size", 3)))
-    elif op == "log":
-        return processing.apply_log_transform(image)
-    elif op == "equalize":
-        return processing.apply_equalization(image)
-
-    elif op == "gaussian":
-        return processing.apply_gaussian_filter(image, kernel_size=int(params.get("kernel_size", 5)), sigma=float(params.get("sigma", 0)))
-    elif op == "noise_gaussian":
-        return processing.add_gaussian_noise(image, mean=float(params.get("mean", 0)), sigma=float(params.get("sigma", 25)))
-    elif op == "noise_salt_pepper":
-        return processing.add_salt_pepper_noise(image, prob=float(params.get("prob", 0.05)))
-    elif op == "sim_downsampling":
-        return processing.simulate_downsampling(image, factor=float(params.get("factor", 0.5)))
-    elif op == "sim_quantization":
-        return processing.simulate_quantization(image, bits=int(params.get("bits", 3)))
-    elif op == "arithmetic":
-        # Load second image
-        img2_path = params.get("image2_path")
-        if not img2_path or not os.path.exists(img2_path):
-            raise ValueError(f"Arithmetic op requires valid 'image2_path'. Got: {img2_path}")
-        img2 = cv2.imread(img2_path)
-        if img2 is None:
-             raise ValueError(f"Could not load image2 from {img2_path}")
-        return processing.apply_arithmetic_ops(image, img2, operation=params.get("operation", "add"))
-    else:
-        raise ValueError(f"Unknown operation: {op}")
+    return compile_steps([{"op": op, "params": params}], fuse=False).run(image)
+
+def execute_steps(image, steps):
+    """Applies a list of steps with point-op fusion. Intermediates are not kept."""
+    return compile_steps(steps).run(image)
+
+def execute_steps_batch(stack, steps):
+    """Applies a list of steps to an (N, H, W[, C]) stack of same-size frames."""
+    return compile_steps(steps).run_batch(stack)
 
 def apply_transformation(image_path: str, operation: str, params: str = "{}") -> str:
     """
@@ -53,48 +492,14 @@ def apply_transformation(image_path: str, operation: str, params: str = "{}") ->
     except:
         parameters = {}
         
-    img = load_image(image_path)
-    
-    try:
+    def compute(img):
         result_img = _execute_step(img, operation, parameters)
-    except ValueError as e:
-        raise ValueError(str(e))
-        
-    # Generate meaningful suffix
-    if operation == "gamma":
-        suffix = f"gamma{parameters.get('gamma', 1.0)}"
-    elif operation == "clahe":
-        suffix = f"clahe{parameters.get('clip_limit', 2.0)}"
-    elif operation == "median":
-        suffix = f"median{parameters.get('kernel_size', 3)}"
-    elif operation == "gaussian":
-        suffix = f"gauss{parameters.get('kernel_size', 5)}"
-    elif operation == "arithmetic":
-        sub_op = parameters.get("operation", "arithmetic")
-        suffix = f"{sub_op}"
-        operation = sub_op 
-
-    elif operation.startswith("noise_"):
-        simple_name = operation.replace("noise_", "")
-        if "sigma" in parameters:
-            suffix = f"{simple_name}_sigma{parameters['sigma']}"
-        elif "prob" in parameters:
-            suffix = f"{simple_name}_prob{parameters['prob']}"
-        else:
-            suffix = simple_name
-
-    elif operation.startswith("sim_"):
-        simple_name = operation.replace("sim_", "")
-        if "factor" in parameters:
-            suffix = f"{simple_name}_{parameters['factor']}"
-        elif "bits" in parameters:
-            suffix = f"{simple_name}_{parameters['bits']}bits"
-        else:
-            suffix = simple_name
-    else:
-        suffix = operation
-        
-    return save_semantic_image(result_img, image_path, operation, suffix)
+        category, suffix = get_operation(operation).output_name(parameters)
+        return save_semantic_image(result_img, image_path, category, suffix)
+    
+    # Same pixels + same canonical op/params: return the existing artifact
+    spec = canonical_steps([{"op": operation, "params": parameters}])
+    return cached_result("transform", image_path, spec, compute)
 
 def add_noise(image_path: str, type: str, params: str = "{}") -> str:
     return apply_transformation(image_path, "noise_" + type if not type.startswith("noise_") else type, params)
@@ -0,0 +1,138 @@
+
+import base64
+import binascii
+import json
+import struct
+import time
+import cv2
+import numpy as np
+from .diagnostics import image_metrics
+from .io import save_semantic_image
+from .operations import get_operation
+from .result_cache import pixel_digest
+from .transform import compile_steps
+
+# In-memory transport: images travel as binary payloads (base64 in JSON)
+# instead of file paths, so small requests skip PNG encoding and the disk.
+#   raw:  b"DFRAW1" + ndim (uint8) + shape (ndim x uint32, little endian) + uint8 pixels
+#   png / webp (lossless) / jpg: the encoded file bytes (webp has no gray
+#   mode: gray images come back as 3 identical BGR channels)
+TRANSPORT_CODECS = ("raw", "png", "webp", "jpg")
+RAW_MAGIC = b"DFRAW1"
+
+_ENCODE_PARAMS = {
+    "png": (".png", [cv2.IMWRITE_PNG_COMPRESSION, 1]),
+    "webp": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 101]),
+    "jpg": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 90]),
+}
+
+def encode_image(img, codec="raw") -> bytes:
+    """Serializes a uint8 image to a transport payload."""
+    img = np.asarray(img)
+    if img.dtype != np.uint8:
+        raise ValueError(f"Only uint8 images can be transported, got {img.dtype}")
+    if codec == "raw":
+        header = RAW_MAGIC + struct.pack(f"<B{img.ndim}I", img.ndim, *img.shape)
+        return header + np.ascontiguousarray(img).tobytes()
+    if codec not in _ENCODE_PARAMS:
+        raise ValueError(f"Unknown codec: {codec}. Valid: {list(TRANSPORT_CODECS)}")
+    ext, params = _ENCODE_PARAMS[codec]
+    ok, buf = cv2.imencode(ext, img, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {codec}")
+    return buf.tobytes()
+
+def decode_image(payload):
+    """
+    Image from a transport payload: raw or encoded bytes, their base64 text,
+    or an ndarray (returned as is, for in-process Python callers).
+    """
+    if isinstance(payload, np.ndarray):
+        return payload
+    if isinstance(payload, str):
+        try:
+            payload = base64.b64decode(payload, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("Image payload is not valid base64")
+    payload = bytes(payload)
+    if payload.startswith(RAW_MAGIC):
+        offset = len(RAW_MAGIC)
+        try:
+            ndim = payload[offset]
+            shape = struct.unpack_from(f"<{ndim}I", payload, offset + 1)
+        except (IndexError, struct.error):
+            raise ValueError("Raw payload header is truncated")
+        data = np.frombuffer(payload, dtype=np.uint8, offset=offset + 1 + 4 * ndim)
+        if data.size != int(np.prod(shape)):
+            raise ValueError(f"Raw payload size does not match shape {list(shape)}")
+        return data.reshape(shape)
+    img = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Could not decode image payload")
+    if img.ndim == 3 and img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+def apply_transformation_array(image, operation: str, params: str = "{}", codec: str = "raw", persist: bool = False) -> dict:
+    """
+    apply_transformation without the filesystem: `image` is a payload
+    (base64 text, bytes or ndarray) and the result is returned as a base64
+    payload in `codec`. persist=True also saves the usual artifact.
+    """
+    try:
+        parameters = json.loads(params) if isinstance(params, str) else dict(params or {})
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON params"}
+    return _run_array(image, [{"op": operation, "params": parameters}], codec, persist)
+
+def apply_pipeline_array(image, steps_json: str, codec: str = "raw", persist: bool = False) -> dict:
+    """
+    Runs a pipeline on an in-memory image (point ops fused, no intermediates)
+    and returns the final image as a payload. persist=True saves it as well.
+    """
+    try:
+        steps = json.loads(steps_json) if isinstance(steps_json, str) else steps_json
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON"}
+    return _run_array(image, steps, codec, persist)
+
+def analyze_image_array(image) -> dict:
+    """analyze_image_metrics for an in-memory payload."""
+    try:
+        return image_metrics(decode_image(image))
+    except ValueError as e:
+        return {"error": str(e)}
+
+def _run_array(image, steps, codec, persist):
+    if codec not in TRANSPORT_CODECS:
+        return {"error": f"Unknown codec: {codec}. Valid: {list(TRANSPORT_CODECS)}"}
+    try:
+        img = decode_image(image)
+        start = time.perf_counter()
+        result = compile_steps(steps).run(img)
+        compute_ms = (time.perf_counter() - start) * 1000
+        payload = encode_image(result, codec)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    response = {
+        "image": base64.b64encode(payload).decode("ascii"),
+        "codec": codec,
+        "shape": list(result.shape),
+        "payload_bytes": len(payload),
+        "compute_ms": round(compute_ms, 3),
+        "artifact": None
+    }
+    if persist:
+        response["artifact"] = _persist(img, result, steps)
+    return response
+
+def _persist(source, result, steps):
+    # No source path: artifacts are named after the input pixels
+    name = f"array_{pixel_digest(source)[:12]}.png"
+    if len(steps) == 1:
+        op = steps[0].get("op")
+        category, suffix = get_operation(op).output_name(steps[0].get("params", {}))
+        return save_semantic_image(result, name, category, suffix)
+    suffix = "_".join(step.get("op") for step in steps)
+    return save_semantic_image(result, name, "pipeline", suffix)
@@ -2,12 +2,37 @@
 import json
 import os
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from .. import processing
-from .config import BASE_OUTPUT_DIR
+from . import config
+from .codecs import settle_artifacts, write_artifact
 from .io import load_image
-from .transform import _execute_step
+from .reports import schedule_report
+from .result_cache import cached_result, canonical_steps
+from .transform import compile_candidates, compile_dag, compile_steps
+
+def _score_image(img):
+    """
+    Experiment scoring metrics from two histogram passes:
+    gray (SNR, entropy) and raw channel values (brightness, contrast, range).
+    """
+    gray_stats = processing.calculate_image_statistics(img)
+    raw_stats = processing.calculate_histogram_statistics(processing.calculate_histogram(img, grayscale=False))
+    min_val = int(raw_stats['min'])
+    max_val = int(raw_stats['max'])
+    return {
+        "snr": gray_stats['snr'],
+        "entropy": gray_stats['entropy'],
+        "mean": raw_stats['mean'],
+        "std": raw_stats['std'],
+        "min": min_val,
+        "max": max_val,
+        "contrast": (max_val - min_val) / 255.0 if max_val != min_val else 0
+    }
 
 # NOTE: circular import potential if apply_pipeline uses workflows.
 # Wait, 'apply_pipeline' (single image) is currently in agent_api (transform or workflow?)
@@ -20,63 +45,178 @@ def apply_pipeline(image_path: str, steps_json: str) -> dict:
     """
     Applies a sequence of transformations, saving separate intermediate artifacts
     for EVERY step to allow full scientific traceability.
+    A JSON object with "nodes" is run as a branching DAG pipeline (see
+    transform.DagPlan): one artifact per node instead of per step.
     """
     try:
         steps = json.loads(steps_json)
     except:
         return {"error": "Invalid JSON"}
-        
-    img = load_image(image_path)
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Create Pipeline Flow Directory
-    flow_dir = os.path.join(BASE_OUTPUT_DIR, "Pipelines", f"{base_name}_{timestamp}_Flow")
-    os.makedirs(flow_dir, exist_ok=True)
-    
+    if isinstance(steps, dict):
+        return _run_dag_pipeline(image_path, steps)
+    try:
+        # Every step is persisted, so point ops are not fused here
+        plan = compile_steps(steps, fuse=False)
+    except ValueError as e:
+        return {"error": str(e)}
+    return _run_traceable_pipeline(image_path, plan)
+
+def _run_traceable_pipeline(image_path, plan):
+    """
+    Runs a compiled (unfused) plan on one image, saving every intermediate step.
+    Repeated calls with the same pixels and steps return the cached artifacts.
+    """
+    spec = canonical_steps(plan.steps)
+    return cached_result("pipeline", image_path, spec, lambda img: _traceable_pipeline(img, image_path, plan))
+
+def _traceable_pipeline(img, image_path, plan):
+    flow_dir = _flow_dir(image_path)
     artifacts = []
+    reports = []
     current_img = img.copy()
+    last = len(plan.stages)
     
     # Save Step 0 (Original)
-    step0_name = "00_original.png"
-    step0_path = os.path.join(flow_dir, step0_name)
-    cv2.imwrite(step0_path, current_img)
-    # Generate Report 0
-    step0_rep = processing.generate_evaluation_plot(current_img, title="Step 0: Original")
-    if step0_rep is not None:
-        cv2.imwrite(os.path.join(flow_dir, "00_original_REPORT.png"), step0_rep)
-    artifacts.append(step0_path)
-    
-    for i, step in enumerate(steps, 1):
-        op = step.get("op")
-        params = step.get("params", {})
-        
+    _save_flow_step(flow_dir, 0, "original", current_img, last, artifacts, reports)
+    
+    for i, stage in enumerate(plan.stages, 1):
         try:
-            current_img = _execute_step(current_img, op, params)
+            current_img = plan.run_stage(stage, current_img)
         except ValueError as e:
             return {"error": str(e)}
-            
-        # Naming: 01_median.png
-        step_name = f"{i:02d}_{op}.png"
-        step_path = os.path.join(flow_dir, step_name)
-        cv2.imwrite(step_path, current_img)
-        
-        # Report
-        step_rep = processing.generate_evaluation_plot(current_img, title=f"Step {i}: {op}")
-        if step_rep is not None:
-             cv2.imwrite(os.path.join(flow_dir, f"{i:02d}_{op}_REPORT.png"), step_rep)
-             
-        artifacts.append(step_path)
-            
+        _save_flow_step(flow_dir, i, stage.ops[0][0], current_img, last, artifacts, reports)
+    
+    # Steps were written behind the computation of the next ones
+    settle_artifacts(artifacts + reports)
+    return _flow_result(flow_dir, artifacts)
+
+def _run_dag_pipeline(image_path, spec):
+    """
+    Runs a DAG pipeline on one image: every node is computed once, branches
+    merge in memory and each node's result is saved once (01_<node id>.png).
+    """
+    try:
+        plan = compile_dag(spec)
+    except ValueError as e:
+        return {"error": str(e)}
+    return cached_result("pipeline_dag", image_path, plan.canonical(), lambda img: _traceable_dag(img, image_path, plan))
+
+def _traceable_dag(img, image_path, plan):
+    flow_dir = _flow_dir(image_path)
+    artifacts = []
+    reports = []
+    _save_flow_step(flow_dir, 0, "original", img, None, artifacts, reports)
+    
+    # Numbered in topological order; outputs are "result" artifacts
+    index = {node_id: i for i, node_id in enumerate(plan.computations, 1)}
+    outputs = {plan.resolve(o) for o in plan.outputs}
+    paths = {}
+    lock = threading.Lock()
+    
+    def save(node_id, result):
+        node_artifacts, node_reports = [], []
+        last = index[node_id] if node_id in outputs else None
+        _save_flow_step(flow_dir, index[node_id], node_id, result, last, node_artifacts, node_reports)
+        with lock:
+            paths[node_id] = node_artifacts[0]
+            reports.extend(node_reports)
+    
+    try:
+        _, execution = plan.run(processing.CachedImage(img), _pipeline_workers(), on_node=save)
+    except ValueError as e:
+        return {"error": str(e)}
+    
+    artifacts += [paths[node_id] for node_id in plan.computations]
+    settle_artifacts(artifacts + reports)
+    nodes = {node_id: paths[plan.resolve(node_id)] for node_id in plan.nodes}
+    result = _flow_result(flow_dir, artifacts)
+    result.update({
+        "final_image": nodes[plan.outputs[0]],
+        "outputs": {o: nodes[o] for o in plan.outputs},
+        "nodes": nodes,
+        "execution": execution
+    })
+    return result
+
+def _flow_dir(image_path):
+    """Creates the Pipeline Flow Directory for one run on `image_path`."""
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    flow_dir = os.path.join(config.BASE_OUTPUT_DIR, "Pipelines", f"{base_name}_{timestamp}_Flow")
+    os.makedirs(flow_dir, exist_ok=True)
+    return flow_dir
+
+def _save_flow_step(flow_dir, index, op, img, last, artifacts, reports, defer=True):
+    """
+    Saves step `index` of a flow (naming: 01_median.png) and its report,
+    appending their paths to `artifacts` and `reports`. Steps before `last`
+    are "intermediate" artifacts, the last one the "result".
+    """
+    role = "result" if index == last else "intermediate"
+    artifacts.append(write_artifact(img, os.path.join(flow_dir, f"{index:02d}_{op}.png"), role, defer))
+    title = "Step 0: Original" if index == 0 else f"Step {index}: {op}"
+    reports.append(schedule_report(img, os.path.join(flow_dir, f"{index:02d}_{op}_REPORT.png"), title))
+
+def _flow_result(flow_dir, artifacts):
     return {
         "flow_dir": flow_dir,
         "final_image": artifacts[-1],
         "all_artifacts": artifacts
     }
 
-def process_batch(directory: str, pipeline_json: str) -> list[str]:
+def apply_pipeline_tiled(image_path: str, steps_json: str, tile_size: int = None) -> dict:
+    """
+    Applies a pipeline tile by tile through memory-mapped buffers, so images
+    larger than RAM can be processed with bounded memory.
+    Only the final result is saved (no per-step artifacts or reports).
+    """
+    import shutil
+    import tempfile
+    from .tiling import apply_steps_tiled
+    
+    try:
+        steps = json.loads(steps_json)
+    except:
+        return {"error": "Invalid JSON"}
+    if not isinstance(steps, list):
+        return {"error": "Tiled pipelines take a list of steps (DAG pipelines are not supported)"}
+    try:
+        # Validated before anything is created on disk
+        compile_steps(steps)
+    except ValueError as e:
+        return {"error": str(e)}
+    tile_size = int(tile_size or config.TILE_SIZE)
+    
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    flow_dir = os.path.join(config.BASE_OUTPUT_DIR, "Pipelines", f"{base_name}_{timestamp}_Tiled")
+    os.makedirs(flow_dir, exist_ok=True)
+    final_path = os.path.join(flow_dir, f"{len(steps):02d}_{steps[-1].get('op') if steps else 'original'}.png")
+    
+    work_dir = tempfile.mkdtemp(prefix="tiles_", dir=config.TILE_WORK_DIR)
+    try:
+        stats = apply_steps_tiled(image_path, steps, final_path, work_dir, tile_size)
+    except ValueError as e:
+        return {"error": str(e)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    final_path = stats.pop("output_path")
+    return {
+        "flow_dir": flow_dir,
+        "final_image": final_path,
+        "tile_size": tile_size,
+        **stats
+    }
+
+def process_batch(directory: str, pipeline_json: str, vectorized: bool = False, workers: int = 1, streaming: bool = False) -> list[str]:
     """
     Applies a defined PIPELINE to all images in a directory.
+    
+    vectorized=True skips per-step artifacts: same-size frames are stacked and
+    processed as (N,H,W,C) arrays, and only final images are written.
+    workers > 1 runs the images on a process pool, streaming=True as a
+    decode -> compute -> write stream (see process_batch_parallel).
     """
     from .io import list_images
     
@@ -84,14 +224,35 @@ def process_batch(directory: str, pipeline_json: str) -> list[str]:
     results = []
     
     try:
-        _ = json.loads(pipeline_json)
+        steps = json.loads(pipeline_json)
     except:
         return ["Error: Invalid Pipeline JSON"]
+    
+    # Compiled once (validated params, prebuilt LUTs / CLAHE objects) and reused for every image
+    try:
+        plan = compile_steps(steps, fuse=vectorized)
+    except ValueError as e:
+        return [f"Error: {e}"]
+    
+    if vectorized:
+        return _process_batch_vectorized(images, plan)
+    
+    if streaming or int(workers or 1) > 1:
+        from .batch import batch_workers, run_batch_items, run_batch_streaming
+        workers = batch_workers(workers, len(images))
+        if streaming:
+            records, _ = run_batch_streaming(images, steps, workers)
+        else:
+            records = run_batch_items(images, steps, workers)
+        for record in records:
+            if record["status"] != "ok":
+                print(f"Error processing {record['image']}: {record['error']}")
+        return [record["final_image"] for record in records if record["status"] == "ok"]
 
     for img_path in images:
         try:
             # Re-use the traceable apply_pipeline logic
-            res = apply_pipeline(img_path, pipeline_json)
+            res = _run_traceable_pipeline(img_path, plan)
             if "final_image" in res:
                 results.append(res["final_image"])
         except Exception as e:
@@ -99,126 +260,206 @@ def process_batch(directory: str, pipeline_json: str) -> list[str]:
             
     return results
 
+def process_batch_parallel(directory: str, pipeline_json: str, workers: int = None, mode: str = "pool") -> dict:
+    """
+    Applies a PIPELINE to all images in a directory in parallel
+    (config.BATCH_WORKERS workers if `workers` is None, 0 = one per core):
+      - pool:   worker processes, each decoding, computing and writing its images.
+      - stream: decode -> compute -> write stages (threads) joined by bounded
+                queues, so disk I/O overlaps compute; adds per-stage stats.
+    Returns one record per image, in input order, with its status, artifacts,
+    error and timings.
+    """
+    from .batch import BATCH_MODES, batch_workers, cv2_threads_per_worker, run_batch_items, run_batch_streaming
+    from .io import list_images
+    
+    try:
+        steps = json.loads(pipeline_json)
+    except json.JSONDecodeError:
+        return {"error": "Invalid Pipeline JSON"}
+    if mode not in BATCH_MODES:
+        return {"error": f"Unknown batch mode: {mode}. Valid: {list(BATCH_MODES)}"}
+    try:
+        # Validated here so a bad pipeline fails once, not in every worker
+        compile_steps(steps, fuse=False)
+    except ValueError as e:
+        return {"error": str(e)}
+    
+    images = list_images(directory)
+    workers = batch_workers(workers, len(images))
+    start = time.perf_counter()
+    stages = None
+    if mode == "stream":
+        records, stages = run_batch_streaming(images, steps, workers)
+    else:
+        records = run_batch_items(images, steps, workers)
+    wall_ms = (time.perf_counter() - start) * 1000
+    
+    succeeded = sum(record["status"] == "ok" for record in records)
+    response = {
+        "results": records,
+        "summary": {
+            "mode": mode,
+            "images": len(records),
+            "succeeded": succeeded,
+            "failed": len(records) - succeeded,
+            "workers": workers,
+            "cv2_threads_per_worker": cv2_threads_per_worker(workers) if workers > 1 else cv2.getNumThreads(),
+            "wall_ms": round(wall_ms, 2),
+            "images_per_s": round(len(records) / (wall_ms / 1000), 2) if wall_ms > 0 else 0.0
+        }
+    }
+    if stages is not None:
+        response["stages"] = stages
+    return response
+
+def _process_batch_vectorized(image_paths, plan):
+    """
+    Decodes images in groups of config.BATCH_GROUP_SIZE, stacks same-shape
+    frames and runs the pipeline once per stack. Returns final paths in input order.
+    """
+    
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    batch_dir = os.path.join(config.BASE_OUTPUT_DIR, "Pipelines", f"Batch_{timestamp}")
+    os.makedirs(batch_dir, exist_ok=True)
+    
+    results = []
+    group_size = max(1, int(config.BATCH_GROUP_SIZE))
+    for start in range(0, len(image_paths), group_size):
+        group = image_paths[start:start + group_size]
+        outputs = [None] * len(group)
+        
+        # Bucket frames by shape
+        by_shape = {}
+        for index, path in enumerate(group):
+            try:
+                img = load_image(path)
+            except Exception as e:
+                print(f"Error processing {path}: {e}")
+                continue
+            by_shape.setdefault(img.shape, []).append((index, img))
+        
+        for members in by_shape.values():
+            stack = np.stack([img for _, img in members])
+            try:
+                processed = plan.run_batch(stack)
+            except ValueError as e:
+                print(f"Error processing batch group: {e}")
+                continue
+            for (index, _), frame in zip(members, processed):
+                name = os.path.splitext(os.path.basename(group[index]))[0]
+                out_path = write_artifact(frame, os.path.join(batch_dir, f"{name}.png"), "result")
+                outputs[index] = out_path
+        
+        results.extend(p for p in outputs if p is not None)
+    settle_artifacts(results)
+    return results
+
 def run_experiment(image_path: str, candidates_json: str = None) -> dict:
     """
     Experimentally applies multiple strategies (pipelines) to an image.
     Returns comprehensive metrics for scientific analysis.
+    Repeating an experiment on the same pixels returns the cached result.
     """
-    import time
+    # 1. Determine Candidates
+    try:
+        candidates_to_run = _parse_candidates(candidates_json)
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON in candidates definition"}
+    
+    # Same pixels + same candidates: the earlier experiment is returned
+    spec = _experiment_spec(candidates_to_run, custom=bool(candidates_json))
+    return cached_result(
+        "experiment", image_path, spec,
+        lambda img: _run_candidates(img, image_path, candidates_to_run, candidates_json)
+    )
+
+# Standard Battery (Tema 4, 5, 6 coverage): (name, steps, category, topic)
+DEFAULT_CANDIDATES = [
+    ("Original", [], "Baseline", "N/A"),
+    ("Gamma_0.5", [{"op": "gamma", "params": {"gamma": 0.5}}], "Enhancement", "Topic 6"),
+    ("CLAHE_Clip2.0", [{"op": "clahe", "params": {"clip_limit": 2.0}}], "Enhancement", "Topic 6"),
+    ("CLAHE_Clip4.0", [{"op": "clahe", "params": {"clip_limit": 4.0}}], "Enhancement", "Topic 6"),
+    ("Log_Transform", [{"op": "log"}], "Enhancement", "Topic 6"),
+    ("Equalization", [{"op": "equalize"}], "Enhancement", "Topic 6"),
+    ("Median_K3", [{"op": "median", "params": {"kernel_size": 3}}], "Restoration", "Topic 5"),
+    ("Median_K5", [{"op": "median", "params": {"kernel_size": 5}}], "Restoration", "Topic 5"),
+    ("Denoise_Enhance", [{"op": "median", "params": {"kernel_size": 3}}, {"op": "gamma", "params": {"gamma": 0.5}}], "Pipeline", "Topic 5+6"),
+]
+
+def _parse_candidates(candidates_json):
+    """
+    (name, steps) tuples from a candidates JSON list, or the standard battery
+    when none is given. Raises json.JSONDecodeError on invalid JSON.
+    """
+    if not candidates_json:
+        return list(DEFAULT_CANDIDATES)
+    return [(c["name"], c["steps"]) for c in json.loads(candidates_json)]
+
+def _experiment_spec(candidates, custom):
+    """Cache spec of an experiment, or None if a candidate cannot be cached."""
+    spec = []
+    for candidate in candidates:
+        steps = canonical_steps(candidate[1])
+        if steps is None:
+            return None
+        spec.append([candidate[0], steps] + list(candidate[2:]))
+    return {"custom": custom, "candidates": spec}
+
+def _run_candidates(img, image_path, candidates_to_run, candidates_json):
     experiment_start = time.time()
     
-    img = load_image(image_path)
+    # Cached views (gray, LAB, YCrCb, histograms) are shared by every candidate
+    img = processing.CachedImage(img)
     base_name = os.path.splitext(os.path.basename(image_path))[0]
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # Create Experiment Directory
-    exp_dir = os.path.join(BASE_OUTPUT_DIR, "Experiments", f"{base_name}_{timestamp}")
+    exp_dir = os.path.join(config.BASE_OUTPUT_DIR, "Experiments", f"{base_name}_{timestamp}")
     os.makedirs(exp_dir, exist_ok=True)
     
     # Calculate original image metrics
-    snr_orig = processing.calculate_snr(img)
-    entropy_orig = processing.calculate_entropy(img)
-    mean_orig = float(np.mean(img))
-    std_orig = float(np.std(img))
-    min_orig = int(np.min(img))
-    max_orig = int(np.max(img))
-    contrast_orig = (max_orig - min_orig) / 255.0 if max_orig != min_orig else 0
+    orig = _score_image(img)
+    snr_orig = orig["snr"]
+    entropy_orig = orig["entropy"]
+    mean_orig = orig["mean"]
+    std_orig = orig["std"]
+    min_orig = orig["min"]
+    max_orig = orig["max"]
+    contrast_orig = orig["contrast"]
     
-    # 1. Determine Candidates
-    if candidates_json:
-        try:
-            raw_candidates = json.loads(candidates_json)
-            candidates_to_run = []
-            for c in raw_candidates:
-                candidates_to_run.append((c["name"], c["steps"]))
-        except json.JSONDecodeError:
-             return {"error": "Invalid JSON in candidates definition"}
+    # Candidates are merged into a prefix tree: shared leading steps run once
+    workers = _experiment_workers()
+    plan = compile_candidates([candidate[1] for candidate in candidates_to_run])
+    outputs, errors, execution = plan.run(img, workers)
+    compute_ms = execution.pop("candidate_compute_ms")
+    
+    # Scoring, report and image writing run per candidate on a thread pool;
+    # results keep the candidate order (the sort below is stable)
+    def evaluate(index):
+        if index in errors:
+            print(f"Failed candidate {candidates_to_run[index][0]}: {errors[index]}")
+            return None
+        return _evaluate_candidate(
+            candidates_to_run[index], outputs[index], img, orig, exp_dir, candidates_json, compute_ms[index]
+        )
+    
+    indices = range(len(candidates_to_run))
+    workers = max(1, min(workers, len(candidates_to_run)))
+    if workers == 1:
+        evaluated = [evaluate(index) for index in indices]
     else:
-        # Standard Battery (Tema 4, 5, 6 coverage)
-        candidates_to_run = [
-            ("Original", [], "Baseline", "N/A"),
-            ("Gamma_0.5", [{"op": "gamma", "params": {"gamma": 0.5}}], "Enhancement", "Topic 6"),
-            ("CLAHE_Clip2.0", [{"op": "clahe", "params": {"clip_limit": 2.0}}], "Enhancement", "Topic 6"),
-            ("CLAHE_Clip4.0", [{"op": "clahe", "params": {"clip_limit": 4.0}}], "Enhancement", "Topic 6"),
-            ("Log_Transform", [{"op": "log"}], "Enhancement", "Topic 6"),
-            ("Equalization", [{"op": "equalize"}], "Enhancement", "Topic 6"),
-            ("Median_K3", [{"op": "median", "params": {"kernel_size": 3}}], "Restoration", "Topic 5"),
-            ("Median_K5", [{"op": "median", "params": {"kernel_size": 5}}], "Restoration", "Topic 5"),
-            ("Denoise_Enhance", [{"op": "median", "params": {"kernel_size": 3}}, {"op": "gamma", "params": {"gamma": 0.5}}], "Pipeline", "Topic 5+6"),
-        ]
-    
-    experiment_results = []
-    
-    for candidate in candidates_to_run:
-        # Support both 2-tuple (name, steps) and 4-tuple (name, steps, category, topic)
-        if len(candidate) == 4:
-            name, steps, category, topic = candidate
-        else:
-            name, steps = candidate
-            category, topic = "Custom", "N/A"
-        
-        current_img = img.copy()
-        param_desc = []
-        
-        try:
-            for step in steps:
-                op = step.get("op")
-                params = step.get("params", {})
-                current_img = _execute_step(current_img, op, params)
-                param_desc.append(f"{op}")
-                
-            snr_new = processing.calculate_snr(current_img)
-            ent_new = processing.calculate_entropy(current_img)
-            delta_snr = snr_new - snr_orig
-            
-            # Additional metrics
-            mean_new = float(np.mean(current_img))
-            std_new = float(np.std(current_img))
-            min_new = int(np.min(current_img))
-            max_new = int(np.max(current_img))
-            contrast_new = (max_new - min_new) / 255.0 if max_new != min_new else 0
-            
-            title = f"{name} ({' -> '.join(param_desc)})" if param_desc and not candidates_json else name
-            
-            report_img = processing.generate_evaluation_plot(current_img, title=title)
-            
-            safe_name = name.replace(" ", "_")
-            img_filename = f"{safe_name}.png"
-            report_filename = f"{safe_name}_REPORT.png"
-            
-            cv2.imwrite(os.path.join(exp_dir, img_filename), current_img)
-            if report_img is not None:
-                cv2.imwrite(os.path.join(exp_dir, report_filename), report_img)
-                
-            experiment_results.append({
-                "strategy": name,
-                "category": category,
-                "syllabus_topic": topic,
-                "steps": param_desc,
-                "metrics": {
-                    "snr_db": float(round(snr_new, 2)),
-                    "delta_snr": float(round(delta_snr, 2)),
-                    "entropy": float(round(ent_new, 3)),
-                    "mean_brightness": float(round(mean_new, 2)),
-                    "std_deviation": float(round(std_new, 2)),
-                    "contrast_ratio": float(round(contrast_new, 3)),
-                    "histogram_range": [min_new, max_new]
-                },
-                "verdict": "Recommended" if delta_snr > 5 else ("Good" if delta_snr > 2 else "Marginal"),
-                "artifacts": {
-                    "image": os.path.join(exp_dir, img_filename),
-                    "report": os.path.join(exp_dir, report_filename)
-                }
-            })
-            
-        except Exception as e:
-            print(f"Failed candidate {name}: {e}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="experiment") as pool:
+            evaluated = list(pool.map(evaluate, indices))
+    experiment_results = [result for result in evaluated if result is not None]
+    execution["evaluation_workers"] = workers
         
     experiment_results.sort(key=lambda x: x["metrics"]["delta_snr"], reverse=True)
     
     # Agent-friendly summary
     best = experiment_results[0] if experiment_results else None
     
+    settle_artifacts([path for r in experiment_results for path in r["artifacts"].values()])
     experiment_end = time.time()
     execution_time_ms = round((experiment_end - experiment_start) * 1000, 2)
     
@@ -241,53 +482,136 @@ def run_experiment(image_path: str, candidates_json: str = None) -> dict:
             "total_strategies_tested": len(experiment_results),
             "recommended_strategies": [r["strategy"] for r in experiment_results if r["verdict"] == "Recommended"]
         },
+        "execution": execution,
         "results": experiment_results
     }
 
-def run_median_demo(image_path: str, noise_prob: float = 0.05, kernel_size: int = 3) -> dict:
+def _evaluate_candidate(candidate, output, img, orig, exp_dir, candidates_json, compute_ms):
+    """
+    Scores one computed candidate and saves its image and report. Returns its
+    entry in the experiment results, or None if it failed.
+    """
+    # Support both 2-tuple (name, steps) and 4-tuple (name, steps, category, topic)
+    if len(candidate) == 4:
+        name, steps, category, topic = candidate
+    else:
+        name, steps = candidate
+        category, topic = "Custom", "N/A"
+    
+    param_desc = [f"{step.get('op')}" for step in steps]
+    
+    try:
+        # The result is wrapped so scoring and the report share one set of views
+        current_img = processing.CachedImage(output) if steps else img
+        
+        start = time.perf_counter()
+        metrics = _candidate_metrics(_score_image(current_img), orig)
+        scored_at = time.perf_counter()
+        
+        title = f"{name} ({' -> '.join(param_desc)})" if param_desc and not candidates_json else name
+        
+        safe_name = name.replace(" ", "_")
+        img_filename = f"{safe_name}.png"
+        report_filename = f"{safe_name}_REPORT.png"
+        
+        image_artifact = write_artifact(current_img.array, os.path.join(exp_dir, img_filename), "result")
+        written_at = time.perf_counter()
+        report_artifact = schedule_report(current_img, os.path.join(exp_dir, report_filename), title)
+        reported_at = time.perf_counter()
+    except Exception as e:
+        print(f"Failed candidate {name}: {e}")
+        return None
+    
+    # compute includes the shared prefix steps this candidate reused;
+    # report / write are queueing times outside the sync modes
+    timings = {
+        "compute": round(compute_ms, 3),
+        "metrics": round((scored_at - start) * 1000, 3),
+        "write": round((written_at - scored_at) * 1000, 3),
+        "report": round((reported_at - written_at) * 1000, 3)
+    }
+    timings["total"] = round(sum(timings.values()), 3)
+    return {
+        "strategy": name,
+        "category": category,
+        "syllabus_topic": topic,
+        "steps": param_desc,
+        "metrics": metrics,
+        "verdict": _verdict(metrics["delta_snr"]),
+        "artifacts": {
+            "image": image_artifact,
+            "report": report_artifact
+        },
+        "timings_ms": timings
+    }
+
+def _candidate_metrics(score, orig):
+    """Experiment metrics of a candidate from its _score_image and the original's."""
+    return {
+        "snr_db": float(round(score["snr"], 2)),
+        "delta_snr": float(round(score["snr"] - orig["snr"], 2)),
+        "entropy": float(round(score["entropy"], 3)),
+        "mean_brightness": float(round(score["mean"], 2)),
+        "std_deviation": float(round(score["std"], 2)),
+        "contrast_ratio": float(round(score["contrast"], 3)),
+        "histogram_range": [score["min"], score["max"]]
+    }
+
+def _verdict(delta_snr):
+    return "Recommended" if delta_snr > 5 else ("Good" if delta_snr > 2 else "Marginal")
+
+def _pipeline_workers():
+    """Threads for independent DAG pipeline branches (config.PIPELINE_WORKERS, 0 = one per core)."""
+    return int(config.PIPELINE_WORKERS) or os.cpu_count() or 1
+
+def _experiment_workers():
+    """Threads for independent experiment branches (config.EXPERIMENT_WORKERS, 0 = one per core)."""
+    return int(config.EXPERIMENT_WORKERS) or os.cpu_count() or 1
+
+def run_median_demo(image_path: str, noise_prob: float = 0.05, kernel_size: int = 3, seed: int = None) -> dict:
     """
     Demonstrates the effectiveness of median filter for salt & pepper noise removal.
     Tema 4 (Noise) + Tema 5 (Filtering) integration.
+    A fixed `seed` makes the noise (and therefore the metrics) reproducible.
     
     Returns paths to: original, noisy, filtered, difference images + metrics comparison.
     """
-    img = load_image(image_path)
+    img = processing.CachedImage(load_image(image_path))
     base_name = os.path.splitext(os.path.basename(image_path))[0]
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # Create Demo Directory
-    demo_dir = os.path.join(BASE_OUTPUT_DIR, "MedianDemo", f"{base_name}_{timestamp}")
+    demo_dir = os.path.join(config.BASE_OUTPUT_DIR, "MedianDemo", f"{base_name}_{timestamp}")
     os.makedirs(demo_dir, exist_ok=True)
     
     # Step 1: Original metrics
-    snr_original = processing.calculate_snr(img)
-    entropy_original = processing.calculate_entropy(img)
+    stats_original = processing.calculate_image_statistics(img)
+    snr_original, entropy_original = stats_original['snr'], stats_original['entropy']
     
     # Step 2: Add Salt & Pepper Noise
-    noisy_img = processing.add_salt_pepper_noise(img, prob=noise_prob)
-    snr_noisy = processing.calculate_snr(noisy_img)
-    entropy_noisy = processing.calculate_entropy(noisy_img)
+    noisy_img = processing.CachedImage(processing.add_salt_pepper_noise(img.array, prob=noise_prob, seed=seed))
+    stats_noisy = processing.calculate_image_statistics(noisy_img)
+    snr_noisy, entropy_noisy = stats_noisy['snr'], stats_noisy['entropy']
     
     # Step 3: Apply Median Filter
-    filtered_img = processing.apply_median_filter(noisy_img, kernel_size=kernel_size)
-    snr_filtered = processing.calculate_snr(filtered_img)
-    entropy_filtered = processing.calculate_entropy(filtered_img)
+    filtered_img = processing.CachedImage(processing.apply_median_filter(noisy_img.array, kernel_size=kernel_size))
+    stats_filtered = processing.calculate_image_statistics(filtered_img)
+    snr_filtered, entropy_filtered = stats_filtered['snr'], stats_filtered['entropy']
     
     # Step 4: Compute Difference (Noise Removed)
-    diff_img = cv2.absdiff(noisy_img, filtered_img)
+    diff_img = processing.CachedImage(cv2.absdiff(noisy_img.array, filtered_img.array))
     
     # Save all images
     paths = {}
+    reports = []
     for name, image in [("01_original", img), ("02_noisy", noisy_img), 
                         ("03_filtered", filtered_img), ("04_difference", diff_img)]:
-        path = os.path.join(demo_dir, f"{name}.png")
-        cv2.imwrite(path, image)
-        paths[name] = path
+        paths[name] = write_artifact(image.array, os.path.join(demo_dir, f"{name}.png"), "result")
         
         # Generate report for each
-        report = processing.generate_evaluation_plot(image, title=name.replace("_", " ").title())
-        if report is not None:
-            cv2.imwrite(os.path.join(demo_dir, f"{name}_REPORT.png"), report)
+        reports.append(schedule_report(image, os.path.join(demo_dir, f"{name}_REPORT.png"), name.replace("_", " ").title()))
+    
+    settle_artifacts(list(paths.values()) + reports)
     
     return {
         "demo_dir": demo_dir,
@@ -297,7 +621,7 @@ def run_median_demo(image_path: str, noise_prob: float = 0.05, kernel_size: int
             "noisy": {"snr_db": float(round(snr_noisy, 2)), "entropy": float(round(entropy_noisy, 3))},
             "filtered": {"snr_db": float(round(snr_filtered, 2)), "entropy": float(round(entropy_filtered, 3))}
         },
-        "noise_params": {"prob": noise_prob},
+        "noise_params": {"prob": noise_prob, "seed": seed},
         "filter_params": {"kernel_size": kernel_size},
         "snr_recovery_db": float(round(snr_filtered - snr_noisy, 2))
     }
@@ -32,3 +32,20 @@ def create_tab():
                 outputs=gr.Image(type="filepath", label="Avg Output"),
                 api_name="compute_average"
             )
+        with gr.Row():
+            gr.Interface(
+                fn=agent_api.compute_average_stats,
+                inputs=gr.Textbox(label="Directory"),
+                outputs=gr.JSON(label="Average + Noise Map"),
+                api_name="compute_average_stats"
+            )
+            gr.Interface(
+                fn=agent_api.compute_stack_reduction,
+                inputs=[
+                    gr.Textbox(label="Directory"),
+                    gr.Dropdown(choices=["median", "min", "max", "percentile"], value="median", label="Reduction"),
+                    gr.Slider(0, 100, value=50, step=1, label="Percentile")
+                ],
+                outputs=gr.Image(type="filepath", label="Reduced Output"),
+                api_name="compute_stack_reduction"
+            )
@@ -94,10 +94,11 @@ def create_tab():
             result = agent_api.run_experiment(img_path, custom_json if custom_json.strip() else None)
             
             # Build gallery from REPORT images (include histogram)
+            # Reports may be deferred: render on demand the ones shown here
             gallery_images = []
             for r in result.get("results", []):
                 report_path = r.get("artifacts", {}).get("report")
-                if report_path:
+                if report_path and agent_api.ensure_report(report_path):
                     gallery_images.append((report_path, r["strategy"]))
             
             return format_experiment_result(result), gallery_images, result
@@ -108,3 +109,22 @@ def create_tab():
             outputs=[exp_out_md, exp_gallery, exp_out_json],
             api_name="run_experiment"
         )
+        
+        gr.Markdown("---")
+        gr.Markdown("## 🎯 Búsqueda de Parámetros")
+        gr.Markdown("Evalúa rangos de parámetros sobre una versión reducida de la imagen y confirma los mejores a resolución completa.")
+        
+        gr.Interface(
+            fn=agent_api.search_parameters,
+            inputs=[
+                gr.Image(type="filepath", label="Imagen de Entrada"),
+                gr.Textbox(
+                    label="Search JSON",
+                    value='{"steps": [{"op": "gamma", "params": {"gamma": {"min": 0.3, "max": 1.0}}}], "objective": "delta_snr", "strategy": "golden", "top_k": 3}',
+                    lines=3
+                )
+            ],
+            outputs=gr.JSON(label="Resultado de la Búsqueda"),
+            api_name="search_parameters",
+            description="Estrategias: grid, golden, halving. Objetivos: delta_snr, entropy, contrast o {\"target_mean\": m}."
+        )
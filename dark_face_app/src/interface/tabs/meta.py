@@ -11,6 +11,20 @@ def create_tab():
             api_name="get_capabilities",
             description="Returns the agent's capabilities."
         )
+        gr.Interface(
+            fn=agent_api.get_cache_stats,
+            inputs=[],
+            outputs=gr.JSON(label="Cache Statistics"),
+            api_name="get_cache_stats",
+            description="Hit/miss counters of the processing caches."
+        )
+        gr.Interface(
+            fn=agent_api.get_output_stats,
+            inputs=[],
+            outputs=gr.JSON(label="Output Statistics"),
+            api_name="get_output_stats",
+            description="Bytes written and encode time per artifact role and output policy."
+        )
         gr.Interface(
             fn=agent_api.configure_agent,
             inputs=gr.Textbox(label="Config JSON", value='{"base_output_dir": "output"}'),
@@ -7,13 +7,14 @@ PIPELINE_PRESETS = {
     "Denoise + Enhance (Gamma)": '[{"op": "median", "params": {"kernel_size": 3}}, {"op": "gamma", "params": {"gamma": 0.5}}]',
     "Low Light Recovery (CLAHE)": '[{"op": "clahe", "params": {"clip_limit": 3.0}}, {"op": "gamma", "params": {"gamma": 0.7}}]',
     "Aggressive Enhancement (Log + Equalize)": '[{"op": "log"}, {"op": "equalize"}]',
-    "Noise Reduction Only (Median K5)": '[{"op": "median", "params": {"kernel_size": 5}}]'
+    "Noise Reduction Only (Median K5)": '[{"op": "median", "params": {"kernel_size": 5}}]',
+    "DAG: Denoised + Enhanced Fusion": '{"nodes": [{"id": "denoised", "input": "source", "steps": [{"op": "median", "params": {"kernel_size": 3}}]}, {"id": "enhanced", "input": "source", "steps": [{"op": "clahe", "params": {"clip_limit": 3.0}}]}, {"id": "fused", "merge": ["denoised", "enhanced"], "operation": "add", "steps": [{"op": "gamma", "params": {"gamma": 0.7}}]}]}'
 }
 
 def create_tab():
     with gr.Tab("⚙️ Pipelines & Batch"):
         gr.Markdown("## 🔗 Pipeline de Transformaciones")
-        gr.Markdown("Aplica una secuencia de operaciones con trazabilidad completa.")
+        gr.Markdown("Aplica una secuencia de operaciones con trazabilidad completa. Un objeto `{\"nodes\": [...]}` define un pipeline en grafo (DAG): ramas desde `source` que se combinan en memoria con operaciones aritméticas (`merge`).")
         
         with gr.Row():
             with gr.Column(scale=1):
@@ -41,7 +42,8 @@ def create_tab():
             result = agent_api.apply_pipeline(img_path, steps_json)
             if "error" in result:
                 return None, result
-            return result.get("final_image"), result
+            # With asynchronous artifact writes the file may still be queued
+            return agent_api.ensure_artifact(result.get("final_image")), result
         
         pipe_preset.change(fn=update_json_from_preset, inputs=pipe_preset, outputs=pipe_json)
         pipe_btn.click(
@@ -51,6 +53,30 @@ def create_tab():
             api_name="apply_pipeline"
         )
         
+        gr.Markdown("---")
+        gr.Markdown("## 🧩 Pipeline por Teselas (Imágenes Muy Grandes)")
+        gr.Markdown("Procesa la imagen por bloques con buffers en disco: el procesamiento usa memoria acotada sin importar el tamaño. La decodificación inicial de formatos comprimidos (PNG, JPG...) sí carga la imagen completa; solo las entradas `.npy` quedan acotadas de principio a fin.")
+        
+        with gr.Row():
+            with gr.Column():
+                tiled_path = gr.Textbox(label="Ruta de la Imagen", placeholder="/ruta/a/panorama.tif")
+                tiled_json = gr.Textbox(
+                    label="Steps JSON",
+                    placeholder='[{"op": "median", "params": {"kernel_size": 3}}, {"op": "clahe", "params": {"clip_limit": 2.0}}]',
+                    lines=2
+                )
+                tiled_size = gr.Slider(256, 4096, value=1024, step=256, label="Tamaño de Tesela (px)")
+                tiled_btn = gr.Button("▶️ Ejecutar por Teselas", variant="primary")
+            with gr.Column():
+                tiled_out = gr.JSON(label="Resultado")
+        
+        tiled_btn.click(
+            fn=lambda path, steps, size: agent_api.apply_pipeline_tiled(path, steps, int(size)),
+            inputs=[tiled_path, tiled_json, tiled_size],
+            outputs=tiled_out,
+            api_name="apply_pipeline_tiled"
+        )
+        
         gr.Markdown("---")
         gr.Markdown("## 📦 Procesamiento por Lotes")
         gr.Markdown("Aplica un pipeline a todas las imágenes de un directorio.")
@@ -73,3 +99,99 @@ def create_tab():
             outputs=batch_out,
             api_name="process_batch"
         )
+        
+        gr.Interface(
+            fn=agent_api.process_batch_parallel,
+            inputs=[
+                gr.Textbox(label="Directorio de Entrada", placeholder="/ruta/a/imagenes"),
+                gr.Textbox(label="Pipeline JSON", placeholder='[{"op": "gamma", "params": {"gamma": 0.5}}]'),
+                gr.Number(label="Workers (0 = uno por núcleo)", value=0, precision=0),
+                gr.Dropdown(label="Modo", choices=["pool", "stream"], value="pool")
+            ],
+            outputs=gr.JSON(label="Resultados por Imagen"),
+            api_name="process_batch_parallel",
+            description="Lote en paralelo (pool de procesos, o stream decodificar → procesar → escribir con colas acotadas y estadísticas por etapa): estado, artefactos, errores y tiempos por imagen, en el orden de entrada."
+        )
+        
+        gr.Markdown("---")
+        gr.Markdown("## 🛰️ API en Memoria (payloads base64)")
+        gr.Markdown("Para clientes MCP/Python: la imagen viaja como payload binario (raw con cabecera de forma, png, webp o jpg) sin pasar por disco. `persist` guarda además el artefacto.")
+        
+        gr.Interface(
+            fn=agent_api.apply_pipeline_array,
+            inputs=[
+                gr.Textbox(label="Image Payload (base64)", lines=2),
+                gr.Textbox(label="Steps JSON", placeholder='[{"op": "gamma", "params": {"gamma": 0.5}}]'),
+                gr.Dropdown(["raw", "png", "webp", "jpg"], value="raw", label="Codec de Salida"),
+                gr.Checkbox(value=False, label="Persistir artefacto")
+            ],
+            outputs=gr.JSON(label="Resultado"),
+            api_name="apply_pipeline_array",
+            description="Runs a pipeline on an in-memory payload and returns the result payload."
+        )
+        gr.Interface(
+            fn=agent_api.apply_transformation_array,
+            inputs=[
+                gr.Textbox(label="Image Payload (base64)", lines=2),
+                gr.Textbox(label="Operation", value="gamma"),
+                gr.Textbox(label="Params JSON", value="{}"),
+                gr.Dropdown(["raw", "png", "webp", "jpg"], value="raw", label="Codec de Salida"),
+                gr.Checkbox(value=False, label="Persistir artefacto")
+            ],
+            outputs=gr.JSON(label="Resultado"),
+            api_name="apply_transformation_array",
+            description="Applies one operation to an in-memory payload."
+        )
+        gr.Interface(
+            fn=agent_api.analyze_image_array,
+            inputs=gr.Textbox(label="Image Payload (base64)", lines=2),
+            outputs=gr.JSON(label="Métricas"),
+            api_name="analyze_image_array",
+            description="Diagnostic metrics of an in-memory payload."
+        )
+        
+        gr.Markdown("---")
+        gr.Markdown("## 🔍 Vista Previa (multi-resolución)")
+        gr.Markdown("Para ajustes interactivos: la petición se ejecuta sobre un nivel reducido de la pirámide de la imagen (en caché) dentro del presupuesto de latencia, con los tamaños de kernel escalados. `commit_preview` renderiza la misma petición a resolución completa.")
+        
+        gr.Interface(
+            fn=agent_api.preview_transformation,
+            inputs=[
+                gr.Image(type="filepath", label="Input Image"),
+                gr.Textbox(label="Operation", value="gamma"),
+                gr.Textbox(label="Params JSON", value="{}"),
+                gr.Dropdown(["raw", "png", "webp", "jpg"], value="jpg", label="Codec de Salida")
+            ],
+            outputs=gr.JSON(label="Vista Previa"),
+            api_name="preview_transformation",
+            description="Previews one operation on a downscaled copy and returns the payload and a commit token."
+        )
+        gr.Interface(
+            fn=agent_api.preview_pipeline,
+            inputs=[
+                gr.Image(type="filepath", label="Input Image"),
+                gr.Textbox(label="Steps JSON", placeholder='[{"op": "median", "params": {"kernel_size": 5}}, {"op": "gamma", "params": {"gamma": 0.5}}]'),
+                gr.Dropdown(["raw", "png", "webp", "jpg"], value="jpg", label="Codec de Salida")
+            ],
+            outputs=gr.JSON(label="Vista Previa"),
+            api_name="preview_pipeline",
+            description="Previews a pipeline's final image on a downscaled copy."
+        )
+        gr.Interface(
+            fn=agent_api.preview_experiment,
+            inputs=[
+                gr.Image(type="filepath", label="Input Image"),
+                gr.Textbox(label="Candidates JSON (vacío = batería estándar)", lines=2),
+                gr.Dropdown(["raw", "png", "webp", "jpg"], value="jpg", label="Codec de Salida")
+            ],
+            outputs=gr.JSON(label="Vista Previa"),
+            api_name="preview_experiment",
+            description="Ranks experiment candidates on a downscaled copy (proxy metrics, nothing written)."
+        )
+        gr.Interface(
+            fn=agent_api.commit_preview,
+            inputs=gr.Textbox(label="Commit Token"),
+            outputs=gr.JSON(label="Resultado"),
+            api_name="commit_preview",
+            description="Renders a previewed request at full resolution (artifacts and reports)."
+        )
@@ -1,5 +1,5 @@
 import gradio as gr
-from ..utils import update_visibility, wrapper_transform
+from ..utils import update_visibility, wrapper_preview_transform, wrapper_transform
 
 def create_tab():
     with gr.Tab("✨ Restoration & Enhancement"):
@@ -10,7 +10,7 @@ def create_tab():
                 with gr.Column():
                     t2_img = gr.Image(type="filepath", label="Input Image")
                     t2_op = gr.Dropdown(
-                        choices=["gamma", "clahe", "equalize", "log", "median", "gaussian"], 
+                        choices=["gamma", "clahe", "equalize", "contrast_stretching", "log", "median", "gaussian", "unsharp"], 
                         label="Operation", value="gamma"
                     )
                     # Human Controls - Initial State: Gamma visible, others hidden
@@ -25,6 +25,7 @@ def create_tab():
                     t2_btn = gr.Button("Apply Transformation", variant="primary")
                 
                 with gr.Column():
+                    t2_preview = gr.Image(type="numpy", label="Preview (downscaled)")
                     t2_out = gr.Image(type="filepath", label="Result Image")
             
             # Logic Wiring
@@ -34,6 +35,16 @@ def create_tab():
                 outputs=[t2_gamma, t2_kernel, t2_clip]
             )
 
+            # Slider tweaks only render a preview; the button commits full resolution
+            preview_inputs = [t2_img, t2_op, t2_json, t2_gamma, t2_kernel, t2_clip]
+            for control in [t2_img, t2_op, t2_gamma, t2_kernel, t2_clip]:
+                control.change(
+                    fn=wrapper_preview_transform,
+                    inputs=preview_inputs,
+                    outputs=t2_preview,
+                    show_api=False
+                )
+
             t2_btn.click(
                 fn=wrapper_transform, 
                 inputs=[t2_img, t2_op, t2_json, t2_gamma, t2_kernel, t2_clip],
@@ -1,7 +1,9 @@
 
 import json
+import cv2
 import gradio as gr
 from .. import agent_api
+from ..agent_api.preview import preview_array
 
 # --- 1. VISIBILITY LOGIC ---
 
@@ -60,8 +62,7 @@ def format_metrics_table(json_data):
 
 # --- 3. EXECUTION WRAPPERS (Hybrid Logic) ---
 
-def wrapper_transform(img, op, json_params, gamma, kernel, clip):
-    """Hybrid wrapper: uses JSON if active, else uses sliders."""
+def _transform_params(op, json_params, gamma, kernel, clip):
     p = {}
     # Try parsing JSON first
     if json_params and json_params.strip() != "{}":
@@ -73,9 +74,26 @@ def wrapper_transform(img, op, json_params, gamma, kernel, clip):
         if op == "gamma": p = {"gamma": gamma}
         elif op in ["median", "gaussian"]: p = {"kernel_size": int(kernel)}
         elif op == "clahe": p = {"clip_limit": clip}
-    
+    return p
+
+def wrapper_transform(img, op, json_params, gamma, kernel, clip):
+    """Hybrid wrapper: uses JSON if active, else uses sliders."""
+    p = _transform_params(op, json_params, gamma, kernel, clip)
     return agent_api.apply_transformation(img, op, json.dumps(p))
 
+def wrapper_preview_transform(img, op, json_params, gamma, kernel, clip):
+    """Live preview on a downscaled copy (RGB array); the button renders full resolution."""
+    if not img:
+        return None
+    p = _transform_params(op, json_params, gamma, kernel, clip)
+    try:
+        preview, _ = preview_array(img, [{"op": op, "params": p}])
+    except (ValueError, OSError):
+        return None
+    if preview.ndim == 2:
+        return preview
+    return cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+
 def wrapper_noise(img, type, json_params, mean, sigma, prob):
     p = {}
     if json_params and json_params.strip() != "{}":
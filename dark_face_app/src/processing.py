@@ -1,25 +1,42 @@
 import cv2
 import numpy as np
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import matplotlib
 # Use Agg backend for non-interactive plotting (avoid thread issues)
 matplotlib.use('Agg') 
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import io
 
-def generate_evaluation_plot(image, title="Analysis"):
+REPORT_BACKENDS = ("matplotlib", "native")
+
+def generate_evaluation_plot(image, title="Analysis", backend="matplotlib"):
     """
     Generates a composite image with the input image, its histogram, and metrics.
+    backend: 'matplotlib' (Figure rendered to PNG) or 'native' (cv2 drawing on a NumPy canvas).
     Returns: numpy array (RGB image of the plot)
     """
     if image is None: return None
+    # 1. Calc Metrics (single histogram pass, reused if the image is a CachedImage)
+    stats = calculate_image_statistics(image)
+    channel_hists = _report_channel_histograms(image)
+    image = as_array(image)
+    if len(image.shape) == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    snr = stats['snr']
+    entropy = stats['entropy']
     
-    # 1. Calc Metrics
-    snr = calculate_snr(image)
-    entropy = calculate_entropy(image)
-    stats = calculate_advanced_statistics(image)
+    if backend == "native":
+        return render_evaluation_report(image, title, stats, channel_hists)
+    if backend != "matplotlib":
+        raise ValueError(f"Unknown report backend: {backend}")
     
     # 2. Setup Plot
-    fig = plt.figure(figsize=(12, 6), constrained_layout=True)
+    # Object-oriented Figure (no pyplot global state) so reports can render in worker threads
+    fig = Figure(figsize=(12, 6), constrained_layout=True)
     gs = fig.add_gridspec(2, 2)
     
     # Image Subplot
@@ -32,9 +49,8 @@ def generate_evaluation_plot(image, title="Analysis"):
     
     # Histogram Subplot
     ax_hist = fig.add_subplot(gs[0, 1])
-    colors = ('r', 'g', 'b')
-    for i, color in enumerate(colors):
-        hist = cv2.calcHist([image], [i], None, [256], [0, 256])
+    colors = ('b', 'g', 'r')  # OpenCV channel order
+    for hist, color in zip(channel_hists, colors):
         ax_hist.plot(hist, color=color)
         ax_hist.set_xlim([0, 256])
     ax_hist.set_title("Histogram (RGB)")
@@ -62,10 +78,90 @@ def generate_evaluation_plot(image, title="Analysis"):
     # Decode buffer to cv2 image
     raw_data = np.frombuffer(buf.getvalue(), np.uint8)
     report_img = cv2.imdecode(raw_data, 1)
-    
-    plt.close(fig)
     return report_img
 
+def render_evaluation_report(image, title="Analysis", stats=None, channel_hists=None):
+    """
+    Same layout as the matplotlib report (image | histogram / metrics), drawn
+    directly with cv2 primitives on a 1200x600 canvas. No Figure, no PNG round-trip.
+    Returns: numpy array (BGR, as cv2.imdecode would)
+    """
+    if stats is None:
+        stats = calculate_image_statistics(image)
+    if channel_hists is None:
+        channel_hists = _report_channel_histograms(image)
+    image = as_array(image)
+    
+    width, height = 1200, 600
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    black = (0, 0, 0)
+    
+    # Image panel (left half), aspect-fit below the title
+    img_bgr = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if len(image.shape) == 2 else image
+    _draw_centered_text(canvas, f"Result: {title}", 300, 32, 0.6)
+    panel_w, panel_h = 560, 530
+    h, w = img_bgr.shape[:2]
+    scale = min(panel_w / w, panel_h / h)
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    thumb = cv2.resize(img_bgr, (new_w, new_h), interpolation=interp)
+    x0 = 20 + (panel_w - new_w) // 2
+    y0 = 50 + (panel_h - new_h) // 2
+    canvas[y0:y0 + new_h, x0:x0 + new_w] = thumb
+    
+    # Histogram panel (top right)
+    hx0, hy0, hx1, hy1 = 660, 50, 1170, 270
+    _draw_centered_text(canvas, "Histogram (RGB)", (hx0 + hx1) // 2, 35, 0.6)
+    for i in range(1, 4):
+        gx = hx0 + (hx1 - hx0) * i // 4
+        gy = hy0 + (hy1 - hy0) * i // 4
+        cv2.line(canvas, (gx, hy0), (gx, hy1), (230, 230, 230), 1)
+        cv2.line(canvas, (hx0, gy), (hx1, gy), (230, 230, 230), 1)
+    cv2.rectangle(canvas, (hx0, hy0), (hx1, hy1), black, 1)
+    for value, label in ((0, "0"), (128, "128"), (256, "256")):
+        lx = hx0 + (hx1 - hx0) * value // 256
+        cv2.putText(canvas, label, (lx - 8, hy1 + 18), font, 0.4, black, 1, cv2.LINE_AA)
+    
+    hists = channel_hists
+    peak = max(float(hh.max()) for hh in hists) or 1.0
+    xs = hx0 + np.arange(256) * (hx1 - hx0) / 256.0
+    colors = ((255, 0, 0), (0, 160, 0), (0, 0, 255))  # B, G, R in BGR order
+    for hh, color in zip(hists, colors):
+        ys = hy1 - hh / peak * (hy1 - hy0)
+        pts = np.stack([xs, ys], axis=1).round().astype(np.int32)
+        cv2.polylines(canvas, [pts], False, color, 1, cv2.LINE_AA)
+    
+    # Metrics text (bottom right)
+    lines = [
+        "METRICS:",
+        "---------",
+        f"SNR: {stats['snr']:.2f} dB",
+        f"Entropy: {stats['entropy']:.3f}",
+        f"Mean Intensity: {stats['mean']:.1f}",
+        f"Std Dev (Contrast): {stats['std']:.1f}",
+        f"Dynamic Range: {stats['dynamic_range']:.1f}",
+    ]
+    for i, line in enumerate(lines):
+        cv2.putText(canvas, line, (700, 345 + i * 32), font, 0.7, black, 1, cv2.LINE_AA)
+    
+    return canvas
+
+def _report_channel_histograms(image):
+    """B, G, R histograms for the report (gray input is drawn as three equal channels)."""
+    if not isinstance(image, CachedImage):
+        image = CachedImage(image)
+    hists = image.channel_histograms
+    return hists * 3 if len(hists) == 1 else hists
+
+def _draw_centered_text(canvas, text, center_x, baseline_y, scale):
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    # Hershey fonts are ASCII-only
+    text = text.encode("ascii", "replace").decode("ascii")
+    (text_w, _), _ = cv2.getTextSize(text, font, scale, 1)
+    x = max(2, center_x - text_w // 2)
+    cv2.putText(canvas, text, (x, baseline_y), font, scale, (0, 0, 0), 1, cv2.LINE_AA)
+
 def apply_gamma(image, gamma=1.0):
     """
     Apply Gamma Correction to an image.
@@ -77,28 +173,60 @@ def apply_gamma(image, gamma=1.0):
     - gamma = 1: Sin cambio
     """
     if gamma <= 0: return image
-    # Apply gamma directly: O = I^gamma (normalized)
-    table = np.array([((i / 255.0) ** gamma) * 255
-                      for i in np.arange(0, 256)]).astype("uint8")
-    return cv2.LUT(image, table)
+    return cv2.LUT(image, build_gamma_lut(gamma))
 
-def apply_equalization(image):
+def apply_equalization(image, table=None):
     """
     Apply global Histogram Equalization.
     Converts to YCrCb to equalize only the Y (Luminance) channel.
+    
+    Args:
+        table: Optional precomputed mapping (build_equalization_lut) applied
+               instead of equalizing with the image's own histogram.
     """
+    equalize = cv2.equalizeHist if table is None else (lambda channel: cv2.LUT(channel, table))
+    if isinstance(image, CachedImage):
+        ycrcb = image.ycrcb if image.ndim == 3 else None
+        image = image.array
+    else:
+        ycrcb = None
     if len(image.shape) == 3:
-        # Convert to YCrCb
-        ycrcb = cv2.cvtColor(image, cv2.COLOR_RGB2YCrCb)
+        # Convert to YCrCb (input is BGR, as loaded by cv2)
+        if ycrcb is None:
+            ycrcb = cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)
         channels = list(cv2.split(ycrcb))
         # Equalize Y channel
-        channels[0] = cv2.equalizeHist(channels[0])
+        channels[0] = equalize(channels[0])
         # Merge and convert back
         merged = cv2.merge(channels)
-        return cv2.cvtColor(merged, cv2.COLOR_YCrCb2RGB)
+        return cv2.cvtColor(merged, cv2.COLOR_YCrCb2BGR)
     else:
         # Grayscale
-        return cv2.equalizeHist(image)
+        return equalize(image)
+
+def equalization_channel(image):
+    """Returns the channel apply_equalization equalizes (Y of YCrCb, or gray)."""
+    if isinstance(image, CachedImage):
+        return image.ycrcb[:, :, 0] if image.ndim == 3 else image.array
+    if len(image.shape) == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)[:, :, 0]
+    return image
+
+def build_equalization_lut(hist):
+    """
+    Equalization table from a 256-bin histogram, bit-identical to cv2.equalizeHist.
+    Allows equalizing with a histogram accumulated elsewhere (e.g. over tiles).
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    first = int(np.flatnonzero(hist)[0])
+    total = int(hist.sum())
+    if hist[first] == total:
+        return np.full(256, first, dtype=np.uint8)
+    scale = np.float32(255.0 / (total - hist[first]))
+    cum = np.cumsum(hist[first + 1:])
+    table = np.zeros(256, dtype=np.uint8)
+    table[first + 1:] = np.clip(np.rint(cum.astype(np.float32) * scale), 0, 255)
+    return table
 
 def apply_median_filter(image, kernel_size=3):
     """
@@ -123,6 +251,13 @@ def apply_negative(image):
     """
     return 255 - image
 
+def apply_linear_stretch(image, in_low=0, in_high=255):
+    """
+    Apply a fixed-range linear stretch: maps [in_low, in_high] to [0, 255].
+    Tema 6: Función a trozos lineal con puntos de corte fijos (no dependientes de la imagen).
+    """
+    return cv2.LUT(image, build_stretch_lut(in_low, in_high))
+
 def apply_log_transform(image, c=1.0):
     """
     Apply Logarithmic Transformation to an image.
@@ -133,21 +268,9 @@ def apply_log_transform(image, c=1.0):
         image: Input image (uint8)
         c: Scaling constant (default 1.0, auto-scaled to use full range)
     """
-    # Convert to float for calculation
-    img_float = image.astype(np.float32)
-    
-    # Apply log transform: s = c * log(1 + r)
-    # c is typically chosen to scale output to [0, 255]
-    # c = 255 / log(1 + max_input)
-    c_auto = 255 / np.log(1 + 255)
-    
-    result = c_auto * c * np.log(1 + img_float)
-    
-    # Clip and convert back to uint8
-    result = np.clip(result, 0, 255).astype(np.uint8)
-    return result
+    return cv2.LUT(image, build_log_lut(c))
 
-def apply_clahe(image, clip_limit=2.0, tile_grid_size=8):
+def apply_clahe(image, clip_limit=2.0, tile_grid_size=8, clahe=None):
     """
     Apply CLAHE (Contrast Limited Adaptive Histogram Equalization).
     Mejora la ecualización estándar evitando sobre-amplificación del ruido.
@@ -155,15 +278,29 @@ def apply_clahe(image, clip_limit=2.0, tile_grid_size=8):
     Args:
         image: Input image
         clip_limit: Threshold for contrast limiting (default 2.0)
-        tile_grid_size: Size of grid for histogram equalization (default 8x8)
+        tile_grid_size: Size of grid for histogram equalization (default 8x8),
+                        or a (tiles_x, tiles_y) tuple
+        clahe: Optional prebuilt cv2.CLAHE object (clip_limit and
+               tile_grid_size are then ignored)
     """
+    if clahe is None:
+        # Borrow a pooled CLAHE object for these settings instead of creating one per call
+        grid = tile_grid_size if isinstance(tile_grid_size, tuple) else (tile_grid_size, tile_grid_size)
+        with _clahe_cache.borrow((float(clip_limit), tuple(int(t) for t in grid)),
+                                 lambda: create_clahe(clip_limit, tile_grid_size)) as pooled:
+            return apply_clahe(image, clahe=pooled)
+    if isinstance(image, CachedImage):
+        lab = image.lab if image.ndim == 3 else None
+        image = image.array
+    else:
+        lab = None
     if len(image.shape) == 3:
-        # Convert to LAB color space
-        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+        # Convert to LAB color space (reusing a cached conversion if available)
+        if lab is None:
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
         l, a, b = cv2.split(lab)
         
         # Apply CLAHE to L channel
-        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid_size, tile_grid_size))
         l_clahe = clahe.apply(l)
         
         # Merge and convert back
@@ -171,42 +308,60 @@ def apply_clahe(image, clip_limit=2.0, tile_grid_size=8):
         return cv2.cvtColor(lab_clahe, cv2.COLOR_LAB2BGR)
     else:
         # Grayscale
-        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid_size, tile_grid_size))
         return clahe.apply(image)
 
-def apply_contrast_stretching(image, low_percentile=2, high_percentile=98):
+def create_clahe(clip_limit=2.0, tile_grid_size=8):
+    """cv2.CLAHE object for apply_clahe; tile_grid_size is an int or (tiles_x, tiles_y)."""
+    if isinstance(tile_grid_size, tuple):
+        grid = tile_grid_size
+    else:
+        grid = (tile_grid_size, tile_grid_size)
+    return cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=grid)
+
+def apply_contrast_stretching(image, low_percentile=2, high_percentile=98, link_channels=False):
     """
     Apply Contrast Stretching (Linear Normalization).
     Tema 6: Función a trozos lineal - expande el rango [min, max] a [0, 255].
     
+    The cut points come from cumulative histograms (same values as
+    np.percentile) and the stretch is applied as a single cv2.LUT pass.
+    
     Args:
         image: Input image
         low_percentile: Lower percentile to clip (default 2%)
         high_percentile: Upper percentile to clip (default 98%)
+        link_channels: Use the luminance cut points for every channel
+                       (preserves color balance) instead of per-channel ones
     
     Returns:
         Stretched image with enhanced contrast
     """
-    if len(image.shape) == 3:
-        # Apply per channel for color images
-        result = np.zeros_like(image)
-        for i in range(3):
-            channel = image[:, :, i]
-            low = np.percentile(channel, low_percentile)
-            high = np.percentile(channel, high_percentile)
-            if high - low > 0:
-                stretched = (channel - low) * 255.0 / (high - low)
-                result[:, :, i] = np.clip(stretched, 0, 255).astype(np.uint8)
-            else:
-                result[:, :, i] = channel
-        return result
-    else:
-        low = np.percentile(image, low_percentile)
-        high = np.percentile(image, high_percentile)
-        if high - low > 0:
-            stretched = (image - low) * 255.0 / (high - low)
-            return np.clip(stretched, 0, 255).astype(np.uint8)
-        return image
+    return cv2.LUT(as_array(image), build_contrast_stretching_lut(
+        contrast_stretching_histograms(image, link_channels), low_percentile, high_percentile))
+
+def contrast_stretching_histograms(image, link_channels=False):
+    """
+    Histograms that drive apply_contrast_stretching: one per channel, or a
+    single luminance histogram when channels are linked (or the image is gray).
+    """
+    if len(image.shape) == 2 or link_channels:
+        return [calculate_histogram(image)]
+    if isinstance(image, CachedImage):
+        return list(image.channel_histograms)
+    return [cv2.calcHist([image], [i], None, [256], [0, 256]).ravel() for i in range(image.shape[2])]
+
+def build_contrast_stretching_lut(hists, low_percentile=2, high_percentile=98):
+    """
+    Stretch table(s) from histograms: shape (256,) for one histogram, or
+    (256, 1, C) so cv2.LUT maps every channel with its own table in one pass.
+    """
+    tables = []
+    for hist in hists:
+        low, high = _histogram_percentiles(np.asarray(hist, dtype=np.int64), [low_percentile, high_percentile])
+        tables.append(build_stretch_lut(low, high))
+    if len(tables) == 1:
+        return tables[0]
+    return np.stack(tables, axis=1).reshape(256, 1, len(tables))
 
 def apply_gaussian_filter(image, kernel_size=5, sigma=0):
     """
@@ -229,6 +384,27 @@ def apply_gaussian_filter(image, kernel_size=5, sigma=0):
 
 
 
+def apply_unsharp_mask(image, sigma=1.0, strength=1.5):
+    """
+    Unsharp masking: O = I + strength * (I - G_sigma * I).
+    Tema 6: Realce de bordes restando una versión suavizada (paso alto).
+    
+    Args:
+        image: Input image (uint8)
+        sigma: Standard deviation of the Gaussian blur (default 1.0)
+        strength: Amount of high-pass detail added back (default 1.5)
+    """
+    if sigma <= 0:
+        return image
+    blurred = cv2.GaussianBlur(image, (0, 0), sigma)
+    return cv2.addWeighted(image, 1.0 + strength, blurred, -strength, 0)
+
+def unsharp_radius(sigma=1.0):
+    """Radius of the kernel cv2.GaussianBlur derives from sigma for uint8 images."""
+    if sigma <= 0:
+        return 0
+    return (int(np.floor(sigma * 3 * 2 + 1 + 0.5)) | 1) // 2
+
 def calculate_difference(img1, img2):
     """
     Calculate absolute difference between two images.
@@ -288,15 +464,7 @@ def calculate_entropy(image):
     Calculate Shannon Entropy of the image.
     H = -sum(p * log2(p))
     """
-    if len(image.shape) == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-    
-    hist = cv2.calcHist([image], [0], None, [256], [0, 256])
-    hist = hist.ravel() / hist.sum()
-    
-    logs = np.log2(hist + 1e-7) # Add epsilon to avoid log(0)
-    entropy = -1 * (hist * logs).sum()
-    return entropy
+    return calculate_image_statistics(image)['entropy']
 
 def calculate_snr(image):
     """
@@ -305,21 +473,7 @@ def calculate_snr(image):
     
     Tema 4: SNR = 10·log₁₀(P_señal/P_ruido) en dB. Mayor = mejor calidad.
     """
-    if len(image.shape) == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-    
-    mean_val = np.mean(image)
-    std_val = np.std(image)
-    
-    # Handle edge cases
-    if std_val == 0:
-        return float('inf') if mean_val > 0 else 0  # Constant image
-    if mean_val <= 0:
-        return 0  # Completely black image
-    
-    # SNR = 20 * log10(mean / std)
-    snr = 20 * np.log10(mean_val / std_val)
-    return snr
+    return calculate_image_statistics(image)['snr']
 
 def generate_histogram_plot(image, title="Histograma"):
     """
@@ -330,7 +484,7 @@ def generate_histogram_plot(image, title="Histograma"):
     from matplotlib.backends.backend_agg import FigureCanvasAgg
     
     if len(image.shape) == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
     fig, ax = plt.subplots(figsize=(4, 3))
     ax.hist(image.ravel(), 256, [0, 256], color='black')
@@ -358,23 +512,8 @@ def calculate_freedman_diaconis_bins(image):
     
     Returns: (n_bins, bin_width)
     """
-    if len(image.shape) == 3:
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-    
-    data = image.ravel()
-    n = len(data)
-    
-    q75, q25 = np.percentile(data, [75, 25])
-    iqr = q75 - q25
-    
-    if iqr == 0:
-        return 256, 1  # Default for constant images
-    
-    bin_width = 2 * iqr / np.cbrt(n)
-    n_bins = int(np.ceil((data.max() - data.min()) / bin_width))
-    n_bins = max(1, min(n_bins, 256))  # Clamp to reasonable range
-    
-    return n_bins, bin_width
+    stats = calculate_image_statistics(image)
+    return stats['fd_bins'], stats['fd_bin_width']
 
 def detect_outliers_iqr(image, k=1.5):
     """
@@ -387,22 +526,232 @@ def detect_outliers_iqr(image, k=1.5):
     
     Returns: dict with outlier statistics
     """
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return _histogram_outliers(calculate_histogram(image), k)
+
+def calculate_advanced_statistics(image):
+    """
+    Calculate comprehensive image statistics for analysis.
+    Includes percentiles, skewness, and distribution metrics.
+    
+    Returns: dict with all statistics
+    """
+    return calculate_image_statistics(image)
+
+# --- Histogram-based statistics engine (Tema 5) ---
+# For 8-bit images every distribution metric is an exact function of the
+# 256-bin histogram, so the pixels are scanned once and all metrics derive
+# from the 256 counts.
+
+class CachedImage:
+    """
+    Read-only image (BGR or gray uint8) with lazily memoized derived views:
+    gray, LAB, YCrCb, histograms and statistics. Each view is computed on
+    first access and reused by every metric, report and color-space op that
+    receives the wrapper instead of the raw array.
+    
+    The pixels are exposed read-only; assigning `.array` (or calling
+    invalidate()) drops every cached view.
+    """
+    __slots__ = ("_array", "_views")
+    
+    def __init__(self, array):
+        self.array = array
+    
+    @property
+    def array(self):
+        return self._array
+    
+    @array.setter
+    def array(self, value):
+        value = as_array(value).view()
+        value.flags.writeable = False
+        self._array = value
+        self._views = {}
+    
+    def invalidate(self):
+        self._views = {}
+    
+    @property
+    def shape(self):
+        return self._array.shape
+    
+    @property
+    def dtype(self):
+        return self._array.dtype
+    
+    @property
+    def ndim(self):
+        return self._array.ndim
+    
+    def _view(self, key, compute):
+        views = self._views
+        if key not in views:
+            value = compute()
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            views[key] = value
+        return views[key]
+    
+    @property
+    def gray(self):
+        if self._array.ndim == 2:
+            return self._array
+        return self._view("gray", lambda: cv2.cvtColor(self._array, cv2.COLOR_BGR2GRAY))
+    
+    @property
+    def lab(self):
+        return self._view("lab", lambda: cv2.cvtColor(self._array, cv2.COLOR_BGR2LAB))
+    
+    @property
+    def lab_l(self):
+        return self._view("lab_l", lambda: np.ascontiguousarray(self.lab[:, :, 0]))
+    
+    @property
+    def ycrcb(self):
+        return self._view("ycrcb", lambda: cv2.cvtColor(self._array, cv2.COLOR_BGR2YCrCb))
+    
+    def histogram(self, grayscale=True):
+        if grayscale or self._array.ndim == 2:
+            return self._view("hist_gray", lambda: calculate_histogram(self.gray))
+        return self._view("hist_all", lambda: calculate_histogram(self._array, grayscale=False))
+    
+    @property
+    def channel_histograms(self):
+        """One 256-bin histogram per channel (B, G, R order for color images)."""
+        def compute():
+            channels = cv2.split(self._array) if self._array.ndim == 3 else [self._array]
+            return tuple(np.bincount(ch.ravel(), minlength=256)[:256] for ch in channels)
+        return self._view("hist_channels", compute)
+    
+    @property
+    def stats(self):
+        return self._view("stats", lambda: calculate_histogram_statistics(self.histogram()))
+
+def as_array(image):
+    """Raw ndarray of an image given as ndarray or CachedImage."""
+    return image.array if isinstance(image, CachedImage) else image
+
+def calculate_histogram(image, grayscale=True):
+    """
+    256-bin histogram of an 8-bit image.
+    grayscale=True converts color input to gray first; False counts every
+    channel value (matches np.mean/np.std over the whole array).
+    """
+    if isinstance(image, CachedImage):
+        return image.histogram(grayscale)
+    if grayscale and len(image.shape) == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return np.bincount(image.ravel(), minlength=256)[:256]
+
+def calculate_image_statistics(image):
+    """
+    Builds the gray histogram once and returns every diagnostic metric.
+    """
+    if isinstance(image, CachedImage):
+        return image.stats
+    return calculate_histogram_statistics(calculate_histogram(image))
+
+def calculate_histogram_statistics(hist, outlier_k=1.5):
+    """
+    Computes all diagnostic metrics from a 256-bin histogram.
+    Percentiles follow np.percentile's default (linear) interpolation.
+    
+    Returns: dict with the keys of calculate_advanced_statistics plus
+             'snr', 'entropy', 'outliers', 'fd_bins', 'fd_bin_width'.
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    n = int(hist.sum())
+    if n == 0:
+        raise ValueError("Cannot compute statistics of an empty image")
+    levels = np.arange(256, dtype=np.float64)
+    p = hist / n
+    
+    # Moments
+    mean_val = float((p * levels).sum())
+    centered = levels - mean_val
+    std_val = float(np.sqrt((p * centered ** 2).sum()))
+    skewness = float((p * (centered / std_val) ** 3).sum()) if std_val > 0 else 0
+    
+    # Order statistics
+    nonzero = np.flatnonzero(hist)
+    actual_min = float(nonzero[0])
+    actual_max = float(nonzero[-1])
+    dynamic_range = actual_max - actual_min
+    p5, p25, p50, p75, p95 = _histogram_percentiles(hist, [5, 25, 50, 75, 95])
+    
+    # Entropy (bits)
+    logs = np.log2(p + 1e-7)
+    entropy = float(-(p * logs).sum())
+    
+    # SNR = 20 * log10(mean / std)
+    if std_val == 0:
+        snr = float('inf') if mean_val > 0 else 0
+    elif mean_val <= 0:
+        snr = 0
+    else:
+        snr = float(20 * np.log10(mean_val / std_val))
+    
+    # Freedman-Diaconis
+    iqr = p75 - p25
+    if iqr == 0:
+        fd_bins, fd_bin_width = 256, 1
     else:
-        gray = image
+        fd_bin_width = 2 * iqr / np.cbrt(n)
+        fd_bins = int(np.ceil(dynamic_range / fd_bin_width))
+        fd_bins = max(1, min(fd_bins, 256))
     
-    data = gray.ravel()
-    q75, q25 = np.percentile(data, [75, 25])
+    return {
+        'mean': mean_val,
+        'std': std_val,
+        'median': p50,
+        'min': actual_min,
+        'max': actual_max,
+        'p5': p5,
+        'p25': p25,
+        'p50': p50,
+        'p75': p75,
+        'p95': p95,
+        'iqr': iqr,
+        'dynamic_range': dynamic_range,
+        'dynamic_usage_pct': (dynamic_range / 255) * 100,
+        'skewness': skewness,
+        'dark_percentage': float(hist[:128].sum() / n * 100),
+        'snr': snr,
+        'entropy': entropy,
+        'outliers': _histogram_outliers(hist, outlier_k),
+        'fd_bins': fd_bins,
+        'fd_bin_width': fd_bin_width
+    }
+
+def _histogram_percentiles(hist, percentiles):
+    """Exact np.percentile (linear method) of the samples counted by `hist`."""
+    cum = np.cumsum(hist)
+    n = int(cum[-1])
+    result = []
+    for q in percentiles:
+        virtual = (n - 1) * (q / 100)
+        lo = int(np.floor(virtual))
+        t = virtual - lo
+        # Value at sorted position k is the first level whose cumulative count exceeds k
+        a = float(np.searchsorted(cum, lo, side='right'))
+        b = float(np.searchsorted(cum, min(lo + 1, n - 1), side='right'))
+        # Same lerp as numpy to keep results bit-identical
+        result.append(b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t)
+    return result
+
+def _histogram_outliers(hist, k=1.5):
+    hist = np.asarray(hist, dtype=np.int64)
+    n = int(hist.sum())
+    q25, q75 = _histogram_percentiles(hist, [25, 75])
     iqr = q75 - q25
     
     lower_bound = q25 - k * iqr
     upper_bound = q75 + k * iqr
     
-    outliers_low = np.sum(data < lower_bound)
-    outliers_high = np.sum(data > upper_bound)
+    levels = np.arange(256)
+    outliers_low = int(hist[levels < lower_bound].sum())
+    outliers_high = int(hist[levels > upper_bound].sum())
     total_outliers = outliers_low + outliers_high
-    outlier_percentage = (total_outliers / len(data)) * 100
     
     return {
         'q25': q25,
@@ -413,50 +762,77 @@ def detect_outliers_iqr(image, k=1.5):
         'outliers_low': outliers_low,
         'outliers_high': outliers_high,
         'total_outliers': total_outliers,
-        'outlier_percentage': outlier_percentage
+        'outlier_percentage': (total_outliers / n) * 100
     }
 
-def calculate_advanced_statistics(image):
+# --- Batched operations on (N, H, W[, C]) uint8 stacks ---
+# Same-size frames are processed as one array so per-image Python overhead
+# disappears (thousands of small face crops).
+
+def apply_lut_batch(stack, table):
+    """Applies one 256-entry table to every frame of the stack in a single cv2.LUT call."""
+    n, h = stack.shape[:2]
+    flat = np.ascontiguousarray(stack).reshape((n * h,) + stack.shape[2:])
+    return cv2.LUT(flat, table).reshape(stack.shape)
+
+def calculate_histograms_batch(stack, grayscale=True):
     """
-    Calculate comprehensive image statistics for analysis.
-    Includes percentiles, skewness, and distribution metrics.
-    
-    Returns: dict with all statistics
+    (N, 256) histograms of a stack with one bincount: each frame's values are
+    offset by 256 * index so all histograms are counted at once.
     """
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    n, h = stack.shape[:2]
+    if grayscale and stack.ndim == 4:
+        flat = np.ascontiguousarray(stack).reshape((n * h,) + stack.shape[2:])
+        values = cv2.cvtColor(flat, cv2.COLOR_BGR2GRAY).reshape(n, -1)
     else:
-        gray = image
-    
-    data = gray.ravel().astype(float)
-    
-    # Basic statistics
-    mean_val = np.mean(data)
-    std_val = np.std(data)
-    median_val = np.median(data)
+        values = stack.reshape(n, -1)
+    offsets = (np.arange(n, dtype=np.intp) * 256)[:, None]
+    return np.bincount((values + offsets).ravel(), minlength=n * 256).reshape(n, 256)
+
+def calculate_statistics_batch(stack):
+    """Diagnostic metrics for every frame of a stack. Returns a dict of (N,) arrays."""
+    return calculate_histogram_statistics_batch(calculate_histograms_batch(stack))
+
+def calculate_histogram_statistics_batch(hists, outlier_k=1.5):
+    """
+    Vectorized calculate_histogram_statistics over (N, 256) histograms.
+    Returns a dict of (N,) arrays (no nested outlier dict / FD bins).
+    """
+    hists = np.asarray(hists, dtype=np.int64)
+    n = hists.sum(axis=1)
+    levels = np.arange(256, dtype=np.float64)
+    p = hists / n[:, None]
     
-    # Percentiles
-    p5, p25, p50, p75, p95 = np.percentile(data, [5, 25, 50, 75, 95])
+    mean_val = p @ levels
+    centered = levels[None, :] - mean_val[:, None]
+    std_val = np.sqrt((p * centered ** 2).sum(axis=1))
+    safe_std = np.where(std_val > 0, std_val, 1)
+    skewness = np.where(std_val > 0, (p * (centered / safe_std[:, None]) ** 3).sum(axis=1), 0)
     
-    # Dynamic range usage
-    actual_min = np.min(data)
-    actual_max = np.max(data)
+    present = hists > 0
+    actual_min = present.argmax(axis=1).astype(np.float64)
+    actual_max = 255 - present[:, ::-1].argmax(axis=1).astype(np.float64)
     dynamic_range = actual_max - actual_min
-    dynamic_usage = (dynamic_range / 255) * 100  # % of possible range used
+    p5, p25, p50, p75, p95 = _histogram_percentiles_batch(hists, [5, 25, 50, 75, 95]).T
+    iqr = p75 - p25
     
-    # Skewness (asymmetry)
-    if std_val > 0:
-        skewness = np.mean(((data - mean_val) / std_val) ** 3)
-    else:
-        skewness = 0
+    entropy = -(p * np.log2(p + 1e-7)).sum(axis=1)
     
-    # Dark/Bright balance
-    dark_percentage = (np.sum(data < 128) / len(data)) * 100
+    safe_mean = np.where(mean_val > 0, mean_val, 1)
+    snr = np.where(
+        std_val == 0,
+        np.where(mean_val > 0, np.inf, 0),
+        np.where(mean_val <= 0, 0, 20 * np.log10(safe_mean / safe_std))
+    )
+    
+    lower = p25 - outlier_k * iqr
+    upper = p75 + outlier_k * iqr
+    outliers = (hists * ((levels[None, :] < lower[:, None]) | (levels[None, :] > upper[:, None]))).sum(axis=1)
     
     return {
         'mean': mean_val,
         'std': std_val,
-        'median': median_val,
+        'median': p50,
         'min': actual_min,
         'max': actual_max,
         'p5': p5,
@@ -464,13 +840,30 @@ def calculate_advanced_statistics(image):
         'p50': p50,
         'p75': p75,
         'p95': p95,
-        'iqr': p75 - p25,
+        'iqr': iqr,
         'dynamic_range': dynamic_range,
-        'dynamic_usage_pct': dynamic_usage,
+        'dynamic_usage_pct': (dynamic_range / 255) * 100,
         'skewness': skewness,
-        'dark_percentage': dark_percentage
+        'dark_percentage': hists[:, :128].sum(axis=1) / n * 100,
+        'snr': snr,
+        'entropy': entropy,
+        'outlier_percentage': outliers / n * 100
     }
 
+def _histogram_percentiles_batch(hists, percentiles):
+    """Row-wise _histogram_percentiles. Returns (N, len(percentiles))."""
+    cum = np.cumsum(hists, axis=1)
+    n = cum[:, -1]
+    columns = []
+    for q in percentiles:
+        virtual = (n - 1) * (q / 100)
+        lo = np.floor(virtual).astype(np.int64)
+        t = virtual - lo
+        a = (cum > lo[:, None]).argmax(axis=1).astype(np.float64)
+        b = (cum > np.minimum(lo + 1, n - 1)[:, None]).argmax(axis=1).astype(np.float64)
+        columns.append(np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t))
+    return np.stack(columns, axis=1)
+
 def apply_image_averaging(images):
     """
     Compute the average of a list of images.
@@ -478,58 +871,199 @@ def apply_image_averaging(images):
     Formula: g(x,y) = (1/M) * sum(f_i(x,y))
     
     Args:
-        images: List of numpy arrays (images)
+        images: List (or any iterable) of numpy arrays (images)
     
     Returns:
         Averaged image (uint8)
     """
-    if not images:
-        raise ValueError("No images provided for averaging")
+    mean, _, _ = accumulate_image_statistics(images)
+    return np.clip(mean, 0, 255).astype(np.uint8)
+
+def accumulate_image_statistics(images, variance=True):
+    """
+    Streaming per-pixel mean and variance (Welford's algorithm).
+    Tema 4: promediado de imágenes y estimación del ruido por píxel.
     
-    # Initialize accumulator with float precision
-    first_shape = images[0].shape
-    accum = np.zeros(first_shape, dtype=np.float32)
+    Args:
+        images: Any iterable of images (list, generator...). Frames are
+                consumed one at a time, so memory does not grow with their number.
+        variance: False skips the variance accumulators (plain averaging).
+    
+    Returns:
+        (mean, variance, count): float64 arrays with the first frame's shape;
+        variance is the sample variance (0 for a single frame), None if
+        not requested.
+    """
+    mean = m2 = total = delta = frame = None
+    first_shape = None
     count = 0
     
     for img in images:
+        if mean is None:
+            first_shape = img.shape
+            mean = np.zeros(first_shape, dtype=np.float64)
+            m2 = np.zeros(first_shape, dtype=np.float64)
+            total = np.zeros(first_shape, dtype=np.float64)
+            delta = np.empty(first_shape, dtype=np.float64)
+            frame = np.empty(first_shape, dtype=np.float64)
         # Resize if dimensions differ (robustness)
         if img.shape != first_shape:
-            img = cv2.resize(img, (first_shape[1], first_shape[0]))
-            
-        accum += img.astype(np.float32)
-        count += 1
+            img = cv2.resize(img, (first_shape[1], first_shape[0])).reshape(first_shape)
         
-    avg = accum / count
-    return np.clip(avg, 0, 255).astype(np.uint8)
+        count += 1
+        frame[...] = img
+        total += frame
+        if not variance:
+            continue
+        # delta = x - mean; mean += delta / n; M2 += delta * (x - mean_new)
+        np.subtract(frame, mean, out=delta)
+        delta /= count
+        mean += delta
+        delta *= count
+        np.subtract(frame, mean, out=frame)
+        frame *= delta
+        m2 += frame
+    
+    if count == 0:
+        raise ValueError("No images provided for averaging")
+    
+    if not variance:
+        return total / count, None, count
+    variance = m2 / (count - 1) if count > 1 else np.zeros_like(m2)
+    # Integer sums are exact in float64: return sum / n rather than the running mean
+    return total / count, variance, count
+
+# --- Stack reductions (Tema 4/5): background estimation, impulsive noise removal ---
+
+STACK_REDUCTIONS = ("median", "min", "max", "percentile")
+
+def reduce_stack(stack, reduction="median", percentile=50.0, max_strip_bytes=64 * 2**20):
+    """
+    Per-pixel reduction across the frames of an (N, H, W[, C]) stack.
+    Processes horizontal strips of all frames at a time, each at most
+    `max_strip_bytes`, so it works on memory-mapped stacks larger than RAM.
+    
+    Args:
+        reduction: 'median', 'min', 'max' or 'percentile'
+        percentile: Used when reduction == 'percentile' (0-100)
+    
+    Returns: Reduced image (uint8, shape H x W[x C])
+    """
+    if reduction not in STACK_REDUCTIONS:
+        raise ValueError(f"Unknown stack reduction: {reduction}")
+    n, height = stack.shape[:2]
+    row_bytes = max(1, n * int(np.prod(stack.shape[2:])) * stack.itemsize)
+    strip_rows = max(1, max_strip_bytes // row_bytes)
+    
+    result = np.empty(stack.shape[1:], dtype=np.uint8)
+    for y0 in range(0, height, strip_rows):
+        block = np.asarray(stack[:, y0:y0 + strip_rows])
+        result[y0:y0 + strip_rows] = _reduce_block(block, reduction, percentile)
+    return result
 
-def add_gaussian_noise(image, mean=0, sigma=25):
+def reduce_frames_running(images, reduction="min"):
+    """
+    Streaming per-pixel min or max over any iterable of frames (constant memory).
+    """
+    if reduction not in ("min", "max"):
+        raise ValueError(f"Running reduction must be 'min' or 'max', got: {reduction}")
+    combine = np.minimum if reduction == "min" else np.maximum
+    result = None
+    for img in images:
+        if result is None:
+            result = img.copy()
+            continue
+        if img.shape != result.shape:
+            img = cv2.resize(img, (result.shape[1], result.shape[0])).reshape(result.shape)
+        combine(result, img, out=result)
+    if result is None:
+        raise ValueError("No images provided for reduction")
+    return result
+
+def _reduce_block(block, reduction, percentile):
+    if reduction == "min":
+        return block.min(axis=0)
+    if reduction == "max":
+        return block.max(axis=0)
+    if reduction == "median":
+        reduced = np.median(block, axis=0)
+    else:
+        reduced = np.percentile(block, percentile, axis=0)
+    return np.clip(np.rint(reduced), 0, 255).astype(np.uint8)
+
+# Noise is generated in row chunks of at most this many values, reusing one
+# float32 buffer, so a call allocates little beyond its uint8 output.
+_NOISE_CHUNK_VALUES = 1 << 20
+
+def add_gaussian_noise(image, mean=0, sigma=25, seed=None, out=None):
     """
     Add Gaussian Noise to an image.
     Tema 4: Ruido térmico/electrónico (distribución normal).
+    
+    Args:
+        seed: int, sequence of ints or np.random.Generator (None = fresh entropy).
+              The same seed always gives the same noise.
+        out: Optional preallocated uint8 array with the image's shape, written
+             in place (may be `image` itself).
     """
-    row, col, ch = image.shape if len(image.shape) == 3 else (*image.shape, 1)
-    gauss = np.random.normal(mean, sigma, (row, col, ch))
-    gauss = gauss.reshape(image.shape)
-    noisy = image + gauss
-    return np.clip(noisy, 0, 255).astype(np.uint8)
+    rng = np.random.default_rng(seed)
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+    
+    height = image.shape[0]
+    row_values = max(1, image[:1].size)
+    rows = max(1, _NOISE_CHUNK_VALUES // row_values)
+    buffer = np.empty((min(rows, height),) + image.shape[1:], dtype=np.float32)
+    
+    for y0 in range(0, height, rows):
+        chunk = buffer[:min(rows, height - y0)]
+        rng.standard_normal(dtype=np.float32, out=chunk)
+        chunk *= sigma
+        chunk += mean
+        chunk += image[y0:y0 + rows]
+        np.clip(chunk, 0, 255, out=chunk)
+        # Truncating cast, as astype(np.uint8)
+        np.copyto(out[y0:y0 + rows], chunk, casting="unsafe")
+    return out
 
-def add_salt_pepper_noise(image, prob=0.05):
+def add_salt_pepper_noise(image, prob=0.05, seed=None, out=None, mask=None):
     """
     Add Salt and Pepper Noise.
     Tema 4: Ruido impulsivo (valores extremos aleatorios).
+    
+    Each value becomes 255 with probability prob/2 and 0 with probability
+    prob/2 (never both).
+    
+    Args:
+        seed: int, sequence of ints or np.random.Generator (None = fresh entropy)
+        out: Optional preallocated uint8 array written in place (may be `image`)
+        mask: Optional boolean HxW array; noise only hits pixels where it is True
     """
-    noisy = np.copy(image)
-    # Salt (White)
-    num_salt = np.ceil(prob * image.size * 0.5)
-    coords = [np.random.randint(0, i - 1, int(num_salt)) for i in image.shape]
-    noisy[tuple(coords)] = 255
-
-    # Pepper (Black)
-    num_pepper = np.ceil(prob * image.size * 0.5)
-    coords = [np.random.randint(0, i - 1, int(num_pepper)) for i in image.shape]
-    noisy[tuple(coords)] = 0
+    rng = np.random.default_rng(seed)
+    if out is None:
+        out = image.copy()
+    elif out is not image:
+        np.copyto(out, image)
+    
+    height = image.shape[0]
+    row_values = max(1, image[:1].size)
+    rows = max(1, _NOISE_CHUNK_VALUES // row_values)
+    buffer = np.empty((min(rows, height),) + image.shape[1:], dtype=np.float32)
+    half = np.float32(prob / 2)
     
-    return noisy
+    for y0 in range(0, height, rows):
+        chunk = buffer[:min(rows, height - y0)]
+        rng.random(dtype=np.float32, out=chunk)
+        if mask is not None:
+            region_mask = mask[y0:y0 + rows]
+            if chunk.ndim == 3:
+                region_mask = region_mask[:, :, None]
+            # Outside the mask: push the draw past both thresholds
+            np.copyto(chunk, 1.0, where=~region_mask)
+        target = out[y0:y0 + rows]
+        target[chunk < half] = 255
+        target[(chunk >= half) & (chunk < 2 * half)] = 0
+    return out
 
 def simulate_downsampling(image, factor=0.5):
     """
@@ -553,8 +1087,155 @@ def simulate_quantization(image, bits=3):
     Simulate Color Quantization (Bit Depth Reduction).
     Tema 3: Cuantificación. Reduce la paleta de colores (posterización).
     """
+    return cv2.LUT(image, build_quantization_lut(bits))
+
+# --- Reusable processing resources ---
+# Batch jobs and parameter sweeps apply the same few settings over and over, so
+# per-call setup (cv2.createCLAHE, building 256-entry tables) is cached by
+# parameters in bounded LRUs shared by all threads.
+
+RESOURCE_CACHE_SIZES = {"clahe": 32, "lut": 256}
+
+class _ResourceCache:
+    """Bounded, thread-safe LRU of processing resources with hit/miss counters."""
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, factory):
+        """Shared resource for `key`, built with `factory()` on a miss."""
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+            self.misses += 1
+        value = factory()
+        with self._lock:
+            value = self._items.setdefault(key, value)
+            self._items.move_to_end(key)
+            self._evict()
+        return value
+    
+    @contextmanager
+    def borrow(self, key, factory):
+        """
+        Checks out an idle resource for `key` (built with `factory()` if none is
+        idle) and returns it to the pool afterwards. For stateful objects such
+        as cv2.CLAHE, which must not be used by two threads at once.
+        """
+        with self._lock:
+            idle = self._items.get(key)
+            if idle:
+                self.hits += 1
+                self._items.move_to_end(key)
+                resource = idle.pop()
+            else:
+                self.misses += 1
+                resource = None
+        if resource is None:
+            resource = factory()
+        try:
+            yield resource
+        finally:
+            with self._lock:
+                self._items.setdefault(key, []).append(resource)
+                self._items.move_to_end(key)
+                self._evict()
+    
+    def _evict(self):
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+    
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+_clahe_cache = _ResourceCache(RESOURCE_CACHE_SIZES["clahe"])
+_lut_cache = _ResourceCache(RESOURCE_CACHE_SIZES["lut"])
+
+def resource_cache_stats():
+    """Hit/miss counters of the CLAHE object pool and the lookup-table cache."""
+    return {"clahe": _clahe_cache.stats(), "lut": _lut_cache.stats()}
+
+def clear_resource_caches():
+    _clahe_cache.clear()
+    _lut_cache.clear()
+
+def _cached_table(builder):
+    """Memoizes a table builder by its arguments; cached tables are read-only."""
+    @functools.wraps(builder)
+    def cached(*args, **kwargs):
+        key = (builder.__name__, args, tuple(sorted(kwargs.items())))
+        def build():
+            table = builder(*args, **kwargs)
+            table.flags.writeable = False
+            return table
+        return _lut_cache.get(key, build)
+    return cached
+
+# --- Point-operation lookup tables (Tema 6) ---
+# Every per-pixel transform of an 8-bit image is fully described by a 256-entry
+# table T(u). Tables compose as T2[T1], so a chain of point ops collapses into
+# a single cv2.LUT pass. Parametric tables are cached (_cached_table), except
+# the data-dependent stretch tables.
+
+@_cached_table
+def build_gamma_lut(gamma=1.0):
+    """Table for O = ((I/255)^gamma) * 255. Identity for gamma <= 0."""
+    if gamma <= 0:
+        return build_identity_lut()
+    table = ((np.arange(256) / 255.0) ** gamma) * 255
+    return table.astype(np.uint8)
+
+@_cached_table
+def build_log_lut(c=1.0):
+    """Table for T(u) = c_auto * c * log(1 + u), with c_auto = 255 / log(256)."""
+    c_auto = 255 / np.log(1 + 255)
+    table = c_auto * c * np.log(1 + np.arange(256, dtype=np.float32))
+    return np.clip(table, 0, 255).astype(np.uint8)
+
+def build_negative_lut():
+    """Table for T(u) = 255 - u."""
+    return (255 - np.arange(256)).astype(np.uint8)
+
+@_cached_table
+def build_quantization_lut(bits=3):
+    """Table mapping each level to the nearest of 2^bits evenly spaced levels."""
     levels = 2 ** bits
     step = 255 / (levels - 1)
-    
-    quantized = np.round(image / step) * step
-    return np.clip(quantized, 0, 255).astype(np.uint8)
+    table = np.round(np.arange(256) / step) * step
+    return np.clip(table, 0, 255).astype(np.uint8)
+
+def build_stretch_lut(in_low=0, in_high=255):
+    """
+    Table mapping [in_low, in_high] linearly onto [0, 255] (clipped outside).
+    Not memoized: the bounds usually come from the data (percentiles, noise
+    maps) and would fill the table cache with entries that are never reused.
+    """
+    if in_high - in_low <= 0:
+        return build_identity_lut()
+    table = (np.arange(256) - in_low) * 255.0 / (in_high - in_low)
+    return np.clip(table, 0, 255).astype(np.uint8)
+
+def build_identity_lut():
+    return np.arange(256, dtype=np.uint8)
+
+def compose_luts(first, second):
+    """Returns the table equivalent to applying `first` and then `second`."""
+    return second[first]
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# The app is imported as the `src` package (see mcp_interface.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agent_api import config
+
+
+@pytest.fixture(autouse=True)
+def output_dir(tmp_path, monkeypatch):
+    """Artifacts, reports and cache records go to a per-test directory."""
+    out = tmp_path / "output"
+    out.mkdir()
+    monkeypatch.setattr(config, "BASE_OUTPUT_DIR", str(out))
+    monkeypatch.setattr(config, "REPORT_MODE", "sync")
+    monkeypatch.setattr(config, "ARTIFACT_WRITE_MODE", "sync")
+    return out
+
+
+@pytest.fixture
+def dark_image():
+    """Noisy low-light BGR frame with a gradient, so every op changes pixels."""
+    rng = np.random.default_rng(7)
+    gradient = np.linspace(10, 90, 96, dtype=np.float64)[None, :, None]
+    noise = rng.normal(0, 18, (72, 96, 3))
+    return np.clip(gradient + noise, 0, 255).astype(np.uint8)
+
+
+@pytest.fixture
+def image_path(tmp_path, dark_image):
+    path = tmp_path / "dark.png"
+    cv2.imwrite(str(path), dark_image)
+    return str(path)
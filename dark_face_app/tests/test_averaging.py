@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+
+from src.agent_api.diagnostics import compute_average_stats
+
+
+def write_burst(directory, count=5):
+    rng = np.random.default_rng(3)
+    base = np.linspace(20, 120, 40)[None, :, None] * np.ones((30, 40, 3))
+    frames = []
+    for i in range(count):
+        frame = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+        cv2.imwrite(str(directory / f"frame_{i}.png"), frame)
+        frames.append(frame)
+    return np.stack(frames).astype(np.float64)
+
+
+def test_streaming_average_matches_numpy(tmp_path):
+    burst = tmp_path / "burst"
+    burst.mkdir()
+    stack = write_burst(burst)
+
+    result = compute_average_stats(str(burst))
+    average = cv2.imread(result["average_image"])
+    sigma = stack.std(axis=0, ddof=1).mean(axis=2)
+
+    assert result["frames"] == 5
+    assert np.array_equal(average, np.clip(stack.mean(axis=0), 0, 255).astype(np.uint8))
+    assert result["noise_sigma_max"] == round(float(sigma.max()), 3)
+
+
+def test_noise_map_keeps_sigma_resolution(tmp_path):
+    burst = tmp_path / "burst"
+    burst.mkdir()
+    stack = write_burst(burst)
+
+    noise_map = cv2.imread(compute_average_stats(str(burst))["noise_map"], cv2.IMREAD_GRAYSCALE)
+    sigma = stack.std(axis=0, ddof=1).mean(axis=2)
+
+    assert noise_map.max() == 255
+    assert np.abs(noise_map.astype(np.int16) - (sigma / sigma.max() * 255).astype(np.int16)).max() <= 1
+    assert len(np.unique(noise_map)) > 64
@@ -0,0 +1,24 @@
+import cv2
+import numpy as np
+
+from src import processing
+from src.agent_api.transform import _execute_step
+
+
+def test_cached_views_match_direct_computation(dark_image):
+    cached = processing.CachedImage(dark_image)
+    np.testing.assert_array_equal(cached.gray, cv2.cvtColor(dark_image, cv2.COLOR_BGR2GRAY))
+    np.testing.assert_array_equal(cached.lab, cv2.cvtColor(dark_image, cv2.COLOR_BGR2LAB))
+    np.testing.assert_array_equal(cached.histogram(), processing.calculate_histogram(dark_image))
+    assert cached.stats == processing.calculate_image_statistics(dark_image)
+    for op in ("clahe", "equalize", "contrast_stretching"):
+        np.testing.assert_array_equal(_execute_step(cached, op, {}), _execute_step(dark_image, op, {}))
+
+
+def test_assigning_pixels_drops_cached_views(dark_image):
+    cached = processing.CachedImage(dark_image)
+    assert cached.stats == processing.calculate_image_statistics(dark_image)
+    inverted = 255 - dark_image
+    cached.array = inverted
+    np.testing.assert_array_equal(cached.gray, cv2.cvtColor(inverted, cv2.COLOR_BGR2GRAY))
+    assert cached.stats == processing.calculate_image_statistics(inverted)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src import processing
+from src.agent_api.transform import compile_candidates, execute_steps
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_prefix_shared_candidates_match_linear(dark_image, workers):
+    median = {"op": "median", "params": {"kernel_size": 3}}
+    step_lists = [
+        [],
+        [median],
+        [median, {"op": "gamma", "params": {"gamma": 0.5}}],
+        [median, {"op": "clahe", "params": {"clip_limit": 2.0}}],
+        [median, {"op": "gamma", "params": {"gamma": 0.5}}, {"op": "equalize"}],
+        [{"op": "log"}, {"op": "equalize"}],
+    ]
+    plan = compile_candidates(step_lists)
+    outputs, errors, stats = plan.run(processing.CachedImage(dark_image), workers)
+    assert errors == {}
+    assert stats["saved_step_executions"] > 0
+    for steps, output in zip(step_lists, outputs):
+        np.testing.assert_array_equal(processing.as_array(output), execute_steps(dark_image, steps))
+
+
+def test_failing_candidate_does_not_affect_siblings(dark_image):
+    median = {"op": "median", "params": {"kernel_size": 3}}
+    step_lists = [[median, {"op": "gamma", "params": {"gamma": 0.5}}], [median, {"op": "unknown"}], [median]]
+    outputs, errors, _ = compile_candidates(step_lists).run(processing.CachedImage(dark_image), 1)
+    assert list(errors) == [1]
+    np.testing.assert_array_equal(processing.as_array(outputs[0]), execute_steps(dark_image, step_lists[0]))
+    np.testing.assert_array_equal(processing.as_array(outputs[2]), execute_steps(dark_image, step_lists[2]))
@@ -0,0 +1,25 @@
+import json
+
+from src.agent_api import config
+from src.agent_api.meta import configure_agent
+
+
+def test_rejected_configuration_changes_nothing(monkeypatch):
+    monkeypatch.setattr(config, "REPORT_MODE", "sync")
+    monkeypatch.setattr(config, "PIPELINE_WORKERS", 2)
+    result = configure_agent(json.dumps({"report_mode": "deferred", "pipeline_workers": 4, "preview_max_side": 0}))
+
+    assert result["status"] == "error"
+    assert "preview_max_side" in result["message"]
+    assert config.REPORT_MODE == "sync"
+    assert config.PIPELINE_WORKERS == 2
+
+
+def test_valid_configuration_is_applied(monkeypatch):
+    monkeypatch.setattr(config, "REPORT_MODE", "sync")
+    monkeypatch.setattr(config, "PIPELINE_WORKERS", 2)
+    result = configure_agent(json.dumps({"report_mode": "deferred", "pipeline_workers": 4}))
+
+    assert result["status"] == "success"
+    assert config.REPORT_MODE == "deferred"
+    assert config.PIPELINE_WORKERS == 4
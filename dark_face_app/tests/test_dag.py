@@ -0,0 +1,53 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from src import agent_api, processing
+from src.agent_api.transform import compile_dag, execute_steps
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_dag_matches_linear_steps_and_arithmetic(dark_image, workers):
+    denoise = [{"op": "median", "params": {"kernel_size": 3}}]
+    enhance = [{"op": "clahe", "params": {"clip_limit": 3.0}}, {"op": "gamma", "params": {"gamma": 0.7}}]
+    post = [{"op": "gamma", "params": {"gamma": 0.8}}]
+    plan = compile_dag({"nodes": [
+        {"id": "denoised", "input": "source", "steps": denoise},
+        {"id": "enhanced", "input": "source", "steps": enhance},
+        {"id": "denoised_again", "input": "source", "steps": denoise},
+        {"id": "fused", "merge": ["denoised", "enhanced"], "operation": "add", "steps": post},
+        {"id": "residual", "merge": ["source", "denoised_again"], "operation": "subtract"},
+    ]})
+    outputs, stats = plan.run(dark_image, workers)
+
+    denoised = execute_steps(dark_image, denoise)
+    enhanced = execute_steps(dark_image, enhance)
+    fused = execute_steps(processing.apply_arithmetic_ops(denoised, enhanced, operation="add"), post)
+    residual = processing.apply_arithmetic_ops(dark_image, denoised, operation="subtract")
+    assert stats["shared_nodes"] == {"denoised_again": "denoised"}
+    np.testing.assert_array_equal(outputs["fused"], fused)
+    np.testing.assert_array_equal(outputs["residual"], residual)
+
+
+def test_dag_pipeline_matches_file_based_arithmetic(image_path, tmp_path):
+    """The in-memory merge gives the pixels of the save-and-apply_arithmetic workaround."""
+    denoised_path = agent_api.apply_transformation(image_path, "median", '{"kernel_size": 3}')
+    expected = cv2.imread(agent_api.apply_arithmetic(image_path, denoised_path, "subtract"))
+
+    result = agent_api.apply_pipeline(image_path, json.dumps({"nodes": [
+        {"id": "denoised", "steps": [{"op": "median", "params": {"kernel_size": 3}}]},
+        {"id": "residual", "merge": ["source", "denoised"], "operation": "subtract"},
+    ]}))
+    np.testing.assert_array_equal(cv2.imread(result["final_image"]), expected)
+
+
+@pytest.mark.parametrize("nodes", [
+    [{"id": "a", "input": "missing"}],
+    [{"id": "a", "input": "b"}, {"id": "b", "input": "a"}],
+    [{"id": "a", "merge": ["source"], "operation": "add"}],
+])
+def test_invalid_dag_is_rejected(nodes):
+    with pytest.raises(ValueError):
+        compile_dag({"nodes": nodes})
@@ -0,0 +1,25 @@
+import cv2
+import numpy as np
+import pytest
+
+from src import processing
+
+
+def test_histogram_statistics_match_numpy(dark_image):
+    gray = cv2.cvtColor(dark_image, cv2.COLOR_BGR2GRAY)
+    stats = processing.calculate_histogram_statistics(processing.calculate_histogram(gray))
+    for name, q in (("p5", 5), ("p25", 25), ("p50", 50), ("p75", 75), ("p95", 95)):
+        assert stats[name] == np.percentile(gray, q)
+    assert stats["min"] == gray.min()
+    assert stats["max"] == gray.max()
+    assert stats["mean"] == pytest.approx(gray.mean(), rel=1e-12)
+    assert stats["std"] == pytest.approx(gray.std(), rel=1e-12)
+
+
+def test_distribution_metrics_match_numpy(dark_image):
+    gray = cv2.cvtColor(dark_image, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    stats = processing.calculate_image_statistics(dark_image)
+    z = (gray - gray.mean()) / gray.std()
+    assert stats["skewness"] == pytest.approx((z ** 3).mean(), rel=1e-9)
+    assert stats["dark_percentage"] == pytest.approx((gray < 128).mean() * 100)
+    assert stats["iqr"] == np.percentile(gray, 75) - np.percentile(gray, 25)
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from src.agent_api.operations import validate_params
+from src.agent_api.workflows import run_experiment
+
+
+def test_null_param_takes_default():
+    assert validate_params("gamma", {"gamma": None}) == validate_params("gamma", {})
+    assert validate_params("gamma", {"gamma": None})["gamma"] == 1.0
+
+
+def test_null_required_param_is_rejected():
+    with pytest.raises(ValueError, match="image2_path"):
+        validate_params("arithmetic", {"image2_path": None})
+
+
+def test_invalid_candidates_fail_alone(image_path):
+    candidates = [
+        {"name": "null_gamma", "steps": [{"op": "gamma", "params": {"gamma": None}}]},
+        {"name": "not_a_step", "steps": [5]},
+        {"name": "bad_kernel", "steps": [{"op": "median", "params": {"kernel_size": "x"}}]},
+    ]
+    result = run_experiment(image_path, json.dumps(candidates))
+
+    assert [r["strategy"] for r in result["results"]] == ["null_gamma"]
@@ -0,0 +1,30 @@
+"""Fused point-op chains must give the pixels of the step-by-step path."""
+import numpy as np
+
+from src.agent_api.transform import _execute_step, compile_steps, execute_steps
+
+POINT_CHAIN = [
+    {"op": "gamma", "params": {"gamma": 0.6}},
+    {"op": "log"},
+    {"op": "negative"},
+    {"op": "stretch", "params": {"in_low": 20, "in_high": 200}},
+    {"op": "sim_quantization", "params": {"bits": 4}},
+]
+
+
+def sequential(img, steps):
+    for step in steps:
+        img = _execute_step(img, step["op"], step.get("params", {}))
+    return img
+
+
+def test_fused_point_chain_matches_sequential(dark_image):
+    plan = compile_steps(POINT_CHAIN)
+    assert len(plan) == 1
+    np.testing.assert_array_equal(plan.run(dark_image), sequential(dark_image, POINT_CHAIN))
+    np.testing.assert_array_equal(compile_steps(POINT_CHAIN, fuse=False).run(dark_image), sequential(dark_image, POINT_CHAIN))
+
+
+def test_fusion_around_neighborhood_op_matches_sequential(dark_image):
+    steps = POINT_CHAIN[:2] + [{"op": "median", "params": {"kernel_size": 3}}] + POINT_CHAIN[2:]
+    np.testing.assert_array_equal(execute_steps(dark_image, steps), sequential(dark_image, steps))
@@ -0,0 +1,21 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.agent_api.preview import preview_array, preview_pipeline
+from src.agent_api.transport import decode_image
+
+
+@pytest.mark.parametrize("steps", ["5", '"gamma"', "[5]"])
+def test_malformed_steps_return_an_error(image_path, steps):
+    assert "error" in preview_pipeline(image_path, steps, codec="raw")
+
+
+def test_preview_array_matches_payload(image_path):
+    steps = [{"op": "gamma", "params": {"gamma": 0.5}}]
+    preview, info = preview_array(image_path, steps)
+    response = preview_pipeline(image_path, json.dumps(steps), codec="raw")
+
+    assert info["level"] == response["level"]
+    np.testing.assert_array_equal(preview, decode_image(response["image"]))
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from src import processing
+
+
+def test_cached_table_matches_fresh_build():
+    processing.clear_resource_caches()
+    fresh = processing.build_gamma_lut(0.6)
+    cached = processing.build_gamma_lut(0.6)
+    processing.clear_resource_caches()
+    np.testing.assert_array_equal(cached, fresh)
+    np.testing.assert_array_equal(cached, processing.build_gamma_lut(0.6))
+
+
+def test_pooled_clahe_matches_fresh_object(dark_image):
+    other = np.ascontiguousarray(dark_image[::-1])
+    # Warm the pool with another image first: pooled objects must not carry state
+    processing.apply_clahe(other, clip_limit=3.0)
+    pooled = processing.apply_clahe(dark_image, clip_limit=3.0)
+    fresh = processing.apply_clahe(dark_image, clahe=processing.create_clahe(3.0, 8))
+    np.testing.assert_array_equal(pooled, fresh)
+
+
+def test_cached_tables_are_read_only():
+    table = processing.build_gamma_lut(0.6)
+    with pytest.raises(ValueError):
+        table[0] = 1
@@ -0,0 +1,40 @@
+import json
+
+import cv2
+import numpy as np
+
+from src import agent_api
+from src.agent_api import config
+from src.agent_api.transform import apply_transformation
+
+
+def test_result_cache_hit_matches_miss(image_path, monkeypatch):
+    steps = json.dumps([{"op": "median", "params": {"kernel_size": 3}}, {"op": "gamma", "params": {"gamma": 0.5}}])
+    first = agent_api.apply_pipeline(image_path, steps)
+    hit = agent_api.apply_pipeline(image_path, steps)
+    assert hit.get("cached") is True
+    assert hit["all_artifacts"] == first["all_artifacts"]
+
+    monkeypatch.setattr(config, "RESULT_CACHE_ENABLED", False)
+    recomputed = agent_api.apply_pipeline(image_path, steps)
+    assert "cached" not in recomputed
+    for cached_path, fresh_path in zip(hit["all_artifacts"], recomputed["all_artifacts"]):
+        np.testing.assert_array_equal(cv2.imread(cached_path), cv2.imread(fresh_path))
+
+
+def test_overwritten_artifact_is_a_miss(tmp_path, dark_image):
+    # dir1/a.png and dir2/a.png write the same Enhancement/gamma/a_... artifact
+    paths = []
+    for name, img in (("dir1", dark_image), ("dir2", 255 - dark_image[:40, :50])):
+        (tmp_path / name).mkdir()
+        paths.append(str(tmp_path / name / "a.png"))
+        cv2.imwrite(paths[-1], img)
+
+    first = apply_transformation(paths[0], "gamma", '{"gamma": 0.5}')
+    expected = cv2.imread(first)
+    other = apply_transformation(paths[1], "gamma", '{"gamma": 0.5}')
+    assert other == first
+
+    again = apply_transformation(paths[0], "gamma", '{"gamma": 0.5}')
+    assert again == first
+    np.testing.assert_array_equal(cv2.imread(again), expected)
@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+import pytest
+
+from src import processing
+from src.agent_api.diagnostics import compute_stack_reduction
+
+
+@pytest.fixture
+def stack():
+    rng = np.random.default_rng(11)
+    return rng.integers(0, 256, (6, 20, 24, 3), dtype=np.uint8)
+
+
+def expected(stack, reduction, percentile=50.0):
+    frames = stack.astype(np.float64)
+    if reduction == "min":
+        return stack.min(axis=0)
+    if reduction == "max":
+        return stack.max(axis=0)
+    reduced = np.median(frames, axis=0) if reduction == "median" else np.percentile(frames, percentile, axis=0)
+    return np.clip(np.rint(reduced), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("reduction, percentile", [("median", 50.0), ("min", 0), ("max", 0), ("percentile", 20.0), ("percentile", 90.0)])
+def test_strip_reduction_matches_numpy(stack, reduction, percentile):
+    # Strips of a couple of rows: the strip boundaries must not show
+    result = processing.reduce_stack(stack, reduction, percentile, max_strip_bytes=2 * stack[:, 0].nbytes)
+    np.testing.assert_array_equal(result, expected(stack, reduction, percentile))
+
+
+@pytest.mark.parametrize("reduction", ["median", "min", "percentile"])
+def test_directory_reduction_matches_numpy(stack, tmp_path, reduction):
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    for i, frame in enumerate(stack):
+        cv2.imwrite(str(frames / f"frame_{i}.png"), frame)
+
+    result = compute_stack_reduction(str(frames), reduction, 75.0)
+    np.testing.assert_array_equal(cv2.imread(result), expected(stack, reduction, 75.0))
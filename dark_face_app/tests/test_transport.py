@@ -0,0 +1,43 @@
+import base64
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from src.agent_api.transform import execute_steps
+from src.agent_api.transport import RAW_MAGIC, apply_pipeline_array, decode_image, encode_image
+
+
+@pytest.mark.parametrize("codec", ["raw", "png", "webp"])
+def test_lossless_round_trip(dark_image, codec):
+    np.testing.assert_array_equal(decode_image(encode_image(dark_image, codec)), dark_image)
+
+
+@pytest.mark.parametrize("codec", ["raw", "png"])
+def test_gray_round_trip(dark_image, codec):
+    gray = cv2.cvtColor(dark_image, cv2.COLOR_BGR2GRAY)
+    np.testing.assert_array_equal(decode_image(encode_image(gray, codec)), gray)
+
+
+def test_raw_round_trip_of_views_and_base64(dark_image):
+    view = dark_image[::2, 1::3]
+    text = base64.b64encode(encode_image(view)).decode("ascii")
+    np.testing.assert_array_equal(decode_image(text), view)
+
+
+def test_jpg_round_trip_keeps_shape(dark_image):
+    decoded = decode_image(encode_image(dark_image, "jpg"))
+    assert decoded.shape == dark_image.shape
+
+
+@pytest.mark.parametrize("payload", [RAW_MAGIC, RAW_MAGIC + b"\x03\x01", encode_image(np.zeros((4, 4), np.uint8))[:-1], "not base64!"])
+def test_malformed_payloads_raise_value_error(payload):
+    with pytest.raises(ValueError):
+        decode_image(payload)
+
+
+def test_pipeline_array_matches_in_memory_pipeline(dark_image):
+    steps = [{"op": "median", "params": {"kernel_size": 3}}, {"op": "gamma", "params": {"gamma": 0.5}}]
+    response = apply_pipeline_array(encode_image(dark_image), json.dumps(steps))
+    np.testing.assert_array_equal(decode_image(response["image"]), execute_steps(dark_image, steps))